@@ -0,0 +1 @@
+"""Micro-benchmarks for the txnpay client hot paths"""
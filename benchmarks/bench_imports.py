@@ -0,0 +1,37 @@
+"""Benchmark of the cold import time of the client
+
+Imports `TraxionPay` in fresh interpreters with `python -X importtime` and
+reports the cumulative time of the `txnpay` modules, the best of a few runs.
+
+    python -m benchmarks.bench_imports
+"""
+import subprocess
+import sys
+
+REPEAT = 5
+
+
+def import_time():
+    """Microseconds one cold `from txnpay import TraxionPay` spends in txnpay modules"""
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c',
+                             'from txnpay import TraxionPay'],
+                            stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                            universal_newlines=True, check=True)
+    total = 0
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line.split('|')
+        # top-level entries are indented by a single space
+        if name.startswith(' txnpay') and not name.startswith('  '):
+            total += int(cumulative)
+    return total
+
+
+def run(repeat=REPEAT):
+    """Runs the benchmark and returns the best import time in microseconds"""
+    return min(import_time() for _ in range(repeat))
+
+
+if __name__ == '__main__':
+    print('from txnpay import TraxionPay {:>7.1f} ms'.format(run() / 1e3))
@@ -0,0 +1,55 @@
+"""Benchmark for the write-ahead journal
+
+Measures the time an intent and an outcome add to a call, single-threaded
+and from concurrent threads, with and without waiting for the intent's fsync.
+
+    python -m benchmarks.bench_journal
+"""
+import os
+import shutil
+import tempfile
+import threading
+import time
+
+from txnpay.journal import Journal
+
+OPERATIONS = 2000
+
+
+def journal_operations(journal, prefix, count):
+    for index in range(count):
+        key = '{}-{}'.format(prefix, index)
+        journal.intent('cash_in', key, amount=1500.0)
+        journal.outcome('cash_in', key, result='https://devapi.traxionpay.com/payform-link')
+
+
+def per_operation(sync_intents, threads):
+    """Microseconds per intent and outcome pair"""
+    directory = tempfile.mkdtemp()
+    try:
+        journal = Journal(os.path.join(directory, 'txnpay.journal'), sync_intents=sync_intents)
+        count = OPERATIONS // threads
+        workers = [threading.Thread(target=journal_operations, args=(journal, str(index), count))
+                   for index in range(threads)]
+        started = time.perf_counter()
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        elapsed = time.perf_counter() - started
+        journal.close()
+        return elapsed / (count * threads) * 1e6
+    finally:
+        shutil.rmtree(directory)
+
+
+def run():
+    """Runs the benchmark and returns {(sync_intents, threads): us_per_operation}"""
+    return {(sync_intents, threads): per_operation(sync_intents, threads)
+            for sync_intents in (False, True) for threads in (1, 32)}
+
+
+if __name__ == '__main__':
+    for (sync_intents, threads), micros in run().items():
+        print('sync_intents={!s:<5} threads={:<3} {:>9.1f} us per operation'.format(
+            sync_intents, threads, micros))
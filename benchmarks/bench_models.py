@@ -0,0 +1,69 @@
+"""Benchmark for lazily decoded response models
+
+Compares the memory held by 100k bank accounts as `response.json()` dicts
+with the same accounts as :class:`BankAccount` models, before any field is
+read and after every record was decoded, and the time to build each.
+
+    python -m benchmarks.bench_models
+"""
+import gc
+import json
+import time
+import tracemalloc
+
+from txnpay.models import BankAccount
+
+RECORDS = 100000
+
+
+def response_body(count=RECORDS):
+    return json.dumps([{
+        'id': index,
+        'bank': '1613{:02d}'.format(index % 40),
+        'bank_type': 'savings' if index % 2 else 'checkings',
+        'account_number': '90{:08d}'.format(index),
+        'account_name': 'Account holder {}'.format(index),
+    } for index in range(count)]).encode()
+
+
+def measure(build, *after):
+    """Returns (seconds to build and run `after`, bytes held) of the value `build` returns"""
+    gc.collect()
+    started = time.perf_counter()
+    value = build()
+    for step in after:
+        step(value)
+    elapsed = time.perf_counter() - started
+    del value
+
+    gc.collect()
+    tracemalloc.start()
+    value = build()
+    for step in after:
+        step(value)
+    gc.collect()
+    held = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return elapsed, held
+
+
+def decode_all(accounts):
+    for account in accounts:
+        account.id
+
+
+def run(count=RECORDS):
+    """Runs the benchmark and returns {case: (seconds, bytes)}"""
+    body = response_body(count)
+    return {
+        'dicts': measure(lambda: json.loads(body)),
+        'models': measure(lambda: BankAccount.list_from_json(body)),
+        'models decoded': measure(lambda: BankAccount.list_from_json(body), decode_all),
+    }
+
+
+if __name__ == '__main__':
+    results = run()
+    for case, (seconds, held) in results.items():
+        print('{:<15} {:>7.1f} ms  {:>7.1f} MB  {:>5.0f} bytes/record'.format(
+            case, seconds * 1e3, held / 1e6, held / RECORDS))
@@ -0,0 +1,107 @@
+"""Benchmark for building the `cash_in` form body
+
+Compares the previous pipeline (`json.dumps` to str, `.encode()`, base64,
+`.decode()`, then form-encoding by `requests`) with the serializers in
+`txnpay.serializer`, for a typical payload and a maximum-size one
+(500 character description, every billing field set).
+
+    python -m benchmarks.bench_serialization
+"""
+import base64
+import json
+import timeit
+import tracemalloc
+
+try:
+    from urllib.parse import urlencode
+except ImportError:
+    from urllib import urlencode
+
+from txnpay.serializer import JSONSerializer, OrjsonSerializer
+
+NUMBER = 20000
+REPEAT = 5
+
+TYPICAL_PAYLOAD = {
+    'merchant_id': 6328,
+    'merchant_ref_no': 'ABC123DEF456',
+    'description': 'My test payment',
+    'amount': 1500.0,
+    'merchant_additional_data': 'eyJwYXltZW50X2NvZGUiOiJBQkMxMjNERUY0NTYifQ==',
+    'currency': 'PHP',
+    'billing_email': 'john.doe@mysite.com',
+    'billing_country': 'PH',
+    'status_notification_url': 'https://www.mysite.com/callback',
+    'success_page_url': 'https://www.mysite.com/success',
+    'failure_page_url': 'https://www.mysite.com/failed',
+    'cancel_page_url': 'https://www.mysite.com/cancelled',
+    'pending_page_url': 'https://www.mysite.com/pending',
+    'secure_hash': 'a' * 64,
+    'auth_hash': 'b' * 64,
+    'alg': 'HS256',
+}
+MAXIMUM_PAYLOAD = dict(TYPICAL_PAYLOAD,
+                       merchant_ref_no='R' * 100,
+                       description='D' * 500,
+                       billing_first_name='John',
+                       billing_last_name='Doe',
+                       billing_middle_name='Smith',
+                       billing_phone='0281234567',
+                       billing_mobile='09171234567',
+                       billing_address='123 Ayala Avenue, Makati City',
+                       billing_address2='Unit 4501, Tower One',
+                       billing_city='Makati',
+                       billing_state='Metro Manila',
+                       billing_zip='1226',
+                       billing_remark='Leave at the front desk',
+                       payment_method='gcash')
+
+
+def legacy_form_body(payload):
+    """Form body as `cash_in` built it before, including the form-encoding `requests` did"""
+    encoded = base64.b64encode(json.dumps(payload).encode()).decode('utf-8')
+    return urlencode({'form_data': encoded})
+
+
+def per_call(func):
+    """Best per-call time in microseconds"""
+    return min(timeit.repeat(func, number=NUMBER, repeat=REPEAT)) / NUMBER * 1e6
+
+
+def peak_bytes(func):
+    """Peak bytes allocated while building one body"""
+    func()
+    tracemalloc.start()
+    try:
+        func()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def builders():
+    found = [('legacy', legacy_form_body)]
+    for cls in (JSONSerializer, OrjsonSerializer):
+        try:
+            instance = cls()
+        except ImportError:
+            continue
+        found.append((instance.name, lambda payload, instance=instance:
+                      instance.form_body('form_data', payload)))
+    return found
+
+
+def run():
+    """Runs the benchmark and returns {(payload, builder): (us_per_call, peak_bytes)}"""
+    results = {}
+    for payload_name, payload in (('typical', TYPICAL_PAYLOAD), ('maximum', MAXIMUM_PAYLOAD)):
+        for name, build in builders():
+            results[(payload_name, name)] = (per_call(lambda: build(payload)),
+                                             peak_bytes(lambda: build(payload)))
+    return results
+
+
+if __name__ == '__main__':
+    for (payload_name, name), (micros, peak) in run().items():
+        print('{:<8} {:<8} {:>7.2f} us  peak {:>6} bytes'.format(payload_name, name,
+                                                                 micros, peak))
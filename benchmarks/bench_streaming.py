@@ -0,0 +1,106 @@
+"""Benchmark of iter_bank_accounts against fetch_bank_accounts for a large merchant
+
+Serves 100k linked bank accounts from an :class:`Emulator` in a child
+process and reads them back with each transport, as one list with
+`fetch_bank_accounts` and one record at a time with `iter_bank_accounts`.
+Reports the time until the first account is available, the total time,
+and the peak memory allocated by the client while reading.
+
+    python -m benchmarks.bench_streaming
+"""
+import contextlib
+import gc
+import multiprocessing
+import time
+import tracemalloc
+
+from txnpay import TraxionPay
+from txnpay.emulator import Emulator
+from txnpay.transport import TRANSPORTS
+
+RECORDS = 100000
+SECRET_KEY = 'benchmark-secret'
+API_KEY = 'benchmark-api'
+
+
+def bank_accounts(count=RECORDS):
+    return [{
+        'id': index,
+        'bank': '1613{:02d}'.format(index % 40),
+        'bank_type': 'savings' if index % 2 else 'checkings',
+        'account_number': '90{:08d}'.format(index),
+        'account_name': 'Account holder {}'.format(index),
+    } for index in range(count)]
+
+
+def _serve(connection, count):
+    emulator = Emulator()
+    emulator.add_merchant(SECRET_KEY, API_KEY, bank_accounts=bank_accounts(count))
+    with emulator:
+        connection.send(emulator.url)
+        try:
+            connection.recv()
+        except EOFError:
+            pass
+
+
+@contextlib.contextmanager
+def emulator_process(count):
+    parent, child = multiprocessing.Pipe()
+    process = multiprocessing.Process(target=_serve, args=(child, count), daemon=True)
+    process.start()
+    try:
+        yield parent.recv()
+    finally:
+        parent.close()
+        process.join(5)
+        if process.is_alive():
+            process.terminate()
+
+
+def fetch(client):
+    """Yields the accounts of one `fetch_bank_accounts` list"""
+    for account in client.fetch_bank_accounts(refresh=True):
+        yield account
+
+
+def iterate(client):
+    return client.iter_bank_accounts()
+
+
+def measure(client, read):
+    """Returns (seconds to first record, seconds to all, peak bytes allocated) of `read`"""
+    gc.collect()
+    started = time.perf_counter()
+    first = None
+    for _ in read(client):
+        if first is None:
+            first = time.perf_counter() - started
+    elapsed = time.perf_counter() - started
+
+    gc.collect()
+    tracemalloc.start()
+    for _ in read(client):
+        pass
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return first, elapsed, peak
+
+
+def run(count=RECORDS):
+    """Runs the benchmark and returns {case: (first seconds, total seconds, peak bytes)}"""
+    results = {}
+    with emulator_process(count) as url:
+        for transport in TRANSPORTS:
+            with TraxionPay(secret_key=SECRET_KEY, api_key=API_KEY, base_url=url,
+                            transport=transport, bank_accounts_ttl=None) as client:
+                for name, read in (('fetch_bank_accounts', fetch),
+                                   ('iter_bank_accounts', iterate)):
+                    results['{}.{}'.format(transport, name)] = measure(client, read)
+    return results
+
+
+if __name__ == '__main__':
+    for case, (first, elapsed, peak) in run().items():
+        print('{:<30} first {:>7.1f} ms  all {:>7.1f} ms  peak {:>7.1f} MB'.format(
+            case, first * 1e3, elapsed * 1e3, peak / 1e6))
@@ -0,0 +1,52 @@
+"""Benchmark for prepared `cash_in` templates
+
+Compares building the `cash_in` form body from every field with
+building it from a template that bound the merchant-constant fields.
+
+    python -m benchmarks.bench_templates
+"""
+import timeit
+
+from txnpay import TraxionPay
+
+NUMBER = 20000
+REPEAT = 5
+
+CONSTANT_FIELDS = {
+    'merchant_id': 6328,
+    'currency': 'PHP',
+    'payment_method': 'gcash',
+    'billing_country': 'PH',
+    'status_notification_url': 'https://www.mysite.com/callback',
+    'success_page_url': 'https://www.mysite.com/success',
+    'failure_page_url': 'https://www.mysite.com/failed',
+    'cancel_page_url': 'https://www.mysite.com/cancelled',
+    'pending_page_url': 'https://www.mysite.com/pending',
+}
+VARYING_FIELDS = {
+    'merchant_ref_no': 'ABC123DEF456',
+    'description': 'My test payment',
+    'amount': 1500.0,
+    'merchant_additional_data': {'payment_code': 'ABC123DEF456'},
+    'billing_email': 'john.doe@mysite.com',
+}
+
+
+def per_call(func):
+    """Best per-call time in microseconds"""
+    return min(timeit.repeat(func, number=NUMBER, repeat=REPEAT)) / NUMBER * 1e6
+
+
+def run():
+    """Runs the benchmark and returns (cash_in_us, template_us)"""
+    api = TraxionPay(secret_key='secret', api_key='api')
+    template = api.prepare_cash_in(**CONSTANT_FIELDS)
+    all_fields = dict(CONSTANT_FIELDS, **VARYING_FIELDS)
+    return (per_call(lambda: api._build_cash_in_payload(**all_fields)),
+            per_call(lambda: template.build(**VARYING_FIELDS)))
+
+
+if __name__ == '__main__':
+    full, prepared = run()
+    print('cash_in {:>7.2f} us  template {:>7.2f} us  ({:.1f}x)'.format(full, prepared,
+                                                                        full / prepared))
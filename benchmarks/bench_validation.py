@@ -0,0 +1,82 @@
+"""Benchmark for compiled request validation
+
+Compares the compiled schemas in `txnpay.schema` against an interpreted
+walk over the same fields, which is how `cash_in` validated before.
+
+    python -m benchmarks.bench_validation
+"""
+import timeit
+
+from txnpay.schema import CASH_IN_SCHEMA, LINK_BANK_ACCOUNT_SCHEMA, CASH_OUT_SCHEMA
+from txnpay.utils import is_length_acceptable
+
+NUMBER = 20000
+REPEAT = 5
+
+CASH_IN_VALUES = {
+    'merchant_id': 6328,
+    'merchant_ref_no': 'ABC123DEF456',
+    'description': 'My test payment',
+    'amount': 1500.0,
+    'merchant_additional_data': {'payment_code': 'ABC123DEF456'},
+    'status_notification_url': 'https://www.mysite.com/callback',
+    'success_page_url': 'https://www.mysite.com/success',
+    'failure_page_url': 'https://www.mysite.com/failed',
+    'cancel_page_url': 'https://www.mysite.com/cancelled',
+    'pending_page_url': 'https://www.mysite.com/pending',
+    'billing_email': 'john.doe@mysite.com',
+}
+LINK_BANK_ACCOUNT_VALUES = {
+    'bank_code': '161311',
+    'bank_type': 'savings',
+    'account_number': '9012345678',
+    'account_name': 'John Doe',
+}
+CASH_OUT_VALUES = {'otp': 'AB12DE34', 'amount': 100.0, 'bank_account': 413}
+
+
+def interpreted_validate(schema, values):
+    """Field-by-field validation with messages built at call time"""
+    payload = {}
+    for field in schema.fields:
+        value = values.get(field.name)
+        if value is not None:
+            if not isinstance(value, field.types):
+                raise TypeError('{} {} be of type {}'.format(field.name, field.verb,
+                                                             field.type_name))
+            if field.choices is not None and value not in field.choices:
+                raise ValueError(field.choices_message)
+            if field.max_length is not None and not is_length_acceptable(value,
+                                                                         field.max_length):
+                raise ValueError('{} must be less than or equal to {}'.format(
+                    field.name, field.max_length))
+            payload[field.key] = field.encode(value) if field.encode else value
+        elif field.required:
+            raise ValueError('{} cannot be None'.format(field.name))
+        elif field.default is not None:
+            payload[field.key] = field.default
+    return payload
+
+
+def per_call(func):
+    """Best per-call time in microseconds"""
+    return min(timeit.repeat(func, number=NUMBER, repeat=REPEAT)) / NUMBER * 1e6
+
+
+def run():
+    """Runs the benchmark and returns {name: (interpreted_us, compiled_us)}"""
+    cases = (('cash_in', CASH_IN_SCHEMA, CASH_IN_VALUES),
+             ('link_bank_account', LINK_BANK_ACCOUNT_SCHEMA, LINK_BANK_ACCOUNT_VALUES),
+             ('cash_out', CASH_OUT_SCHEMA, CASH_OUT_VALUES))
+    results = {}
+    for name, schema, values in cases:
+        assert interpreted_validate(schema, values) == schema.validate(values)
+        results[name] = (per_call(lambda: interpreted_validate(schema, values)),
+                         per_call(lambda: schema.validate(values)))
+    return results
+
+
+if __name__ == '__main__':
+    for case, (interpreted, compiled) in run().items():
+        print('{:<20} interpreted {:>7.2f} us  compiled {:>7.2f} us  ({:.1f}x)'.format(
+            case, interpreted, compiled, interpreted / compiled))
@@ -0,0 +1,70 @@
+"""Throughput benchmark for status notification verification
+
+Reports notifications verified per second on a single core, for one-by-one
+verification, batch verification and the full WSGI request path.
+
+    python -m benchmarks.bench_webhooks
+"""
+import io
+import json
+import time
+
+from txnpay.signing import Signer
+from txnpay.webhooks import NotificationHandler
+
+SECRET_KEY = 'cxl+hwc%97h6+4#lx1au*ut=ml+=!fx85w94iuf*06=rf383xs'
+COUNT = 20000
+
+
+def make_notifications(count):
+    """Signed JSON notification bodies"""
+    signer = Signer(SECRET_KEY)
+    bodies = []
+    for index in range(count):
+        ref_no = 'REF{:08d}'.format(index)
+        bodies.append(json.dumps({
+            'merchant_ref_no': ref_no,
+            'amount': 1500.0,
+            'currency': 'PHP',
+            'description': 'Invoice {}'.format(index),
+            'status': 'paid',
+            'secure_hash': signer.secure_hash(ref_no, 1500.0, 'Invoice {}'.format(index)),
+        }).encode())
+    return bodies
+
+
+def rate(func, bodies):
+    """Notifications per second"""
+    start = time.perf_counter()
+    func(bodies)
+    return len(bodies) / (time.perf_counter() - start)
+
+
+def run(count=COUNT):
+    """Runs the benchmark and returns {mode: notifications_per_second}"""
+    handler = NotificationHandler(secret_key=SECRET_KEY)
+    handler.register(lambda notification: None)
+    bodies = make_notifications(count)
+
+    def one_by_one(bodies):
+        for body in bodies:
+            handler.handle(body, 'application/json')
+
+    def batch(bodies):
+        assert not handler.replay(bodies)
+
+    def wsgi(bodies):
+        start_response = lambda status, headers: None
+        for body in bodies:
+            handler({'REQUEST_METHOD': 'POST', 'CONTENT_LENGTH': str(len(body)),
+                     'CONTENT_TYPE': 'application/json', 'wsgi.input': io.BytesIO(body)},
+                    start_response)
+
+    return {'verify': rate(one_by_one, bodies),
+            'verify_many': rate(batch, bodies),
+            'wsgi': rate(wsgi, bodies)}
+
+
+if __name__ == '__main__':
+    for mode, per_second in run().items():
+        print('{:<12} {:>10,.0f} notifications/s/core'.format(mode, per_second))
@@ -0,0 +1,339 @@
+"""Benchmark suite for every client hot path, with JSON baselines
+
+Measures the cold import of the client in a fresh interpreter, building
+`cash_in` payloads phase by phase (validation, HMAC signing, JSON and
+base64 encoding), `encode_additional_data` across payload sizes, and calls
+per second of every endpoint against a local :class:`Emulator`,
+sequentially and from concurrent threads, with each transport.
+
+Every result is in microseconds per operation, lower is better. `--save`
+stores them as the baseline; later runs compare against it and exit with
+status 1 when a benchmark is slower than the baseline by more than
+`--threshold` percent. Baselines are only comparable on the machine and
+Python they were recorded with.
+
+    python -m benchmarks.suite --save
+    python -m benchmarks.suite --threshold 15
+    python -m benchmarks.suite --only cash_in --quick
+"""
+import argparse
+import contextlib
+import json
+import os
+import platform
+import sys
+import threading
+import time
+import timeit
+
+from benchmarks.bench_imports import import_time
+from txnpay import TraxionPay
+from txnpay.batch import run_batch
+from txnpay.emulator import Emulator
+from txnpay.retry import RetryPolicy
+from txnpay.schema import CASH_IN_SCHEMA
+from txnpay.serializer import get_serializer
+from txnpay.transport import TRANSPORTS
+from txnpay.utils import encode_additional_data
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline.json')
+DEFAULT_THRESHOLD = 10.0
+REPEAT = 5
+# seconds each micro-benchmark repeat runs for, roughly
+MICRO_TIME = 0.2
+CALLS = 500
+WORKERS = 16
+ADDITIONAL_DATA_SIZES = (1, 10, 100, 1000)
+
+SECRET_KEY = 'benchmark-secret'
+API_KEY = 'benchmark-api'
+CASH_IN_FIELDS = {
+    'merchant_id': 6328,
+    'merchant_ref_no': 'ABC123DEF456',
+    'description': 'My test payment',
+    'amount': 1500.0,
+    'merchant_additional_data': {'payment_code': 'ABC123DEF456'},
+    'status_notification_url': 'https://www.mysite.com/callback',
+    'success_page_url': 'https://www.mysite.com/success',
+    'failure_page_url': 'https://www.mysite.com/failed',
+    'cancel_page_url': 'https://www.mysite.com/cancelled',
+    'pending_page_url': 'https://www.mysite.com/pending',
+    'billing_email': 'john.doe@mysite.com',
+}
+
+
+def per_call(func, quick=False):
+    """Best per-call time in microseconds"""
+    timer = timeit.Timer(func)
+    number, elapsed = timer.autorange()
+    number = max(1, int(number * MICRO_TIME / max(elapsed, 1e-9)) // (10 if quick else 1))
+    repeat = 2 if quick else REPEAT
+    return min(timer.repeat(number=number, repeat=repeat)) / number * 1e6
+
+
+def selected(name, only):
+    """Whether the benchmark `name` is run for `--only` patterns `only`"""
+    return only is None or any(pattern in name for pattern in only)
+
+
+def import_benchmarks(quick=False, only=None):
+    """Yields `('import.txnpay', us)` for `from txnpay import TraxionPay` in a fresh interpreter"""
+    if selected('import.txnpay', only):
+        yield 'import.txnpay', min(import_time() for _ in range(2 if quick else REPEAT))
+
+
+def micro_benchmarks(quick=False, only=None):
+    """Yields `(name, us_per_call)` for the payload construction hot paths"""
+    client = TraxionPay(secret_key=SECRET_KEY, api_key=API_KEY)
+    signer = client.signer
+    serializer = get_serializer()
+    payload = CASH_IN_SCHEMA.validate(CASH_IN_FIELDS)
+    signed = dict(payload, secure_hash=signer.secure_hash('ABC123DEF456', 1500.0,
+                                                          'My test payment'),
+                  auth_hash=signer.auth_hash, alg=signer.alg)
+    template = client.prepare_cash_in(merchant_id=6328,
+                                      status_notification_url='https://www.mysite.com/callback')
+    varying = dict((name, value) for name, value in CASH_IN_FIELDS.items()
+                   if name not in template.bound)
+
+    cases = [
+        ('cash_in.validate', lambda: CASH_IN_SCHEMA.validate(CASH_IN_FIELDS)),
+        ('cash_in.sign', lambda: signer.secure_hash('ABC123DEF456', 1500.0, 'My test payment')),
+        ('cash_in.json', lambda: serializer.dumps(signed)),
+        ('cash_in.encode', lambda: serializer.form_body('form_data', signed)),
+        ('cash_in.build', lambda: client._build_cash_in_payload(**CASH_IN_FIELDS)),
+        ('cash_in.template_build', lambda: template.build(**varying)),
+    ]
+    for size in ADDITIONAL_DATA_SIZES:
+        data = dict(('key_{}'.format(index), 'value {}'.format(index)) for index in range(size))
+        cases.append(('encode_additional_data.{}_keys'.format(size),
+                      lambda data=data: encode_additional_data(data)))
+
+    for name, func in cases:
+        if selected(name, only):
+            yield name, per_call(func, quick)
+
+
+class EndpointCalls():
+    """Calls of each endpoint, with whatever they need prepared outside the timing"""
+
+    def __init__(self, client):
+        self.client = client
+        self.account = client.link_bank_account(bank_code='161311', bank_type='savings',
+                                                account_number='9012345678',
+                                                account_name='John Doe')
+        self._sequence = 0
+        self._lock = threading.Lock()
+
+    def _next(self):
+        with self._lock:
+            self._sequence += 1
+            return self._sequence
+
+    def prepare(self, endpoint, count):
+        """Returns `count` argument dicts for calls of `endpoint`"""
+        if endpoint == 'cash_out':
+            return [{'otp': self.client.fetch_otp()['code'], 'amount': 100.0,
+                     'bank_account': self.account['id']} for _ in range(count)]
+        return [{} for _ in range(count)]
+
+    def call(self, endpoint, arguments):
+        client = self.client
+        if endpoint == 'cash_in':
+            return client.cash_in(**dict(CASH_IN_FIELDS,
+                                         merchant_ref_no='REF{}'.format(self._next())))
+        if endpoint == 'fetch_banks':
+            return client.fetch_banks(refresh=True)
+        if endpoint == 'fetch_bank_accounts':
+            return client.fetch_bank_accounts(refresh=True)
+        if endpoint == 'link_bank_account':
+            return client.link_bank_account(bank_code='161311', bank_type='savings',
+                                            account_number=str(self._next()),
+                                            account_name='John Doe')
+        if endpoint == 'fetch_otp':
+            return client.fetch_otp()
+        return client.cash_out(**arguments)
+
+
+# link_bank_account last, so fetch_bank_accounts always lists one account
+ENDPOINTS = ('cash_in', 'fetch_banks', 'fetch_bank_accounts', 'fetch_otp', 'cash_out',
+             'link_bank_account')
+
+
+def merchant_secret(transport):
+    """Each transport runs as its own merchant, with its own bank accounts"""
+    return '{}-{}'.format(SECRET_KEY, transport)
+
+
+def _serve_emulator(connection):
+    merchants = dict((merchant_secret(transport), API_KEY) for transport in TRANSPORTS)
+    with Emulator(merchants=merchants) as emulator:
+        connection.send(emulator.url)
+        try:
+            # serves until the parent closes its end
+            connection.recv()
+        except EOFError:
+            pass
+
+
+@contextlib.contextmanager
+def emulator_process():
+    """Runs an :class:`Emulator` in a child process, so it does not share the client's GIL"""
+    import multiprocessing
+
+    parent, child = multiprocessing.Pipe()
+    process = multiprocessing.Process(target=_serve_emulator, args=(child,), daemon=True)
+    process.start()
+    try:
+        yield parent.recv()
+    finally:
+        parent.close()
+        process.join(5)
+        if process.is_alive():
+            process.terminate()
+
+
+def endpoint_benchmarks(quick=False, only=None, workers=WORKERS):
+    """Yields `(name, us_per_call)` for every transport and endpoint, sequential and concurrent
+
+        Concurrent `fetch_banks` and `fetch_bank_accounts` calls are coalesced by
+        the client's single flight, as they would be in production. The emulator
+        is only started when `only` selects one of them.
+    """
+    names = {}
+    for transport in TRANSPORTS:
+        for endpoint in ENDPOINTS:
+            for mode in ('sequential', 'concurrent'):
+                name = 'endpoint.{}.{}.{}'.format(transport, endpoint, mode)
+                if selected(name, only):
+                    names[transport, endpoint, mode] = name
+    if not names:
+        return
+    calls_per_run = CALLS // 5 if quick else CALLS
+    repeat = 1 if quick else 3
+    with emulator_process() as url:
+        for transport in TRANSPORTS:
+            if not any(key[0] == transport for key in names):
+                continue
+            with TraxionPay(secret_key=merchant_secret(transport), api_key=API_KEY,
+                            base_url=url, transport=transport, pool_maxsize=workers,
+                            retry_policy=RetryPolicy(max_retries=0)) as client:
+                calls = EndpointCalls(client)
+                for endpoint in ENDPOINTS:
+                    for mode in ('sequential', 'concurrent'):
+                        name = names.get((transport, endpoint, mode))
+                        if name is None:
+                            continue
+                        best = None
+                        for _ in range(repeat):
+                            elapsed = time_calls(calls, endpoint, mode, calls_per_run, workers)
+                            best = elapsed if best is None else min(best, elapsed)
+                        yield name, best
+
+
+def time_calls(calls, endpoint, mode, count, workers):
+    """Microseconds per call of `count` calls of `endpoint`"""
+    arguments = calls.prepare(endpoint, count)
+    started = time.perf_counter()
+    if mode == 'sequential':
+        for item in arguments:
+            calls.call(endpoint, item)
+    else:
+        for result in run_batch(lambda item: calls.call(endpoint, item),
+                                ({'item': item} for item in arguments), workers=workers):
+            if not result.ok:
+                raise result.error
+    return (time.perf_counter() - started) / count * 1e6
+
+
+def environment():
+    return {
+        'python': platform.python_version(),
+        'implementation': platform.python_implementation(),
+        'machine': platform.machine(),
+        'node': platform.node(),
+        'serializer': get_serializer().name,
+    }
+
+
+def load_baseline(path):
+    try:
+        with open(path) as baseline_file:
+            return json.load(baseline_file)
+    except OSError:
+        return None
+
+
+def save_baseline(path, results):
+    temp_path = '{}.tmp'.format(path)
+    with open(temp_path, 'w') as baseline_file:
+        json.dump({'environment': environment(), 'results': results}, baseline_file,
+                  indent=2, sort_keys=True)
+        baseline_file.write('\n')
+    os.replace(temp_path, path)
+
+
+def compare(results, baseline, threshold):
+    """Returns `{name: percent slower than baseline}` of the benchmarks past `threshold`"""
+    regressions = {}
+    for name, micros in results.items():
+        previous = baseline.get(name)
+        if previous:
+            change = (micros - previous) / previous * 100
+            if change > threshold:
+                regressions[name] = change
+    return regressions
+
+
+def run(only=None, quick=False):
+    """Runs the suite and returns {name: us_per_call}"""
+    results = {}
+    for group in (import_benchmarks, micro_benchmarks, endpoint_benchmarks):
+        for name, micros in group(quick=quick, only=only):
+            results[name] = micros
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE,
+                        help='baseline JSON file (default: benchmarks/baseline.json)')
+    parser.add_argument('--save', action='store_true',
+                        help='store the results as the new baseline')
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                        help='percent slower than the baseline that fails the run '
+                             '(default: {})'.format(DEFAULT_THRESHOLD))
+    parser.add_argument('--only', action='append',
+                        help='run the benchmarks whose name contains this, repeatable')
+    parser.add_argument('--quick', action='store_true', help='fewer, shorter repeats')
+    args = parser.parse_args(argv)
+
+    baseline = load_baseline(args.baseline)
+    previous = baseline['results'] if baseline is not None else {}
+    if baseline is not None and baseline.get('environment') != environment():
+        sys.stderr.write('warning: baseline was recorded on {}\n'.format(
+            baseline.get('environment')))
+
+    results = run(only=args.only, quick=args.quick)
+    regressions = compare(results, previous, args.threshold)
+    for name, micros in results.items():
+        line = '{:<50} {:>10.2f} us {:>10.0f} /s'.format(name, micros, 1e6 / micros)
+        if previous.get(name):
+            line += ' {:>+7.1f}%'.format((micros - previous[name]) / previous[name] * 100)
+            if name in regressions:
+                line += '  REGRESSION'
+        print(line)
+
+    if args.save:
+        save_baseline(args.baseline, dict(previous, **results))
+        print('saved baseline to {}'.format(args.baseline))
+        return 0
+    if regressions:
+        print('{} benchmark(s) regressed by more than {}%'.format(len(regressions),
+                                                                  args.threshold))
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
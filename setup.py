@@ -14,6 +14,13 @@ setup(
     install_requires=[
         'requests',
     ],
+    extras_require={
+        'async': ['aiohttp'],
+        'fast': ['orjson'],
+    },
+    entry_points={
+        'console_scripts': ['txnpay = txnpay.cli:main'],
+    },
     classifiers=[
         'Development Status :: 3 - Alpha',
         'Intended Audience :: Developers',
@@ -1 +1,54 @@
-from .traxionpay_client import TraxionPay
\ No newline at end of file
+"""TraxionPay API client
+
+Public names are imported on first access, so `import txnpay` stays cheap
+and only the modules a program uses are loaded.
+"""
+import sys
+
+# public name -> module defining it
+_EXPORTS = {
+    'TraxionPay': 'traxionpay_client',
+    'AsyncTraxionPay': 'async_client',
+    'SessionPool': 'session',
+    'Transport': 'transport',
+    'Urllib3Transport': 'transport',
+    'FileCacheStore': 'cache',
+    'MemoryCacheStore': 'cache',
+    'BankDirectory': 'banks',
+    'NotificationHandler': 'webhooks',
+    'RetryPolicy': 'retry',
+    'CircuitBreakers': 'retry',
+    'RateLimiter': 'ratelimit',
+    'HedgePolicy': 'timeouts',
+    'Instrumentation': 'metrics',
+    'MetricsCollector': 'metrics',
+    'Journal': 'journal',
+    'MerchantRegistry': 'merchants',
+    'Emulator': 'emulator',
+    'Bank': 'models',
+    'BankAccount': 'models',
+    'OtpResult': 'models',
+    'Payout': 'models',
+}
+
+__all__ = sorted(_EXPORTS)
+
+
+def __getattr__(name):
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError('module {!r} has no attribute {!r}'.format(__name__, name))
+    from importlib import import_module
+    value = getattr(import_module('.' + module, __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_EXPORTS))
+
+
+if sys.version_info < (3, 7):
+    # module __getattr__ needs python 3.7
+    for _name in __all__:
+        __getattr__(_name)
@@ -0,0 +1,6 @@
+"""Runs the `txnpay` command: python -m txnpay bulk-cash-in ..."""
+import sys
+
+from .cli import main
+
+sys.exit(main())
@@ -0,0 +1,99 @@
+"""Per-client cache of linked bank accounts"""
+import threading
+import time
+
+try:
+    from collections.abc import Mapping
+except ImportError:
+    from collections import Mapping
+
+
+def _indexable(account):
+    return isinstance(account, Mapping) and 'id' in account
+
+
+def find_account(accounts, bank_account_id=None, account_number=None):
+    """Returns the account of the list `accounts` matching the id or account number, if any."""
+    if not isinstance(accounts, list):
+        return None
+    for account in accounts:
+        if not isinstance(account, Mapping):
+            continue
+        if bank_account_id is not None:
+            if account.get('id') == bank_account_id:
+                return account
+        elif account.get('account_number') == account_number:
+            return account
+    return None
+
+
+class BankAccountCache():
+    """Caches `fetch_bank_accounts` indexed by account id and by account number.
+
+        :param ttl: seconds the cached accounts are served, None disables the cache
+    """
+
+    def __init__(self, ttl=300):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._accounts = None
+        self._by_id = {}
+        self._by_number = {}
+        self._expires_at = 0
+
+    @property
+    def enabled(self):
+        return self.ttl is not None
+
+    def get(self):
+        """Returns the cached account list, or None when it is empty or expired."""
+        with self._lock:
+            if self._accounts is None or time.time() >= self._expires_at:
+                return None
+            return self._accounts
+
+    def set(self, accounts):
+        """Replaces the cached accounts; drops the cache if `accounts` cannot be indexed."""
+        if not self.enabled:
+            return
+        if not isinstance(accounts, list) or not all(_indexable(account) for account in accounts):
+            self.invalidate()
+            return
+        with self._lock:
+            self._accounts = accounts
+            self._by_id = {account['id']: account for account in accounts}
+            self._by_number = {account['account_number']: account for account in accounts
+                               if 'account_number' in account}
+            self._expires_at = time.time() + self.ttl
+
+    def add(self, account):
+        """Adds a newly linked account; drops the cache if `account` cannot be indexed."""
+        with self._lock:
+            if self._accounts is None:
+                return
+            if not _indexable(account):
+                self._accounts = None
+                return
+            previous = self._by_id.get(account['id'])
+            accounts = [item for item in self._accounts if item is not previous]
+            accounts.append(account)
+            self._accounts = accounts
+            self._by_id[account['id']] = account
+            if 'account_number' in account:
+                self._by_number[account['account_number']] = account
+
+    def invalidate(self):
+        """Drops every cached account."""
+        with self._lock:
+            self._accounts = None
+            self._by_id = {}
+            self._by_number = {}
+
+    def find(self, bank_account_id=None, account_number=None):
+        """Returns the cached account matching the id or account number, if any."""
+        with self._lock:
+            if self._accounts is None:
+                return None
+            if bank_account_id is not None:
+                return self._by_id.get(bank_account_id)
+            return self._by_number.get(account_number)
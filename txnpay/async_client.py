@@ -0,0 +1,573 @@
+"""
+asyncio traxionpay module containing awaitable cash in and cash out functions
+"""
+import asyncio
+import json
+import time
+
+from .base_client import BaseTraxionPay
+from .batch import run_batch_async
+from .constants import BASE_URL, ENDPOINT_PATHS
+from .exceptions import MissingAuthenticationError, APIResponseError
+from .metrics import take_phases
+from .ratelimit import parse_retry_after
+from .singleflight import AsyncSingleFlight
+from .timeouts import DEFAULT_TIMEOUT, Deadline
+
+
+class AsyncTraxionPay(BaseTraxionPay):
+    """asyncio counterpart of :class:`TraxionPay` backed by a pooled `aiohttp` session.
+
+        Validation and signing are shared with :class:`TraxionPay`, so both clients
+        accept the same arguments and raise the same errors. Requires `aiohttp`
+        (``pip install txnpay[async]``).
+
+        :param api_key:
+
+        :param secret_key:
+
+        :param limit: (optional) maximum number of simultaneous connections
+
+        :param limit_per_host: (optional) maximum number of simultaneous connections per host,
+            0 means no per-host limit
+
+        :param keepalive_timeout: (optional) seconds an idle connection is kept open
+
+        :param banks_ttl: (optional) seconds `fetch_banks` serves its cached response,
+            defaults to an hour, None disables the cache
+
+        :param cache_store: (optional) a :class:`FileCacheStore` to share the cache across processes
+
+        :param bank_accounts_ttl: (optional) seconds `fetch_bank_accounts` serves its cached
+            response, defaults to five minutes, None disables the cache
+
+        :param retry_policy: (optional) a :class:`RetryPolicy`, `RetryPolicy(max_retries=0)`
+            disables retries
+
+        :param circuit_breakers: (optional) a :class:`CircuitBreakers` with per-endpoint settings
+
+        :param rate_limiter: (optional) a :class:`RateLimiter` with per-endpoint token buckets
+
+        :param timeout: (optional) `(connect, read)` seconds for each request attempt,
+            defaults to `(5, 30)`
+
+        :param hedge_policy: (optional) a :class:`HedgePolicy` to hedge `fetch_banks`
+            and `fetch_bank_accounts`
+
+        :param instrumentation: (optional) an :class:`Instrumentation`, such as a
+            :class:`MetricsCollector`, called around every API call
+
+        :param journal: (optional) a :class:`Journal` recording every `cash_in` and
+            `cash_out` before and after it is sent
+
+        :param base_url: (optional) API root, such as the url of an :class:`Emulator`,
+            defaults to `https://devapi.traxionpay.com`
+
+        :param response_models: (optional) return :class:`Bank`, :class:`BankAccount`,
+            :class:`OtpResult` and :class:`Payout` models, decoded lazily, instead of dicts
+
+        Use it as an async context manager or await `close` to release connections.
+    """
+
+    def __init__(self, secret_key=None, api_key=None,
+                 limit=100, limit_per_host=0, keepalive_timeout=15,
+                 banks_ttl=3600, cache_store=None,
+                 bank_accounts_ttl=300, retry_policy=None, circuit_breakers=None,
+                 rate_limiter=None, timeout=DEFAULT_TIMEOUT, hedge_policy=None,
+                 instrumentation=None, journal=None, base_url=None,
+                 response_models=False):
+        super(AsyncTraxionPay, self).__init__(secret_key=secret_key, api_key=api_key,
+                                              banks_ttl=banks_ttl, cache_store=cache_store,
+                                              bank_accounts_ttl=bank_accounts_ttl,
+                                              retry_policy=retry_policy,
+                                              circuit_breakers=circuit_breakers,
+                                              rate_limiter=rate_limiter,
+                                              instrumentation=instrumentation,
+                                              journal=journal,
+                                              base_url=base_url,
+                                              response_models=response_models)
+        self.limit = limit
+        self.limit_per_host = limit_per_host
+        self.keepalive_timeout = keepalive_timeout
+        self.timeout = timeout
+        self.hedge_policy = hedge_policy
+        self.single_flight = AsyncSingleFlight()
+        self._session = None
+
+    def _get_session(self):
+        if self._session is None or self._session.closed:
+            try:
+                import aiohttp
+            except ImportError:
+                raise ImportError('AsyncTraxionPay requires aiohttp, '
+                                  'install it with `pip install txnpay[async]`')
+            connector = aiohttp.TCPConnector(limit=self.limit,
+                                             limit_per_host=self.limit_per_host,
+                                             keepalive_timeout=self.keepalive_timeout)
+            self._session = aiohttp.ClientSession(connector=connector)
+        return self._session
+
+    def _json(self, text, model, many=False):
+        if self.response_models:
+            return self._models(text, model, many)
+        return json.loads(text)
+
+    async def _json_pages(self, endpoint, response, text, model, headers, timeout, deadline):
+        """Async :meth:`TraxionPay._json_pages`."""
+        from urllib.parse import urljoin
+
+        from .streaming import next_link, read_page
+
+        records = []
+        seen = set()
+        while True:
+            page, next_url = read_page(text.encode(), self._model_class(model))
+            if page is None and not seen:
+                return None
+            records.extend(page or ())
+            next_url = next_url or next_link(response.headers.get('Link'))
+            if not next_url:
+                return records
+            url = urljoin(str(response.url), next_url)
+            if url in seen:
+                raise APIResponseError('pagination loops back to {}'.format(url))
+            seen.add(url)
+            response, text = await self._request(endpoint, 'GET', idempotent=True,
+                                                 timeout=timeout, deadline=deadline, url=url,
+                                                 headers=headers)
+
+    async def _request(self, endpoint, method, idempotent=False, timeout=None, deadline=None,
+                       url=None, stream=False, **kwargs):
+        """Sends a request to `endpoint`, returning the response and its body text.
+
+        Retries, circuit breaking, timeouts and deadlines follow :meth:`TraxionPay._request`.
+        With `stream`, a successful response is returned unread, with None as its
+        text, and must be released by the caller.
+        """
+        self._encode_json(kwargs)
+        record = self._start_call(endpoint, method, kwargs)
+        if record is None:
+            return await self._attempt(endpoint, method, idempotent, timeout, deadline, None,
+                                       kwargs, url, stream)
+        try:
+            response, text = await self._attempt(endpoint, method, idempotent, timeout,
+                                                 deadline, record, kwargs, url, stream)
+        except Exception as exc:
+            self._finish_call(record, error=exc)
+            raise
+        self._finish_call(record, response_bytes=len(text.encode()) if text is not None else 0)
+        return response, text
+
+    async def _attempt(self, endpoint, method, idempotent, timeout, deadline, record, kwargs,
+                       url=None, stream=False):
+        import aiohttp
+
+        session = self._get_session()
+        if url is None:
+            url = '{}{}'.format(self.base_url or BASE_URL, ENDPOINT_PATHS[endpoint])
+        policy = self.retry_policy
+        limiter = self.rate_limiter
+        breaker = self.circuit_breakers.get(endpoint)
+        timeout = timeout if timeout is not None else self.timeout
+        deadline = Deadline(deadline)
+        hedge = (self.hedge_policy is not None and idempotent and method == 'GET'
+                 and not stream)
+        attempt = 0
+        while True:
+            if breaker is not None:
+                breaker.before_call(endpoint)
+            try:
+                if limiter is not None:
+                    wait = limiter.reserve(endpoint)
+                    if wait > 0:
+                        deadline.check(wait)
+                        await asyncio.sleep(wait)
+                        if record is not None:
+                            record.add('wait', wait)
+                connect, read = deadline.clamp(timeout) or (None, None)
+            except BaseException:
+                # nothing was sent, a half-open circuit lets the next call try
+                if breaker is not None:
+                    breaker.release()
+                raise
+
+            client_timeout = aiohttp.ClientTimeout(sock_connect=connect, sock_read=read)
+
+            async def send():
+                if stream:
+                    response = await session.request(method, url, timeout=client_timeout,
+                                                     **kwargs)
+                    if response.status < 400:
+                        return response, None
+                    async with response:
+                        return response, await response.text()
+                async with session.request(method, url, timeout=client_timeout,
+                                           **kwargs) as response:
+                    return response, await response.text()
+
+            error = response = text = retry_after = None
+            started = time.perf_counter()
+            try:
+                if hedge:
+                    response, text = await self.hedge_policy.call_async(endpoint, send)
+                else:
+                    response, text = await send()
+            except (aiohttp.ClientError, asyncio.TimeoutError) as exc:
+                error = exc
+            except Exception:
+                if breaker is not None:
+                    breaker.record_failure()
+                raise
+            except BaseException:
+                # cancelled, a half-open circuit lets the next call try
+                if breaker is not None:
+                    breaker.release()
+                raise
+            if record is not None:
+                record.add('send', time.perf_counter() - started)
+                if response is not None:
+                    record.status = response.status
+            failed = error is not None or response.status in policy.retry_statuses
+            if response is not None and response.status == 429:
+                retry_after = parse_retry_after(response.headers.get('Retry-After'))
+                if limiter is not None:
+                    limiter.throttled(endpoint, retry_after)
+
+            if breaker is not None:
+                if failed:
+                    breaker.record_failure()
+                else:
+                    breaker.record_success()
+            if (failed or retry_after is not None) and idempotent and attempt < policy.max_retries:
+                if retry_after is None:
+                    delay = policy.backoff(attempt)
+                else:
+                    delay = retry_after if limiter is None else 0
+                deadline.check(delay)
+                await asyncio.sleep(delay)
+                attempt += 1
+                if record is not None:
+                    record.add('wait', delay)
+                    record.retries = attempt
+                continue
+            if error is not None:
+                raise error
+            if response.status >= 400:
+                raise APIResponseError(text)
+            return response, text
+
+    async def close(self):
+        """Closes pooled connections held by this client."""
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        await self.close()
+
+    async def cash_in(self,
+                      merchant_id=None,
+                      merchant_ref_no=None,
+                      description=None,
+                      amount=None,
+                      currency=None,
+                      merchant_additional_data=None,
+                      payment_method=None,
+                      status_notification_url=None,
+                      success_page_url=None,
+                      failure_page_url=None,
+                      cancel_page_url=None,
+                      pending_page_url=None,
+                      timeout=None,
+                      deadline=None,
+                      **billing_details):
+        """Awaitable :meth:`TraxionPay.cash_in`.
+
+            POST `https://devapi.traxionpay.com/payform-link`
+        """
+        payload = self._build_cash_in_payload(merchant_id=merchant_id,
+                                              merchant_ref_no=merchant_ref_no,
+                                              description=description,
+                                              amount=amount,
+                                              currency=currency,
+                                              merchant_additional_data=merchant_additional_data,
+                                              payment_method=payment_method,
+                                              status_notification_url=status_notification_url,
+                                              success_page_url=success_page_url,
+                                              failure_page_url=failure_page_url,
+                                              cancel_page_url=cancel_page_url,
+                                              pending_page_url=pending_page_url,
+                                              **billing_details)
+
+        return await self._post_cash_in(payload, timeout, deadline, merchant_ref_no, amount)
+
+
+    async def _post_cash_in(self, payload, timeout, deadline, merchant_ref_no, amount):
+        async def send():
+            response, _ = await self._request('payform-link', 'POST', idempotent=True,
+                                              timeout=timeout, deadline=deadline,
+                                              headers=self.FORM_HEADERS, data=payload)
+            return str(response.url)
+
+        return await self._journaled('cash_in', merchant_ref_no, {'amount': amount}, send)
+
+
+    async def _journaled(self, op, key, data, send):
+        """Awaitable :meth:`BaseTraxionPay._journaled`; waiting for fsync happens off the loop."""
+        journal = self.journal
+        if journal is None:
+            return await send()
+        key = self._journal_key(op, key)
+        result = journal.result(op, key)
+        if result is not None:
+            # nothing is sent, so the phases of its payload must not reach the next call
+            take_phases()
+            return result
+        sequence = journal.intent(op, key, wait=False, **data)
+        if journal.sync_intents:
+            await asyncio.get_running_loop().run_in_executor(None, journal.wait, sequence)
+        try:
+            result = await send()
+        except Exception as exc:
+            journal.outcome(op, key, error=exc)
+            raise
+        journal.outcome(op, key, result=result)
+        return result
+
+
+    async def fetch_banks(self, refresh=False, timeout=None, deadline=None):
+        """Awaitable :meth:`TraxionPay.fetch_banks`.
+
+        GET `https://devapi.traxionpay.com/banks/`
+
+        :param refresh: (optional) bypass the cache and fetch a fresh list
+        """
+        if not refresh:
+            entry = self.banks_cache.get(self.BANKS_CACHE_KEY)
+            if entry is not None and entry.fresh:
+                return entry.value
+
+        return await self.single_flight.do(
+            'banks', lambda: self._load_banks(refresh, timeout, deadline))
+
+
+    async def _load_banks(self, refresh, timeout, deadline):
+        entry = None if refresh else self.banks_cache.get(self.BANKS_CACHE_KEY)
+        if entry is not None and entry.fresh:
+            return entry.value
+
+        headers = entry.conditional_headers() if entry is not None else None
+        response, text = await self._request('banks', 'GET', idempotent=True,
+                                             timeout=timeout, deadline=deadline,
+                                             headers=headers)
+
+        if entry is not None and response.status == 304:
+            return self.banks_cache.revalidated(self.BANKS_CACHE_KEY, entry)
+        from .streaming import is_paged
+        banks = None
+        if is_paged(text.encode(), response.headers):
+            banks = await self._json_pages('banks', response, text, 'Bank', None, timeout,
+                                           deadline)
+        if banks is not None:
+            # validators of the first page do not cover the others
+            self._store_banks(banks, {})
+        else:
+            banks = self._json(text, 'Bank', many=True)
+            self._store_banks(banks, response.headers)
+        return banks
+
+
+    def iter_banks(self, timeout=None, deadline=None, chunk_size=65536):
+        """Async iterator counterpart of :meth:`TraxionPay.iter_banks`.
+
+        GET `https://devapi.traxionpay.com/banks/`
+        """
+        return self._iter_records('banks', 'Bank', None, timeout, deadline, chunk_size)
+
+
+    async def bank_directory(self, refresh=False):
+        """Awaitable :meth:`TraxionPay.bank_directory`.
+
+        :param refresh: (optional) bypass the `fetch_banks` cache
+        """
+        return self._update_bank_directory(await self.fetch_banks(refresh=refresh))
+
+
+    async def fetch_bank_accounts(self, refresh=False, timeout=None, deadline=None):
+        """Awaitable :meth:`TraxionPay.fetch_bank_accounts`.
+
+        GET `https://devapi.traxionpay.com/payout/bank-account/`
+
+        :param refresh: (optional) bypass the cache and fetch a fresh list
+        """
+        if not refresh:
+            bank_accounts = self.bank_accounts_cache.get()
+            if bank_accounts is not None:
+                return bank_accounts
+
+        return await self.single_flight.do(
+            'bank-account', lambda: self._load_bank_accounts(refresh, timeout, deadline))
+
+
+    async def _load_bank_accounts(self, refresh, timeout, deadline):
+        if not refresh:
+            bank_accounts = self.bank_accounts_cache.get()
+            if bank_accounts is not None:
+                return bank_accounts
+
+        try:
+            headers = self.auth_headers
+        except AttributeError:
+            raise MissingAuthenticationError()
+
+        response, text = await self._request('bank-account', 'GET', idempotent=True,
+                                             timeout=timeout, deadline=deadline,
+                                             headers=headers)
+        from .streaming import is_paged
+        bank_accounts = None
+        if is_paged(text.encode(), response.headers):
+            bank_accounts = await self._json_pages('bank-account', response, text,
+                                                   'BankAccount', headers, timeout, deadline)
+        if bank_accounts is None:
+            bank_accounts = self._json(text, 'BankAccount', many=True)
+        self.bank_accounts_cache.set(bank_accounts)
+        return bank_accounts
+
+
+    def iter_bank_accounts(self, timeout=None, deadline=None, chunk_size=65536):
+        """Async iterator counterpart of :meth:`TraxionPay.iter_bank_accounts`.
+
+        GET `https://devapi.traxionpay.com/payout/bank-account/`
+        """
+        try:
+            headers = self.auth_headers
+        except AttributeError:
+            raise MissingAuthenticationError()
+        return self._iter_records('bank-account', 'BankAccount', headers, timeout, deadline,
+                                  chunk_size)
+
+
+    async def _iter_records(self, endpoint, model, headers, timeout, deadline, chunk_size):
+        from urllib.parse import urljoin
+
+        from .streaming import RecordParser, next_link
+
+        url = None
+        seen = set()
+        while True:
+            response, _ = await self._request(endpoint, 'GET', idempotent=True,
+                                              timeout=timeout, deadline=deadline, url=url,
+                                              stream=True, headers=headers)
+            parser = RecordParser(record=self._model_class(model))
+            try:
+                async for chunk in response.content.iter_chunked(chunk_size):
+                    for record in parser.feed(chunk):
+                        yield record
+                parser.close()
+            finally:
+                response.release()
+
+            next_url = parser.page.get('next') or next_link(response.headers.get('Link'))
+            if not next_url:
+                return
+            url = urljoin(str(response.url), next_url)
+            if url in seen:
+                raise APIResponseError('pagination loops back to {}'.format(url))
+            seen.add(url)
+
+
+    async def get_bank_account(self, bank_account_id=None, account_number=None, refresh=False):
+        """Awaitable :meth:`TraxionPay.get_bank_account`."""
+        if bank_account_id is None and account_number is None:
+            raise ValueError('bank_account_id or account_number must be given')
+        accounts = await self.fetch_bank_accounts(refresh=refresh)
+        return self._find_bank_account(accounts, bank_account_id, account_number)
+
+
+    async def link_bank_account(self, bank_code=None, bank_type=None,
+                                account_number=None, account_name=None,
+                                timeout=None, deadline=None):
+        """Awaitable :meth:`TraxionPay.link_bank_account`.
+
+        POST `https://devapi.traxionpay.com/payout/bank-account/`
+        """
+        try:
+            headers = self.auth_headers
+        except AttributeError:
+            raise MissingAuthenticationError()
+        payload = self._build_link_bank_account_payload(bank_code=bank_code,
+                                                        bank_type=bank_type,
+                                                        account_number=account_number,
+                                                        account_name=account_name)
+
+        _, text = await self._request('bank-account', 'POST', timeout=timeout, deadline=deadline,
+                                      headers=headers, json=payload)
+        bank_account = self._json(text, 'BankAccount')
+        self.bank_accounts_cache.add(bank_account)
+        return bank_account
+
+
+    async def fetch_otp(self, timeout=None, deadline=None):
+        """Awaitable :meth:`TraxionPay.fetch_otp`.
+
+        POST `https://devapi.traxionpay.com/bank-payout/get-otp/`
+        """
+        try:
+            headers = self.auth_headers
+        except AttributeError:
+            raise MissingAuthenticationError()
+
+        _, text = await self._request('get-otp', 'POST', timeout=timeout, deadline=deadline,
+                                      headers=headers)
+        return self._json(text, 'OtpResult')
+
+
+    async def cash_out(self, otp=None, amount=None, bank_account=None, idempotency_key=None,
+                       timeout=None, deadline=None):
+        """Awaitable :meth:`TraxionPay.cash_out`.
+
+        POST `https://devapi.traxionpay.com/payout/bank-payout/`
+        """
+        try:
+            headers = self._payout_headers(idempotency_key)
+        except AttributeError:
+            raise MissingAuthenticationError()
+        payload = self._build_cash_out_payload(otp=otp, amount=amount, bank_account=bank_account)
+
+        async def send():
+            _, text = await self._request('payout', 'POST',
+                                          idempotent=self._retry_payout(idempotency_key),
+                                          timeout=timeout, deadline=deadline,
+                                          headers=headers,
+                                          json=payload)
+            return self._json(text, 'Payout')
+
+        return await self._journaled('cash_out', idempotency_key,
+                                     {'amount': amount, 'bank_account': bank_account}, send)
+
+
+    def cash_in_many(self, specs, concurrency=100, ordered=True):
+        """Async-iterable :meth:`TraxionPay.cash_in_many`.
+
+        :param specs: iterable of `cash_in` keyword-argument dicts
+
+        :param concurrency: (optional) number of requests in flight, defaults to 100
+
+        :param ordered: (optional) yield in input order, otherwise as completed
+        """
+        return run_batch_async(self.cash_in, specs, concurrency=concurrency, ordered=ordered)
+
+
+    def cash_out_many(self, specs, concurrency=100, ordered=True):
+        """Async-iterable :meth:`TraxionPay.cash_out_many`.
+
+        :param specs: iterable of `cash_out` keyword-argument dicts
+
+        :param concurrency: (optional) number of requests in flight, defaults to 100
+
+        :param ordered: (optional) yield in input order, otherwise as completed
+        """
+        return run_batch_async(self.cash_out, specs, concurrency=concurrency, ordered=ordered)
@@ -0,0 +1,50 @@
+"""Indexed bank directory built from `fetch_banks`"""
+import bisect
+
+
+class BankDirectory():
+    """Banks from `fetch_banks` indexed for lookups by code and by name prefix.
+
+        Lookups by code are dict lookups; name searches bisect a sorted,
+        case-folded name index, so both stay fast for any number of banks.
+
+        :param banks: list of bank dicts as returned by `fetch_banks`
+    """
+
+    def __init__(self, banks):
+        self.banks = banks
+        self._by_code = {str(bank['code']): bank for bank in banks}
+        ordered = sorted(banks, key=lambda bank: bank['name'].casefold())
+        self._names = [bank['name'].casefold() for bank in ordered]
+        self._ordered = ordered
+
+    def __len__(self):
+        return len(self.banks)
+
+    def __iter__(self):
+        return iter(self.banks)
+
+    def __contains__(self, code):
+        return str(code) in self._by_code
+
+    def get(self, code, default=None):
+        """Returns the bank with `code`, or `default` when there is none."""
+        return self._by_code.get(str(code), default)
+
+    def search(self, prefix, limit=None):
+        """Returns banks whose name starts with `prefix`, case-insensitively, sorted by name.
+
+            :param prefix: beginning of the bank name
+
+            :param limit: (optional) maximum number of banks to return
+        """
+        prefix = prefix.casefold()
+        start = bisect.bisect_left(self._names, prefix)
+        matches = []
+        for index in range(start, len(self._names)):
+            if not self._names[index].startswith(prefix):
+                break
+            if limit is not None and len(matches) >= limit:
+                break
+            matches.append(self._ordered[index])
+        return matches
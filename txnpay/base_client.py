@@ -0,0 +1,255 @@
+"""
+Base traxionpay module containing request validation and signing shared by clients
+"""
+from .accounts import BankAccountCache, find_account
+from .banks import BankDirectory
+from .cache import ResponseCache
+from .exceptions import MissingAuthenticationError
+from .metrics import CallRecord, PhaseTimer, body_size, take_phases
+from .retry import RetryPolicy, CircuitBreakers
+from .serializer import FORM_CONTENT_TYPE, get_serializer
+from .schema import CASH_IN_SCHEMA, LINK_BANK_ACCOUNT_SCHEMA, CASH_OUT_SCHEMA
+from .signing import Signer
+from .templates import CashInTemplate
+from .utils import generate_token
+
+
+class BaseTraxionPay():
+    """Holds credentials and builds validated, signed payloads for TraxionPay clients.
+
+        Transport-specific clients (:class:`TraxionPay`, :class:`AsyncTraxionPay`)
+        subclass this and only implement how requests are sent.
+
+        :param api_key:
+
+        :param secret_key:
+
+        :param banks_ttl: (optional) seconds `fetch_banks` serves its cached response,
+            defaults to an hour, None disables the cache
+
+        :param cache_store: (optional) a :class:`FileCacheStore` to share the cache across processes
+
+        :param bank_accounts_ttl: (optional) seconds `fetch_bank_accounts` serves its cached
+            response, defaults to five minutes, None disables the cache
+
+        :param retry_policy: (optional) a :class:`RetryPolicy`, `RetryPolicy(max_retries=0)`
+            disables retries
+
+        :param circuit_breakers: (optional) a :class:`CircuitBreakers` with per-endpoint settings
+
+        :param rate_limiter: (optional) a :class:`RateLimiter` with per-endpoint token buckets
+
+        :param instrumentation: (optional) an :class:`Instrumentation`, such as a
+            :class:`MetricsCollector`, called around every API call
+
+        :param journal: (optional) a :class:`Journal` recording every `cash_in` and
+            `cash_out` before and after it is sent
+
+        :param base_url: (optional) API root, defaults to `https://devapi.traxionpay.com`
+
+        :param response_models: (optional) return lazily decoded models instead of dicts
+    """
+    BANKS_CACHE_KEY = 'banks'
+    FORM_HEADERS = {'Content-Type': FORM_CONTENT_TYPE}
+
+    def __init__(self, secret_key=None, api_key=None, banks_ttl=3600, cache_store=None,
+                 bank_accounts_ttl=300, retry_policy=None, circuit_breakers=None,
+                 rate_limiter=None, instrumentation=None, journal=None, base_url=None,
+                 response_models=False):
+        self.base_url = base_url.rstrip('/') if base_url else None
+        self.response_models = response_models
+        self.rate_limiter = rate_limiter
+        self.instrumentation = instrumentation
+        self.journal = journal
+        self.retry_policy = retry_policy if retry_policy is not None else RetryPolicy()
+        self.circuit_breakers = (circuit_breakers if circuit_breakers is not None
+                                 else CircuitBreakers())
+        self.banks_cache = ResponseCache(banks_ttl, store=cache_store)
+        self.bank_accounts_cache = BankAccountCache(ttl=bank_accounts_ttl)
+        self._bank_directory = None
+        try:
+            self.secret_key = secret_key
+            self.api_key = api_key
+            self.token = generate_token(secret_key=secret_key)
+            self.signer = Signer(secret_key, api_key)
+            self.auth_headers = {
+                'Authorization': 'Basic {}'.format(self.token),
+                'Content-Type': 'application/json'
+            }
+        except:
+            raise ValueError('Secret key and API key cannot be null')
+
+    @staticmethod
+    def _models(body, model, many=False):
+        """Returns the JSON `body` as lazily decoded instances of the `model` class named."""
+        from . import models
+        model = getattr(models, model)
+        return model.list_from_json(body) if many else model.from_json(body)
+
+    def _model_class(self, model):
+        """Returns the `model` class named when `response_models` is set, otherwise None."""
+        if not self.response_models:
+            return None
+        from . import models
+        return getattr(models, model)
+
+    def _build_cash_in_payload(self, **fields):
+        """Validates and signs `cash_in` arguments, returning the url-encoded form body."""
+        timer = PhaseTimer() if self.instrumentation is not None else None
+        payform_data = CASH_IN_SCHEMA.validate(fields)
+        if timer is not None:
+            timer.mark('validate')
+
+        signer = self.signer
+        if signer.auth_hash is None:
+            raise MissingAuthenticationError('api_key is required to sign cash_in requests')
+        payform_data['secure_hash'] = signer.secure_hash(payform_data['merchant_ref_no'],
+                                                         payform_data['amount'],
+                                                         payform_data['description'])
+        payform_data['auth_hash'] = signer.auth_hash
+        payform_data['alg'] = signer.alg
+        if timer is not None:
+            timer.mark('sign')
+
+        body = get_serializer().form_body('form_data', payform_data)
+        if timer is not None:
+            timer.mark('encode')
+            timer.stash()
+        return body
+
+    def prepare_cash_in(self, **constant_fields):
+        """Binds `cash_in` arguments shared by every payment, returning a :class:`CashInTemplate`.
+
+            The bound fields are validated and serialized once; calling the template
+            with the remaining arguments sends a payment like `cash_in` would.
+            `merchant_ref_no`, `amount` and `description` cannot be bound.
+
+            :param constant_fields: e.g. `merchant_id`, `currency`, `payment_method`,
+                `billing_country` and the notification and page urls
+        """
+        return CashInTemplate(self, **constant_fields)
+
+    def _update_bank_directory(self, banks):
+        """Returns the :class:`BankDirectory` for `banks`, rebuilt only when the list changed."""
+        directory = self._bank_directory
+        if directory is None or directory.banks is not banks:
+            directory = BankDirectory(banks)
+            self._bank_directory = directory
+        return directory
+
+    def _store_banks(self, banks, headers):
+        """Caches a fetched bank list, rebuilding the bank directory from it once loaded."""
+        self.banks_cache.store_response(self.BANKS_CACHE_KEY, banks, headers)
+        if self._bank_directory is not None:
+            self._update_bank_directory(banks)
+
+    def _build_link_bank_account_payload(self, **fields):
+        """Validates `link_bank_account` arguments, returning the json payload.
+
+        Once a bank directory has been loaded, unknown bank codes are rejected locally.
+        """
+        timer = PhaseTimer() if self.instrumentation is not None else None
+        payload = LINK_BANK_ACCOUNT_SCHEMA.validate(fields)
+
+        directory = self._bank_directory
+        if directory is not None and payload['bank'] not in directory:
+            raise ValueError('bank_code {} is not a known bank'.format(payload['bank']))
+        if timer is not None:
+            timer.mark('validate')
+            timer.stash()
+        return payload
+
+    def _find_bank_account(self, accounts, bank_account_id, account_number):
+        """Looks the account up in the cache's index when it holds `accounts`, otherwise
+        searches `accounts`, e.g. when the cache is disabled."""
+        cache = self.bank_accounts_cache
+        if cache.get() is accounts:
+            return cache.find(bank_account_id=bank_account_id, account_number=account_number)
+        return find_account(accounts, bank_account_id=bank_account_id,
+                            account_number=account_number)
+
+    def invalidate_bank_accounts(self):
+        """Drops the cached `fetch_bank_accounts` response."""
+        self.bank_accounts_cache.invalidate()
+
+    def _payout_headers(self, idempotency_key=None):
+        """Auth headers for `cash_out`, with the idempotency key when given."""
+        if idempotency_key is None:
+            return self.auth_headers
+        headers = dict(self.auth_headers)
+        headers['Idempotency-Key'] = str(idempotency_key)
+        return headers
+
+    def _retry_payout(self, idempotency_key):
+        """Whether a `cash_out` may be retried, see `RetryPolicy.retry_payouts`."""
+        return idempotency_key is not None and self.retry_policy.retry_payouts
+
+    def _build_cash_out_payload(self, **fields):
+        """Validates `cash_out` arguments, returning the json payload."""
+        timer = PhaseTimer() if self.instrumentation is not None else None
+        payload = CASH_OUT_SCHEMA.validate(fields)
+        if timer is not None:
+            timer.mark('validate')
+            timer.stash()
+        return payload
+
+    @staticmethod
+    def _journal_key(op, key):
+        """Journal key of an operation; payouts without an idempotency key get a unique one."""
+        if key is None and op == 'cash_out':
+            import uuid
+            return uuid.uuid4().hex
+        return key
+
+    def _journaled(self, op, key, data, send):
+        """Returns `send()`, recording it in the journal when the client has one.
+
+            An operation the journal already records as done is not sent again.
+        """
+        journal = self.journal
+        if journal is None:
+            return send()
+        key = self._journal_key(op, key)
+        result = journal.result(op, key)
+        if result is not None:
+            # nothing is sent, so the phases of its payload must not reach the next call
+            take_phases()
+            return result
+        journal.intent(op, key, **data)
+        try:
+            result = send()
+        except Exception as exc:
+            journal.outcome(op, key, error=exc)
+            raise
+        journal.outcome(op, key, result=result)
+        return result
+
+    @staticmethod
+    def _encode_json(kwargs):
+        """Replaces a `json` request argument with its encoded bytes as `data`.
+
+            Every transport then sends the same compact body, and `request_bytes`
+            counts the bytes actually sent.
+        """
+        payload = kwargs.pop('json', None)
+        if payload is None:
+            return
+        headers = dict(kwargs.get('headers') or {})
+        headers['Content-Type'] = 'application/json'
+        kwargs['headers'] = headers
+        kwargs['data'] = get_serializer().dumps(payload)
+
+    def _start_call(self, endpoint, method, kwargs):
+        """Returns the :class:`CallRecord` of a call, or None when not instrumented."""
+        if self.instrumentation is None:
+            return None
+        record = CallRecord(endpoint, method, phases=take_phases(),
+                            request_bytes=body_size(kwargs))
+        self.instrumentation.before_call(record)
+        return record
+
+    def _finish_call(self, record, error=None, response_bytes=0):
+        record.error = error
+        record.response_bytes = response_bytes
+        record.finish()
+        self.instrumentation.after_call(record)
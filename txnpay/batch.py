@@ -0,0 +1,132 @@
+"""Bounded-concurrency batch execution for traxionpay clients"""
+import collections
+
+
+class BatchResult():
+    """Outcome of a single item in a batch call.
+
+        :param index: position of the item in the input iterable
+
+        :param spec: the keyword arguments the item was called with
+
+        :param value: the return value of the call, None if it failed
+
+        :param error: the exception raised by the call, None if it succeeded
+    """
+    __slots__ = ('index', 'spec', 'value', 'error')
+
+    def __init__(self, index, spec, value=None, error=None):
+        self.index = index
+        self.spec = spec
+        self.value = value
+        self.error = error
+
+    @property
+    def ok(self):
+        """True when the call succeeded."""
+        return self.error is None
+
+    def __repr__(self):
+        if self.ok:
+            return '<BatchResult #{} ok>'.format(self.index)
+        return '<BatchResult #{} {!r}>'.format(self.index, self.error)
+
+
+def _call(func, index, spec):
+    try:
+        return BatchResult(index, spec, value=func(**spec))
+    except Exception as error:
+        return BatchResult(index, spec, error=error)
+
+
+def run_batch(func, specs, workers=8, ordered=True):
+    """Calls `func(**spec)` for every spec on a thread pool, yielding :class:`BatchResult`.
+
+        At most `workers` calls run at once and only a bounded window of specs is
+        read ahead, so `specs` may be an arbitrarily long generator.
+
+        :param func: the client method to call
+
+        :param specs: iterable of keyword-argument dicts
+
+        :param workers: number of concurrent calls
+
+        :param ordered: yield results in input order, otherwise as they complete
+    """
+    from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+    if workers < 1:
+        raise ValueError('workers must be greater than or equal to 1')
+
+    window = workers * 2
+    specs = enumerate(specs)
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        if ordered:
+            pending = collections.deque()
+            for index, spec in specs:
+                pending.append(executor.submit(_call, func, index, spec))
+                if len(pending) >= window:
+                    yield pending.popleft().result()
+            while pending:
+                yield pending.popleft().result()
+        else:
+            pending = set()
+            for index, spec in specs:
+                pending.add(executor.submit(_call, func, index, spec))
+                if len(pending) >= window:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        yield future.result()
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield future.result()
+
+
+async def _call_async(func, index, spec, semaphore):
+    async with semaphore:
+        try:
+            return BatchResult(index, spec, value=await func(**spec))
+        except Exception as error:
+            return BatchResult(index, spec, error=error)
+
+
+async def run_batch_async(func, specs, concurrency=100, ordered=True):
+    """Awaits `func(**spec)` for every spec, yielding :class:`BatchResult` asynchronously.
+
+        :param func: the coroutine client method to call
+
+        :param specs: iterable of keyword-argument dicts
+
+        :param concurrency: number of concurrent calls
+
+        :param ordered: yield results in input order, otherwise as they complete
+    """
+    import asyncio
+
+    if concurrency < 1:
+        raise ValueError('concurrency must be greater than or equal to 1')
+
+    semaphore = asyncio.Semaphore(concurrency)
+    window = concurrency * 2
+    specs = enumerate(specs)
+    if ordered:
+        pending = collections.deque()
+        for index, spec in specs:
+            pending.append(asyncio.ensure_future(_call_async(func, index, spec, semaphore)))
+            if len(pending) >= window:
+                yield await pending.popleft()
+        while pending:
+            yield await pending.popleft()
+    else:
+        pending = set()
+        for index, spec in specs:
+            pending.add(asyncio.ensure_future(_call_async(func, index, spec, semaphore)))
+            if len(pending) >= window:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    yield task.result()
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                yield task.result()
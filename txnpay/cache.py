@@ -0,0 +1,175 @@
+"""Response caching for traxionpay client"""
+import os
+import threading
+import time
+
+
+class CacheEntry():
+    """A cached response body with its validators.
+
+        :param value: decoded response body
+
+        :param expires_at: unix time after which the entry must be revalidated
+
+        :param etag: `ETag` response header, if any
+
+        :param last_modified: `Last-Modified` response header, if any
+    """
+
+    def __init__(self, value, expires_at, etag=None, last_modified=None):
+        self.value = value
+        self.expires_at = expires_at
+        self.etag = etag
+        self.last_modified = last_modified
+
+    @property
+    def fresh(self):
+        """True until the entry's TTL elapses."""
+        return time.time() < self.expires_at
+
+    def conditional_headers(self):
+        """Headers that let the server answer `304 Not Modified`."""
+        headers = {}
+        if self.etag is not None:
+            headers['If-None-Match'] = self.etag
+        if self.last_modified is not None:
+            headers['If-Modified-Since'] = self.last_modified
+        return headers
+
+    def to_dict(self):
+        return {'value': self.value, 'expires_at': self.expires_at,
+                'etag': self.etag, 'last_modified': self.last_modified}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data['value'], data['expires_at'],
+                   etag=data.get('etag'), last_modified=data.get('last_modified'))
+
+
+class MemoryCacheStore():
+    """Thread-safe in-process cache store."""
+
+    def __init__(self):
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            return self._entries.get(key)
+
+    def set(self, key, entry):
+        with self._lock:
+            self._entries[key] = entry
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+
+class FileCacheStore(MemoryCacheStore):
+    """Cache store persisted to a JSON file so new processes start warm.
+
+        Reads are served from memory and the file is reloaded only when its
+        modification time changes. Writes replace the file atomically.
+        Response models are written, and read back, as dicts.
+
+        :param path: location of the cache file
+    """
+
+    def __init__(self, path):
+        super(FileCacheStore, self).__init__()
+        self.path = path
+        self._mtime = None
+
+    def _reload(self):
+        import json
+
+        try:
+            mtime = os.stat(self.path).st_mtime
+        except OSError:
+            return
+        if mtime == self._mtime:
+            return
+        try:
+            with open(self.path) as cache_file:
+                data = json.load(cache_file)
+        except (OSError, ValueError):
+            return
+        self._entries = {key: CacheEntry.from_dict(entry) for key, entry in data.items()}
+        self._mtime = mtime
+
+    def _flush(self):
+        import json
+        import tempfile
+
+        from .models import to_json
+
+        directory = os.path.dirname(os.path.abspath(self.path))
+        handle, temp_path = tempfile.mkstemp(dir=directory, prefix='.txnpay-cache-')
+        try:
+            with os.fdopen(handle, 'w') as cache_file:
+                json.dump({key: entry.to_dict() for key, entry in self._entries.items()},
+                          cache_file, default=to_json)
+            os.replace(temp_path, self.path)
+        except BaseException:
+            os.unlink(temp_path)
+            raise
+        self._mtime = os.stat(self.path).st_mtime
+
+    def get(self, key):
+        with self._lock:
+            self._reload()
+            return self._entries.get(key)
+
+    def set(self, key, entry):
+        with self._lock:
+            self._reload()
+            self._entries[key] = entry
+            self._flush()
+
+    def delete(self, key):
+        with self._lock:
+            self._reload()
+            if self._entries.pop(key, None) is not None:
+                self._flush()
+
+
+class ResponseCache():
+    """TTL cache with conditional revalidation for read-only endpoints.
+
+        :param ttl: seconds a response is served without contacting the server,
+            None disables caching
+
+        :param store: (optional) a :class:`MemoryCacheStore` or :class:`FileCacheStore`
+    """
+
+    def __init__(self, ttl, store=None):
+        self.ttl = ttl
+        self.store = store if store is not None else MemoryCacheStore()
+
+    @property
+    def enabled(self):
+        return self.ttl is not None
+
+    def get(self, key):
+        if not self.enabled:
+            return None
+        return self.store.get(key)
+
+    def store_response(self, key, value, headers):
+        """Caches a `200` response body along with its validators."""
+        if not self.enabled:
+            return
+        self.store.set(key, CacheEntry(value, time.time() + self.ttl,
+                                       etag=headers.get('ETag'),
+                                       last_modified=headers.get('Last-Modified')))
+
+    def revalidated(self, key, entry):
+        """Extends the TTL of `entry` after a `304 Not Modified` and returns its value."""
+        entry = CacheEntry(entry.value, time.time() + self.ttl,
+                           etag=entry.etag, last_modified=entry.last_modified)
+        self.store.set(key, entry)
+        return entry.value
+
+    def invalidate(self, key):
+        self.store.delete(key)
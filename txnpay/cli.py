@@ -0,0 +1,406 @@
+"""Command line tools for traxionpay client
+
+    txnpay bulk-cash-in invoices.csv links.csv --field merchant_id=6328
+    txnpay emulate --port 8080 --merchant SECRET_KEY:API_KEY --latency 0.05
+"""
+import argparse
+import collections
+import csv
+import io
+import json
+import os
+import sys
+import time
+
+from .batch import run_batch
+
+OUTPUT_COLUMNS = ('row', 'merchant_ref_no', 'url', 'error')
+# CSV cells converted before validation; other cells are passed as strings
+CSV_CONVERTERS = {
+    'merchant_id': int,
+    'amount': float,
+    'merchant_additional_data': json.loads,
+}
+
+
+class InvalidRow(dict):
+    """Row of a JSONL line that is not a JSON object; converting it raises `error`."""
+
+    def __init__(self, error):
+        super(InvalidRow, self).__init__()
+        self.error = error
+
+
+def read_rows(path, input_format=None):
+    """Yields the rows of a CSV or JSONL file one at a time, `-` reads stdin.
+
+        A JSONL line that is not a JSON object is yielded as an :class:`InvalidRow`,
+        so it fails its own row rather than the whole file.
+
+        :param input_format: `csv` or `jsonl`, guessed from the file extension when None
+    """
+    if input_format is None:
+        input_format = 'jsonl' if path.endswith(('.jsonl', '.ndjson')) else 'csv'
+    handle = sys.stdin if path == '-' else open(path, newline='', encoding='utf-8')
+    try:
+        if input_format == 'csv':
+            for row in csv.DictReader(handle):
+                yield row
+        else:
+            for number, line in enumerate(handle, 1):
+                if line.strip():
+                    yield _json_row(number, line)
+    finally:
+        if handle is not sys.stdin:
+            handle.close()
+
+
+def _json_row(number, line):
+    try:
+        row = json.loads(line)
+    except ValueError as exc:
+        return InvalidRow(ValueError('line {} is not valid JSON: {}'.format(number, exc)))
+    if not isinstance(row, dict):
+        return InvalidRow(ValueError('line {} is not a JSON object'.format(number)))
+    return row
+
+
+def row_to_fields(row):
+    """Converts a CSV row to `cash_in` arguments; JSONL rows are already typed."""
+    if isinstance(row, InvalidRow):
+        raise row.error
+    fields = {}
+    for name, value in row.items():
+        if name is None or value is None or value == '':
+            continue
+        if isinstance(value, str) and name in CSV_CONVERTERS:
+            try:
+                value = CSV_CONVERTERS[name](value)
+            except ValueError:
+                raise ValueError('{} {!r} could not be parsed'.format(name, value))
+        fields[name] = value
+    return fields
+
+
+class BulkReport():
+    """Totals of a `bulk_cash_in` run."""
+
+    def __init__(self, resumed=0):
+        self.resumed = resumed
+        self.succeeded = 0
+        self.failed = 0
+        self.errors = {}
+        self.elapsed = 0.0
+
+    @property
+    def processed(self):
+        return self.succeeded + self.failed
+
+    @property
+    def throughput(self):
+        """Rows per second processed by this run."""
+        return self.processed / self.elapsed if self.elapsed > 0 else 0.0
+
+    @property
+    def error_rate(self):
+        return self.failed / self.processed if self.processed else 0.0
+
+    def add(self, result):
+        if result.ok:
+            self.succeeded += 1
+        else:
+            self.failed += 1
+            name = type(result.error).__name__
+            self.errors[name] = self.errors.get(name, 0) + 1
+
+    def summary(self):
+        lines = [
+            'processed {} rows in {:.1f}s ({:.1f} rows/s), {} resumed from checkpoint'.format(
+                self.processed, self.elapsed, self.throughput, self.resumed),
+            'succeeded {}, failed {} ({:.2%} errors)'.format(self.succeeded, self.failed,
+                                                             self.error_rate),
+        ]
+        for name, count in sorted(self.errors.items(), key=lambda item: -item[1]):
+            lines.append('  {}: {}'.format(name, count))
+        return '\n'.join(lines)
+
+
+def _read_checkpoint(path):
+    try:
+        with open(path) as checkpoint_file:
+            return json.load(checkpoint_file)
+    except (OSError, ValueError):
+        return None
+
+
+def _write_checkpoint(path, state):
+    temp_path = '{}.tmp'.format(path)
+    with open(temp_path, 'w') as checkpoint_file:
+        json.dump(state, checkpoint_file)
+    os.replace(temp_path, path)
+
+
+def _recover_output(output_path, checkpoint):
+    """Returns `(rows, offset)` of the complete rows already in the output.
+
+        Rows written after the last checkpoint are counted from the file itself,
+        and a row cut short by an interruption is dropped.
+    """
+    rows, offset = checkpoint['rows'], checkpoint['offset']
+    with open(output_path, 'rb') as output_file:
+        output_file.seek(offset)
+        for line in output_file:
+            if not line.endswith(b'\n'):
+                break
+            rows += 1
+            offset += len(line)
+    return rows, offset
+
+
+def _format_row(index, fields, result):
+    buffer = io.StringIO()
+    error = ''
+    if not result.ok:
+        # one line per row keeps the output countable when resuming
+        error = '{}: {}'.format(type(result.error).__name__,
+                                ' '.join(str(result.error).split()))
+    csv.writer(buffer, lineterminator='\n').writerow(
+        [index, fields.get('merchant_ref_no', ''), result.value or '', error])
+    return buffer.getvalue().encode('utf-8')
+
+
+def _succeeded_rows(output_path, offset):
+    """Returns `[(row, line)]` of the output rows up to `offset` that have no error."""
+    rows = []
+    with open(output_path, 'rb') as output_file:
+        output_file.readline()
+        while output_file.tell() < offset:
+            line = output_file.readline()
+            cells = next(csv.reader([line.decode('utf-8')]))
+            if not cells[-1]:
+                rows.append((int(cells[0]), line))
+    return rows
+
+
+def bulk_cash_in(client, input_path, output_path, input_format=None, concurrency=8,
+                 constant_fields=None, checkpoint_path=None, checkpoint_every=100,
+                 retry_failed=False):
+    """Generates a payform link for every row of a CSV or JSONL file.
+
+        Rows are streamed, validated with the `cash_in` schema and sent `concurrency`
+        at a time; the output CSV (`row,merchant_ref_no,url,error`) is written in
+        input order. Progress is checkpointed every `checkpoint_every` rows, and a
+        run restarted with the same output resumes after the last row written.
+        Rows written with an error count as done unless `retry_failed` is set.
+
+        :param client: a :class:`TraxionPay`
+
+        :param constant_fields: (optional) `cash_in` arguments shared by every row,
+            bound once with `prepare_cash_in`
+
+        :param checkpoint_path: (optional) defaults to `<output_path>.checkpoint`
+
+        :param retry_failed: (optional) when resuming, send the rows written with an
+            error again too; the output is rewritten in a temporary file that
+            replaces it once the run completes, so an interrupted retry leaves the
+            previous output as it was
+
+        Returns a :class:`BulkReport`.
+    """
+    if checkpoint_path is None:
+        checkpoint_path = '{}.checkpoint'.format(output_path)
+    pay = client.prepare_cash_in(**(constant_fields or {}))
+
+    header = (','.join(OUTPUT_COLUMNS) + '\n').encode()
+    checkpoint = None
+    if os.path.exists(output_path):
+        checkpoint = _read_checkpoint(checkpoint_path)
+        if checkpoint is None:
+            with open(output_path, 'rb') as output_file:
+                if output_file.readline() == header:
+                    checkpoint = {'input': input_path, 'rows': 0, 'offset': len(header)}
+        elif checkpoint.get('input') != input_path:
+            raise ValueError('{} is the checkpoint of {}, not {}'.format(
+                checkpoint_path, checkpoint.get('input'), input_path))
+    if checkpoint is not None:
+        done, offset = _recover_output(output_path, checkpoint)
+    else:
+        done, offset = 0, None
+    skip = done
+    # rows kept from the previous output when retrying its failed rows
+    kept = None
+    if retry_failed and offset is not None:
+        kept = collections.deque(_succeeded_rows(output_path, offset))
+        kept_rows = frozenset(index for index, _ in kept)
+    report = BulkReport(resumed=done if kept is None else len(kept))
+
+    def send(index, row):  # pylint: disable=unused-argument
+        return pay(**row_to_fields(row))
+
+    def specs():
+        for index, row in enumerate(read_rows(input_path, input_format)):
+            if index >= skip or (kept is not None and index not in kept_rows):
+                yield {'index': index, 'row': row}
+
+    started = time.monotonic()
+    if kept is not None:
+        target_path = '{}.tmp'.format(output_path)
+        offset = None
+    else:
+        target_path = output_path
+    with open(target_path, 'r+b' if offset is not None else 'wb') as output_file:
+        if offset is None:
+            output_file.write(header)
+        else:
+            output_file.seek(offset)
+            output_file.truncate()
+
+        def write_kept(before):
+            while kept and kept[0][0] < before:
+                output_file.write(kept.popleft()[1])
+
+        def save():
+            output_file.flush()
+            os.fsync(output_file.fileno())
+            _write_checkpoint(checkpoint_path, {'input': input_path, 'rows': done,
+                                                'offset': output_file.tell()})
+
+        try:
+            for result in run_batch(send, specs(), workers=concurrency):
+                index = result.spec['index']
+                if kept is not None:
+                    write_kept(index)
+                output_file.write(_format_row(index, result.spec['row'], result))
+                report.add(result)
+                done = max(done, index + 1)
+                if kept is None and report.processed % checkpoint_every == 0:
+                    save()
+            if kept is not None:
+                write_kept(done)
+                output_file.flush()
+                os.fsync(output_file.fileno())
+        finally:
+            if kept is None:
+                save()
+            report.elapsed = time.monotonic() - started
+
+    if kept is not None:
+        os.replace(target_path, output_path)
+        _write_checkpoint(checkpoint_path, {'input': input_path, 'rows': done,
+                                            'offset': os.path.getsize(output_path)})
+    return report
+
+
+def _parse_field(value):
+    name, separator, raw = value.partition('=')
+    if not separator:
+        raise argparse.ArgumentTypeError('expected NAME=VALUE, got {!r}'.format(value))
+    return name, raw
+
+
+def _parse_merchant(value):
+    secret_key, separator, api_key = value.partition(':')
+    if not separator:
+        raise argparse.ArgumentTypeError('expected SECRET_KEY:API_KEY, got {!r}'.format(value))
+    return secret_key, api_key
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog='txnpay', description='TraxionPay command line tools')
+    commands = parser.add_subparsers(dest='command')
+    commands.required = True
+
+    bulk = commands.add_parser('bulk-cash-in', help='generate payform links for a file of invoices')
+    bulk.add_argument('input', help='CSV or JSONL file of cash_in arguments, - for stdin')
+    bulk.add_argument('output', help='CSV file the links are written to')
+    bulk.add_argument('--format', choices=('csv', 'jsonl'), dest='input_format',
+                      help='input format, guessed from the extension by default')
+    bulk.add_argument('--concurrency', type=int, default=8,
+                      help='requests in flight (default: 8)')
+    bulk.add_argument('--field', type=_parse_field, action='append', default=[],
+                      metavar='NAME=VALUE', help='cash_in argument shared by every row')
+    bulk.add_argument('--checkpoint', help='checkpoint file (default: OUTPUT.checkpoint)')
+    bulk.add_argument('--checkpoint-every', type=int, default=100,
+                      help='rows between checkpoints (default: 100)')
+    bulk.add_argument('--retry-failed', action='store_true',
+                      help='when resuming, also send the rows that failed again')
+    bulk.add_argument('--secret-key', default=os.environ.get('TXNPAY_SECRET_KEY'),
+                      help='defaults to $TXNPAY_SECRET_KEY')
+    bulk.add_argument('--api-key', default=os.environ.get('TXNPAY_API_KEY'),
+                      help='defaults to $TXNPAY_API_KEY')
+    bulk.add_argument('--transport', choices=('requests', 'urllib3'), default='requests',
+                      help='HTTP library the client sends with (default: requests)')
+    bulk.add_argument('--base-url', default=os.environ.get('TXNPAY_BASE_URL'),
+                      help='API root, e.g. an emulator (default: $TXNPAY_BASE_URL or the '
+                           'TraxionPay API)')
+
+    emulate = commands.add_parser('emulate', help='serve a local emulator of the TraxionPay API')
+    emulate.add_argument('--host', default='127.0.0.1', help='default: 127.0.0.1')
+    emulate.add_argument('--port', type=int, default=8080, help='default: 8080')
+    emulate.add_argument('--merchant', type=_parse_merchant, action='append', default=[],
+                         metavar='SECRET_KEY:API_KEY', help='keys of a merchant to accept')
+    emulate.add_argument('--latency', type=float, help='median response latency in seconds')
+    emulate.add_argument('--error-rate', type=float, default=0.0,
+                         help='fraction of requests answered with a 5xx')
+    emulate.add_argument('--reset-rate', type=float, default=0.0,
+                         help='fraction of connections closed without a response')
+    emulate.add_argument('--throttle-rate', type=float,
+                         help='requests per second accepted before answering 429')
+    emulate.add_argument('--seed', type=int, help='seed of the random faults')
+    emulate.add_argument('--page-size', type=int,
+                         help='paginate the bank and bank account lists by this many records')
+    return parser
+
+
+def emulate(args):
+    """Serves an :class:`Emulator` until interrupted."""
+    from .emulator import Emulator, Faults, lognormal_latency
+
+    faults = Faults(latency=lognormal_latency(args.latency) if args.latency else None,
+                    error_rate=args.error_rate, reset_rate=args.reset_rate,
+                    throttle_rate=args.throttle_rate)
+    emulator = Emulator(merchants=dict(args.merchant), host=args.host, port=args.port,
+                        faults=faults, seed=args.seed, page_size=args.page_size)
+    with emulator:
+        sys.stderr.write('txnpay: emulating the TraxionPay API at {}\n'.format(emulator.url))
+        try:
+            while True:
+                time.sleep(3600)
+        except KeyboardInterrupt:
+            pass
+    return 0
+
+
+def main(argv=None):
+    """Entry point of the `txnpay` command."""
+    from .traxionpay_client import TraxionPay
+
+    args = build_parser().parse_args(argv)
+    if args.command == 'emulate':
+        return emulate(args)
+    if not args.secret_key or not args.api_key:
+        sys.stderr.write('txnpay: --secret-key and --api-key (or $TXNPAY_SECRET_KEY and '
+                         '$TXNPAY_API_KEY) are required\n')
+        return 2
+
+    constant_fields = row_to_fields(dict(args.field))
+    with TraxionPay(secret_key=args.secret_key, api_key=args.api_key,
+                    pool_maxsize=args.concurrency, base_url=args.base_url,
+                    transport=args.transport) as client:
+        try:
+            report = bulk_cash_in(client, args.input, args.output,
+                                  input_format=args.input_format,
+                                  concurrency=args.concurrency,
+                                  constant_fields=constant_fields,
+                                  checkpoint_path=args.checkpoint,
+                                  checkpoint_every=args.checkpoint_every,
+                                  retry_failed=args.retry_failed)
+        except KeyboardInterrupt:
+            sys.stderr.write('txnpay: interrupted, run again to resume\n')
+            return 130
+    sys.stderr.write(report.summary() + '\n')
+    return 1 if report.failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
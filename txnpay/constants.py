@@ -1 +1,10 @@
-BASE_URL = 'https://devapi.traxionpay.com'
\ No newline at end of file
+BASE_URL = 'https://devapi.traxionpay.com'
+
+# endpoint names mapped to their paths
+ENDPOINT_PATHS = {
+    'payform-link': '/payform-link',
+    'banks': '/banks/',
+    'bank-account': '/payout/bank-account/',
+    'get-otp': '/payout/bank-payout/get-otp/',
+    'payout': '/payout/bank-payout/',
+}
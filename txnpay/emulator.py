@@ -0,0 +1,479 @@
+"""In-process TraxionPay API emulator with latency and fault injection
+
+    with Emulator(merchants={secret_key: api_key}) as emulator:
+        client = TraxionPay(secret_key=secret_key, api_key=api_key, base_url=emulator.url)
+"""
+import base64
+import binascii
+import hashlib
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl
+
+from .constants import ENDPOINT_PATHS
+from .signing import ALGORITHM, Signer
+from .utils import generate_token
+
+DEFAULT_BANKS = [
+    {'code': '161311', 'name': 'Bank of the Philippine Islands'},
+    {'code': '161312', 'name': 'BDO Unibank'},
+    {'code': '161313', 'name': 'Metropolitan Bank and Trust Company'},
+    {'code': '161333', 'name': 'Land Bank of the Philippines'},
+    {'code': '161334', 'name': 'Security Bank'},
+]
+CASH_IN_REQUIRED = ('merchant_id', 'merchant_ref_no', 'description', 'amount',
+                    'merchant_additional_data', 'auth_hash', 'secure_hash', 'alg')
+LINK_BANK_ACCOUNT_REQUIRED = ('bank', 'bank_type', 'account_number', 'account_name')
+CASH_OUT_REQUIRED = ('OTP', 'amount', 'bank_account')
+PAYFORM_PATH = '/payform/'
+
+# request path -> endpoint name, the names used by `Faults` and `requests`
+_ENDPOINTS = {path: endpoint for endpoint, path in ENDPOINT_PATHS.items()}
+
+
+def uniform_latency(low, high):
+    """Latency drawn uniformly between `low` and `high` seconds."""
+    return lambda rng: rng.uniform(low, high)
+
+
+def lognormal_latency(median, sigma=0.5):
+    """Long-tailed latency around `median` seconds; a `sigma` of 0.5 puts p99 near 3.2x it."""
+    import math
+
+    mu = math.log(median)
+    return lambda rng: rng.lognormvariate(mu, sigma)
+
+
+class Faults():
+    """Latency and failures injected into the responses of one endpoint, or all of them.
+
+        Throttling is checked first, then connection resets, then errors; every
+        request that is answered is delayed by `latency`.
+
+        :param latency: (optional) seconds, or a callable taking a `random.Random` and
+            returning seconds, such as :func:`lognormal_latency`
+
+        :param error_rate: (optional) fraction of requests answered with an error status
+
+        :param error_statuses: (optional) statuses errors are drawn from
+
+        :param reset_rate: (optional) fraction of requests whose connection is closed
+            without a response
+
+        :param throttle_rate: (optional) requests per second accepted before answering
+            `429 Too Many Requests`
+
+        :param throttle_burst: (optional) requests accepted at once, defaults to `throttle_rate`
+    """
+
+    def __init__(self, latency=None, error_rate=0.0, error_statuses=(500, 502, 503),
+                 reset_rate=0.0, throttle_rate=None, throttle_burst=None):
+        self.latency = latency
+        self.error_rate = error_rate
+        self.error_statuses = tuple(error_statuses)
+        self.reset_rate = reset_rate
+        self.throttle_rate = throttle_rate
+        self.throttle_burst = float(throttle_burst if throttle_burst is not None
+                                    else throttle_rate or 0)
+        self._tokens = self.throttle_burst
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def delay(self, rng):
+        if self.latency is None:
+            return 0.0
+        if callable(self.latency):
+            return max(0.0, self.latency(rng))
+        return self.latency
+
+    def retry_after(self):
+        """Takes a request from the throttle, returning seconds to wait when there is none."""
+        if self.throttle_rate is None:
+            return None
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.throttle_burst,
+                               self._tokens + (now - self._updated) * self.throttle_rate)
+            self._updated = now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return None
+            return (1 - self._tokens) / self.throttle_rate
+
+
+class _Merchant():
+    """Credentials and server-side state of one merchant."""
+
+    def __init__(self, secret_key, api_key):
+        self.signer = Signer(secret_key, api_key)
+        self.token = generate_token(secret_key=secret_key)
+        self.bank_accounts = []
+        self.otps = set()
+        self.payouts = {}
+
+
+class Emulator():
+    """Local HTTP server answering the TraxionPay endpoints, for offline and load tests.
+
+        Runs in a background thread; point a client at it with `base_url=emulator.url`.
+        Requests are checked like the service checks them: `cash_in` payloads must
+        carry the `auth_hash` of a known merchant and a `secure_hash` signed with
+        its secret key, and the payout endpoints require the merchant's `Basic`
+        authorization. Payform links are idempotent on `merchant_ref_no`, OTPs are
+        single use, and payouts with an `Idempotency-Key` are answered once.
+
+        Each endpoint may be given :class:`Faults` to add latency, errors,
+        connection resets and throttling. `requests` counts responses by
+        `(endpoint, status)`.
+
+        :param merchants: (optional) mapping of `secret_key` to `api_key`
+
+        :param host: (optional) interface to listen on, defaults to localhost
+
+        :param port: (optional) port to listen on, 0 picks a free one
+
+        :param faults: (optional) :class:`Faults` applied to every endpoint
+
+        :param banks: (optional) list of bank dicts served by `/banks/`
+
+        :param seed: (optional) seed of the random draws, for repeatable runs
+
+        :param page_size: (optional) paginate `/banks/` and the bank accounts list,
+            answering `{"count", "next", "previous", "results"}` pages of this
+            many records selected with `?page=`; None answers plain arrays
+    """
+
+    def __init__(self, merchants=None, host='127.0.0.1', port=0, faults=None, banks=None,
+                 seed=None, page_size=None):
+        self.host = host
+        self.page_size = page_size
+        self.port = port
+        self.banks = list(banks if banks is not None else DEFAULT_BANKS)
+        self.random = random.Random(seed)
+        self.requests = {}
+        self._faults = {None: faults} if faults is not None else {}
+        self._merchants_by_hash = {}
+        self._merchants_by_token = {}
+        self._links = {}
+        self._next_id = 1
+        self._lock = threading.Lock()
+        self._server = None
+        self._thread = None
+        for secret_key, api_key in (merchants or {}).items():
+            self.add_merchant(secret_key, api_key)
+
+    def add_merchant(self, secret_key, api_key, bank_accounts=None):
+        """Registers a merchant's keys.
+
+            :param bank_accounts: (optional) bank account dicts already linked, such
+                as a large list to read back with `iter_bank_accounts`
+        """
+        merchant = _Merchant(secret_key, api_key)
+        merchant.bank_accounts.extend(bank_accounts or ())
+        with self._lock:
+            self._merchants_by_hash[merchant.signer.auth_hash] = merchant
+            self._merchants_by_token[merchant.token] = merchant
+
+    def set_faults(self, faults, endpoint=None):
+        """Sets the :class:`Faults` of `endpoint` (a name of `ENDPOINT_PATHS`), or of all
+            endpoints without their own when None; `faults=None` removes them."""
+        if endpoint is not None and endpoint not in ENDPOINT_PATHS:
+            raise ValueError('{} is not an endpoint'.format(endpoint))
+        with self._lock:
+            if faults is None:
+                self._faults.pop(endpoint, None)
+            else:
+                self._faults[endpoint] = faults
+
+    @property
+    def url(self):
+        """Base url of the running server, to pass as a client's `base_url`."""
+        if self._server is None:
+            raise RuntimeError('emulator is not running')
+        return 'http://{}:{}'.format(*self._server.server_address[:2])
+
+    def start(self):
+        """Starts serving in a background thread and returns the emulator."""
+        class Server(ThreadingHTTPServer):
+            daemon_threads = True
+            request_queue_size = 1024
+
+        handler = type('EmulatorHandler', (_Handler,), {'emulator': self})
+        self._server = Server((self.host, self.port), handler)
+        self._thread = threading.Thread(target=self._server.serve_forever, args=(0.05,),
+                                        name='txnpay-emulator', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """Stops the server and closes its socket."""
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._thread.join()
+            self._server = None
+            self._thread = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *args):
+        self.stop()
+
+    def count(self, endpoint, status):
+        """Adds a response to `requests`."""
+        key = (endpoint, status)
+        with self._lock:
+            self.requests[key] = self.requests.get(key, 0) + 1
+
+    def _new_id(self):
+        with self._lock:
+            new_id = self._next_id
+            self._next_id += 1
+            return new_id
+
+    def faults_for(self, endpoint):
+        faults = self._faults
+        return faults.get(endpoint) or faults.get(None)
+
+    def authenticate(self, headers):
+        """Returns the merchant of a `Basic` authorization header, or None."""
+        scheme, _, token = (headers.get('Authorization') or '').partition(' ')
+        if scheme != 'Basic':
+            return None
+        return self._merchants_by_token.get(token.strip())
+
+    def handle(self, method, path, headers, body):
+        """Answers a request, returning `(status, headers, body)`."""
+        path, _, query = path.partition('?')
+        if path.startswith(PAYFORM_PATH) and method == 'GET':
+            return self.payform_page(path[len(PAYFORM_PATH):])
+        endpoint = _ENDPOINTS.get(path)
+        routes = {
+            ('payform-link', 'POST'): self.payform_link,
+            ('banks', 'GET'): self.fetch_banks,
+            ('bank-account', 'GET'): self.fetch_bank_accounts,
+            ('bank-account', 'POST'): self.link_bank_account,
+            ('get-otp', 'POST'): self.fetch_otp,
+            ('payout', 'POST'): self.payout,
+        }
+        route = routes.get((endpoint, method))
+        if route is None:
+            return _error(404 if endpoint is None else 405, 'no route for {} {}'.format(
+                method, path))
+        if method == 'GET':
+            return route(headers, body, query)
+        return route(headers, body)
+
+    def payform_link(self, headers, body):
+        form = dict(parse_qsl(body.decode('utf-8', 'replace')))
+        try:
+            payform = json.loads(base64.b64decode(form['form_data']).decode('utf-8'))
+        except (KeyError, ValueError, binascii.Error):
+            return _error(400, 'form_data must be base64 encoded JSON')
+        if not isinstance(payform, dict):
+            return _error(400, 'form_data must be an object')
+        missing = [name for name in CASH_IN_REQUIRED if payform.get(name) is None]
+        if missing:
+            return _error(400, 'missing {}'.format(', '.join(missing)))
+        if payform['alg'] != ALGORITHM:
+            return _error(400, 'unsupported alg {}'.format(payform['alg']))
+
+        merchant = self._merchants_by_hash.get(payform['auth_hash'])
+        if merchant is None:
+            return _error(401, 'invalid auth_hash')
+        # signed the way the client signs it, see `Signer.secure_hash`
+        message = '{}{}{}{}'.format(payform['merchant_ref_no'], payform['amount'], 'PHP',
+                                    payform['description'])
+        if not merchant.signer.verify(message, payform['secure_hash']):
+            return _error(401, 'invalid secure_hash')
+
+        link = hashlib.sha256('{}:{}'.format(merchant.token, payform['merchant_ref_no'])
+                              .encode()).hexdigest()[:32]
+        with self._lock:
+            self._links.setdefault(link, payform)
+        return 302, {'Location': '{}{}{}'.format(self.url, PAYFORM_PATH, link)}, b''
+
+    def payform_page(self, link):
+        payform = self._links.get(link)
+        if payform is None:
+            return _error(404, 'unknown payform')
+        page = '<html><body>Pay {} {} for {}</body></html>'.format(
+            payform.get('currency', 'PHP'), payform['amount'], payform['merchant_ref_no'])
+        return 200, {'Content-Type': 'text/html; charset=utf-8'}, page.encode()
+
+    def paginate(self, endpoint, records, query):
+        """Returns the `?page=` page of `records` when paginating, otherwise `records`."""
+        if not self.page_size:
+            return records
+        try:
+            page = int(dict(parse_qsl(query)).get('page', 1))
+        except ValueError:
+            page = 0
+        if page < 1:
+            raise ValueError('invalid page')
+        start = (page - 1) * self.page_size
+        link = '{}{}?page={{}}'.format(self.url, ENDPOINT_PATHS[endpoint])
+        return {
+            'count': len(records),
+            'next': link.format(page + 1) if start + self.page_size < len(records) else None,
+            'previous': link.format(page - 1) if page > 1 else None,
+            'results': records[start:start + self.page_size],
+        }
+
+    def fetch_banks(self, headers, body, query=''):
+        try:
+            banks = self.paginate('banks', self.banks, query)
+        except ValueError:
+            return _error(404, 'invalid page')
+        payload = json.dumps(banks).encode()
+        etag = '"{}"'.format(hashlib.sha1(payload).hexdigest())
+        if headers.get('If-None-Match') == etag:
+            return 304, {'ETag': etag}, b''
+        return 200, {'Content-Type': 'application/json', 'ETag': etag}, payload
+
+    def fetch_bank_accounts(self, headers, body, query=''):
+        merchant = self.authenticate(headers)
+        if merchant is None:
+            return _error(401, 'invalid credentials')
+        with self._lock:
+            bank_accounts = list(merchant.bank_accounts)
+        try:
+            return _json(200, self.paginate('bank-account', bank_accounts, query))
+        except ValueError:
+            return _error(404, 'invalid page')
+
+    def link_bank_account(self, headers, body):
+        merchant = self.authenticate(headers)
+        if merchant is None:
+            return _error(401, 'invalid credentials')
+        payload, error = _parse_json(body, LINK_BANK_ACCOUNT_REQUIRED)
+        if error is not None:
+            return error
+        if str(payload['bank']) not in set(str(bank['code']) for bank in self.banks):
+            return _error(400, 'unknown bank {}'.format(payload['bank']))
+        if payload['bank_type'] not in ('savings', 'checkings'):
+            return _error(400, 'bank_type must either be "checkings" or "savings"')
+        account = {'id': self._new_id(), 'bank': payload['bank'],
+                   'bank_type': payload['bank_type'],
+                   'account_number': payload['account_number'],
+                   'account_name': payload['account_name']}
+        with self._lock:
+            merchant.bank_accounts.append(account)
+        return _json(201, account)
+
+    def fetch_otp(self, headers, body):
+        merchant = self.authenticate(headers)
+        if merchant is None:
+            return _error(401, 'invalid credentials')
+        code = '{:08X}'.format(self.random.getrandbits(32))
+        with self._lock:
+            merchant.otps.add(code)
+        return _json(200, {'code': code})
+
+    def payout(self, headers, body):
+        merchant = self.authenticate(headers)
+        if merchant is None:
+            return _error(401, 'invalid credentials')
+        key = headers.get('Idempotency-Key')
+        with self._lock:
+            if key is not None and key in merchant.payouts:
+                return merchant.payouts[key]
+        payload, error = _parse_json(body, CASH_OUT_REQUIRED)
+        if error is not None:
+            return error
+
+        with self._lock:
+            accounts = set(account['id'] for account in merchant.bank_accounts)
+            if payload['OTP'] not in merchant.otps:
+                response = _error(400, 'invalid otp')
+            elif payload['bank_account'] not in accounts:
+                response = _error(400, 'unknown bank_account {}'.format(payload['bank_account']))
+            elif not isinstance(payload['amount'], (int, float)) or payload['amount'] <= 0:
+                response = _error(400, 'amount must be positive')
+            else:
+                merchant.otps.discard(payload['OTP'])
+                response = _json(200, {'id': self._next_id, 'amount': payload['amount'],
+                                       'bank_account': payload['bank_account'],
+                                       'status': 'processing'})
+                self._next_id += 1
+            if key is not None:
+                merchant.payouts[key] = response
+        return response
+
+
+def _json(status, payload):
+    return status, {'Content-Type': 'application/json'}, json.dumps(payload).encode()
+
+
+def _error(status, message):
+    return _json(status, {'detail': message})
+
+
+def _parse_json(body, required):
+    """Returns `(payload, None)`, or `(None, error response)`."""
+    try:
+        payload = json.loads(body.decode('utf-8'))
+    except ValueError:
+        return None, _error(400, 'body must be JSON')
+    if not isinstance(payload, dict):
+        return None, _error(400, 'body must be an object')
+    missing = [name for name in required if payload.get(name) is None]
+    if missing:
+        return None, _error(400, 'missing {}'.format(', '.join(missing)))
+    return payload, None
+
+
+class _Handler(BaseHTTPRequestHandler):
+    """Keep-alive request handler forwarding to `emulator.handle` with faults applied."""
+    protocol_version = 'HTTP/1.1'
+    # headers and body are written separately, Nagle would hold the body back
+    disable_nagle_algorithm = True
+    emulator = None
+
+    def log_message(self, *args):  # pylint: disable=arguments-differ
+        pass
+
+    def _serve(self):
+        emulator = self.emulator
+        length = int(self.headers.get('Content-Length') or 0)
+        body = self.rfile.read(length) if length else b''
+        path = self.path.split('?', 1)[0]
+        endpoint = _ENDPOINTS.get(path, 'payform' if path.startswith(PAYFORM_PATH) else None)
+
+        faults = emulator.faults_for(endpoint)
+        response = None
+        if faults is not None:
+            rng = emulator.random
+            retry_after = faults.retry_after()
+            if retry_after is not None:
+                status, headers, payload = _error(429, 'too many requests')
+                headers['Retry-After'] = '{:.3f}'.format(retry_after)
+                response = status, headers, payload
+            elif faults.reset_rate and rng.random() < faults.reset_rate:
+                emulator.count(endpoint, 'reset')
+                self.close_connection = True
+                return
+            elif faults.error_rate and rng.random() < faults.error_rate:
+                response = _error(rng.choice(faults.error_statuses), 'injected error')
+            delay = faults.delay(rng)
+            if delay:
+                time.sleep(delay)
+        if response is None:
+            response = emulator.handle(self.command, self.path, self.headers, body)
+
+        status, headers, payload = response
+        emulator.count(endpoint, status)
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        if payload:
+            self.wfile.write(payload)
+
+    do_GET = _serve
+    do_POST = _serve
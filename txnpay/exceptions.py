@@ -5,4 +5,16 @@ class MissingAuthenticationError(TraxionPayError):
   pass
 
 class APIResponseError(TraxionPayError):
+  pass
+
+class InvalidNotificationError(TraxionPayError):
+  pass
+
+class InvalidSignatureError(InvalidNotificationError):
+  pass
+
+class CircuitOpenError(TraxionPayError):
+  pass
+
+class DeadlineExceededError(TraxionPayError):
   pass
\ No newline at end of file
@@ -0,0 +1,188 @@
+"""Write-ahead journal of `cash_in` and `cash_out` operations"""
+import json
+import os
+import threading
+import time
+
+from .exceptions import APIResponseError
+from .models import to_json
+
+
+class Journal():
+    """Append-only JSON lines file recording each operation before and after it is sent.
+
+        Every `cash_in` and `cash_out` of a client with a journal is written as an
+        `intent` before the request goes out and as `done`, `failed` (the API
+        answered with an error) or `unknown` (no answer, e.g. a timeout) afterwards.
+        Operations are keyed by `merchant_ref_no` for `cash_in` and by
+        `idempotency_key` for `cash_out`; a `cash_in` already `done` is answered
+        from the journal without calling the API again.
+
+        Records are written to the file as they happen, so they survive a crash
+        of the process. A background thread fsyncs them in group commits: one
+        `fsync` covers every record written since the previous one, which keeps
+        the cost per call in microseconds. With `sync_intents`, a call also waits
+        for its intent to be fsynced before sending, which survives a crash of
+        the machine at the cost of waiting for the next group commit.
+
+        On open, the file is replayed into an index of the latest record of each
+        operation, and a record cut short by a crash is discarded.
+
+        :param path: location of the journal file
+
+        :param commit_interval: (optional) seconds a group commit waits for more records
+
+        :param sync_intents: (optional) wait for intents to be fsynced before sending
+    """
+    INTENT = 'intent'
+    DONE = 'done'
+    FAILED = 'failed'
+    UNKNOWN = 'unknown'
+
+    def __init__(self, path, commit_interval=0.002, sync_intents=False):
+        self.path = path
+        self.commit_interval = commit_interval
+        self.sync_intents = sync_intents
+        self._index = {}
+        self._cond = threading.Condition()
+        self._written = 0
+        self._synced = 0
+        self._closed = False
+        self._thread = None
+        self._dumps = json.JSONEncoder(separators=(',', ':'), default=to_json).encode
+        self._fd = self._open()
+
+    def _open(self):
+        """Replays the file into the index and opens it for appending."""
+        valid = 0
+        try:
+            with open(self.path, 'rb') as journal_file:
+                for line in journal_file:
+                    if not line.endswith(b'\n'):
+                        break
+                    try:
+                        entry = json.loads(line.decode('utf-8'))
+                    except ValueError:
+                        break
+                    self._apply(entry)
+                    valid += len(line)
+        except OSError:
+            pass
+
+        fd = os.open(self.path, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o600)
+        if os.fstat(fd).st_size > valid:
+            os.ftruncate(fd, valid)
+        return fd
+
+    def record(self, op, key, state, **data):
+        """Appends a record and returns its sequence number for `wait`."""
+        entry = {'op': op, 'key': key, 'state': state, 'ts': time.time()}
+        entry.update(data)
+        line = (self._dumps(entry) + '\n').encode('utf-8')
+        with self._cond:
+            if self._closed:
+                raise ValueError('journal is closed')
+            view = memoryview(line)
+            while view:
+                view = view[os.write(self._fd, view):]
+            self._written += 1
+            sequence = self._written
+            self._apply(entry)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._commit_loop,
+                                                name='txnpay-journal', daemon=True)
+                self._thread.start()
+            self._cond.notify_all()
+        return sequence
+
+    def _apply(self, entry):
+        """Merges a record into the index, keeping the intent's fields with the outcome."""
+        index_key = (entry['op'], entry['key'])
+        previous = self._index.get(index_key)
+        if previous is not None:
+            merged = dict(previous)
+            merged.pop('error', None)
+            merged.update(entry)
+            entry = merged
+        self._index[index_key] = entry
+
+    def intent(self, op, key, wait=True, **data):
+        """Records that `op` is about to be sent, waiting for fsync with `sync_intents`."""
+        sequence = self.record(op, key, self.INTENT, **data)
+        if wait and self.sync_intents:
+            self.wait(sequence)
+        return sequence
+
+    def outcome(self, op, key, result=None, error=None):
+        """Records the result of `op`, or the exception it raised."""
+        if error is None:
+            return self.record(op, key, self.DONE, result=result)
+        state = self.FAILED if isinstance(error, APIResponseError) else self.UNKNOWN
+        return self.record(op, key, state,
+                           error='{}: {}'.format(type(error).__name__, error))
+
+    def _commit_loop(self):
+        while True:
+            with self._cond:
+                while self._synced >= self._written and not self._closed:
+                    self._cond.wait()
+                if self._synced >= self._written:
+                    return
+            if self.commit_interval:
+                # let concurrent callers join this commit
+                time.sleep(self.commit_interval)
+            with self._cond:
+                target = self._written
+            os.fsync(self._fd)
+            with self._cond:
+                self._synced = max(self._synced, target)
+                self._cond.notify_all()
+
+    def wait(self, sequence=None, timeout=None):
+        """Blocks until record `sequence` (default: every record so far) is fsynced."""
+        with self._cond:
+            if sequence is None:
+                sequence = self._written
+            return self._cond.wait_for(lambda: self._synced >= sequence, timeout)
+
+    def get(self, op, key):
+        """Returns the latest state of an operation merged with its intent, or None."""
+        return self._index.get((op, key))
+
+    def result(self, op, key):
+        """Returns the recorded result of an operation that is `done`, or None."""
+        entry = self._index.get((op, key))
+        if entry is not None and entry['state'] == self.DONE:
+            return entry['result']
+        return None
+
+    def unresolved(self):
+        """Returns the latest records of operations whose outcome is not known.
+
+            These are intents with no outcome, from a crash between sending and
+            recording, and `unknown` outcomes; reconcile them before resending
+            operations that are not idempotent.
+        """
+        return [entry for entry in self._index.values()
+                if entry['state'] in (self.INTENT, self.UNKNOWN)]
+
+    def close(self):
+        """Fsyncs outstanding records and closes the file."""
+        with self._cond:
+            if self._closed:
+                return
+            self._closed = True
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join()
+        os.fsync(self._fd)
+        os.close(self._fd)
+        with self._cond:
+            self._synced = self._written
+            self._cond.notify_all()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
@@ -0,0 +1,133 @@
+"""Per-merchant clients for platforms sending payments on behalf of many sub-merchants"""
+import collections
+import threading
+
+from .cache import MemoryCacheStore
+from .retry import CircuitBreakers, RetryPolicy
+from .traxionpay_client import TraxionPay
+from .transport import make_transport
+
+
+class MerchantRegistry():
+    """Hands out a :class:`TraxionPay` per sub-merchant, all sharing one connection pool.
+
+        Each merchant's client holds only its signing state, auth headers and
+        bank accounts cache; the session pool, retry policy, circuit breakers and
+        banks cache are shared, so open connections do not grow with the number
+        of merchants. The `max_clients` most recently used clients are kept and
+        the least recently used one is dropped when another merchant is added;
+        it is created again from its credentials on its next use.
+
+        Clients handed out by the registry should not be closed, as closing one
+        closes the shared pool; close the registry instead. Clients it drops are
+        released, stopping their own threads.
+
+        :param credentials: mapping of merchant id to `(secret_key, api_key)`, or a
+            callable taking a merchant id and returning them
+
+        :param max_clients: (optional) number of merchant clients kept, defaults to 256
+
+        :param session_pool: (optional) a :class:`SessionPool` or other :class:`Transport`
+            shared by every merchant
+
+        :param pool_maxsize: (optional) maximum number of keep-alive connections of the
+            shared pool when `session_pool` is not given
+
+        :param transport: (optional) name of the shared transport created when
+            `session_pool` is not given, `requests` or `urllib3`
+
+        :param client_options: (optional) other :class:`TraxionPay` arguments, passed to
+            every merchant's client; a `journal` is rejected, as its entries are keyed
+            by `merchant_ref_no`, which merchants may reuse
+    """
+
+    def __init__(self, credentials, max_clients=256, session_pool=None, pool_maxsize=10,
+                 transport=None, **client_options):
+        if max_clients < 1:
+            raise ValueError('max_clients must be at least 1')
+        if 'journal' in client_options:
+            raise ValueError('a journal cannot be shared by merchants')
+        self.credentials = credentials
+        self.max_clients = max_clients
+        self.session_pool = make_transport(session_pool if session_pool is not None
+                                           else transport, pool_maxsize=pool_maxsize)
+        client_options.setdefault('retry_policy', RetryPolicy())
+        client_options.setdefault('circuit_breakers', CircuitBreakers())
+        client_options.setdefault('cache_store', MemoryCacheStore())
+        self.client_options = client_options
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._clients = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def _lookup(self, merchant):
+        if callable(self.credentials):
+            credentials = self.credentials(merchant)
+        else:
+            credentials = self.credentials.get(merchant)
+        if credentials is None:
+            raise KeyError('no credentials for merchant {!r}'.format(merchant))
+        return credentials
+
+    def get(self, merchant):
+        """Returns the client of `merchant`, creating it from its credentials if needed."""
+        with self._lock:
+            client = self._clients.get(merchant)
+            if client is not None:
+                self._clients.move_to_end(merchant)
+                self.hits += 1
+                return client
+
+        # looked up outside the lock, credentials may come from a slow secret store
+        secret_key, api_key = self._lookup(merchant)
+        client = TraxionPay(secret_key=secret_key, api_key=api_key,
+                            session_pool=self.session_pool, **self.client_options)
+
+        with self._lock:
+            existing = self._clients.get(merchant)
+            if existing is not None:
+                self._clients.move_to_end(merchant)
+                self.hits += 1
+                return existing
+            self.misses += 1
+            self._clients[merchant] = client
+            while len(self._clients) > self.max_clients:
+                self._clients.popitem(last=False)[1].release()
+                self.evictions += 1
+        return client
+
+    __getitem__ = get
+
+    def invalidate(self, merchant):
+        """Drops the client of `merchant`, e.g. after its keys were rotated."""
+        with self._lock:
+            client = self._clients.pop(merchant, None)
+        if client is not None:
+            client.release()
+
+    def stats(self):
+        with self._lock:
+            return {'clients': len(self._clients), 'hits': self.hits,
+                    'misses': self.misses, 'evictions': self.evictions}
+
+    def __len__(self):
+        return len(self._clients)
+
+    def __contains__(self, merchant):
+        return merchant in self._clients
+
+    def close(self):
+        """Drops every client and closes the shared pool's connections."""
+        with self._lock:
+            clients = list(self._clients.values())
+            self._clients.clear()
+        for client in clients:
+            client.release()
+        self.session_pool.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
@@ -0,0 +1,262 @@
+"""Instrumentation hooks and an in-process metrics aggregator for traxionpay clients"""
+import bisect
+import threading
+import time
+
+try:
+    import contextvars
+except ImportError:
+    # python < 3.7, where asyncio tasks of one thread share the stashed phases
+    contextvars = None
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class _ThreadPhases(threading.local):
+    """Thread-local stand-in for the `contextvars.ContextVar` of older pythons."""
+    value = None
+
+    def get(self):
+        return self.value
+
+    def set(self, value):
+        self.value = value
+
+
+# phase timings of the payload being built in the current thread or task
+if contextvars is not None:
+    _pending_phases = contextvars.ContextVar('txnpay_pending_phases', default=None)
+else:
+    _pending_phases = _ThreadPhases()
+
+
+class PhaseTimer():
+    """Measures consecutive phases of building a payload.
+
+        `stash` hands the timings to the next request sent from the same thread
+        or task, where they become part of its :class:`CallRecord`.
+    """
+
+    def __init__(self):
+        self.phases = {}
+        self._last = time.perf_counter()
+
+    def mark(self, phase):
+        """Ends `phase`, which started when the previous phase ended."""
+        now = time.perf_counter()
+        self.phases[phase] = now - self._last
+        self._last = now
+
+    def stash(self):
+        _pending_phases.set(self.phases)
+
+
+def take_phases():
+    """Returns and clears the phase timings stashed by the current thread or task."""
+    phases = _pending_phases.get()
+    if phases is None:
+        return {}
+    _pending_phases.set(None)
+    return phases
+
+
+def body_size(kwargs):
+    """Bytes of the request body described by the `data` request argument."""
+    try:
+        from urllib.parse import urlencode
+    except ImportError:
+        from urllib import urlencode
+
+    data = kwargs.get('data')
+    if data is None:
+        return 0
+    if isinstance(data, dict):
+        data = urlencode(data)
+    return len(data.encode() if isinstance(data, str) else data)
+
+
+class CallRecord():
+    """Measurements of one API call, retries included.
+
+        `phases` maps phase names to seconds: `validate`, `sign` and `encode` while
+        building the payload, `wait` for rate-limit and backoff sleeps, `send` for
+        time spent in the HTTP client and `server` for the part of it until the
+        response headers arrived (sync client only), so `send - server` is mostly
+        connection setup and transfer.
+    """
+    __slots__ = ('endpoint', 'method', 'status', 'error', 'retries', 'request_bytes',
+                 'response_bytes', 'phases', 'started', 'duration')
+
+    def __init__(self, endpoint, method, phases=None, request_bytes=0):
+        self.endpoint = endpoint
+        self.method = method
+        self.status = None
+        self.error = None
+        self.retries = 0
+        self.request_bytes = request_bytes
+        self.response_bytes = 0
+        self.phases = phases if phases is not None else {}
+        self.started = time.perf_counter()
+        self.duration = None
+
+    def add(self, phase, seconds):
+        self.phases[phase] = self.phases.get(phase, 0.0) + seconds
+
+    def finish(self):
+        self.duration = time.perf_counter() - self.started
+
+
+class Instrumentation():
+    """Hooks called around every API call; subclass and override what you need.
+
+        Pass an instance as the `instrumentation` argument of a client.
+        Hooks run on the calling thread or task, so they should be quick.
+    """
+
+    def before_call(self, record):
+        """Called with a fresh :class:`CallRecord` before the first attempt."""
+
+    def after_call(self, record):
+        """Called with the completed :class:`CallRecord`, also when the call raised."""
+
+
+class Histogram():
+    """Cumulative latency histogram with fixed bucket bounds."""
+    __slots__ = ('bounds', 'counts', 'sum', 'count')
+
+    def __init__(self, bounds=DEFAULT_BUCKETS):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self):
+        """Yields `(upper bound, observations at or below it)`, ending with `+Inf`."""
+        total = 0
+        for bound, count in zip(self.bounds + (float('inf'),), self.counts):
+            total += count
+            yield bound, total
+
+
+def _format_labels(labels):
+    return ','.join('{}="{}"'.format(name, str(value).replace('\\', '\\\\').replace('"', '\\"'))
+                    for name, value in labels)
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class MetricsCollector(Instrumentation):
+    """Aggregates call records into counters and latency histograms.
+
+        `render` returns the metrics in the Prometheus text exposition format,
+        ready to be served from a `/metrics` handler.
+
+        :param buckets: (optional) histogram bucket upper bounds in seconds
+
+        :param namespace: (optional) prefix of every metric name
+    """
+
+    def __init__(self, buckets=DEFAULT_BUCKETS, namespace='txnpay'):
+        self.buckets = tuple(buckets)
+        self.namespace = namespace
+        self.requests = {}
+        self.errors = {}
+        self.retries = {}
+        self.request_bytes = {}
+        self.response_bytes = {}
+        self.in_flight = {}
+        self.durations = {}
+        self.phase_durations = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _increment(counter, key, amount=1):
+        counter[key] = counter.get(key, 0) + amount
+
+    def _observe(self, histograms, key, value):
+        histogram = histograms.get(key)
+        if histogram is None:
+            histogram = histograms[key] = Histogram(self.buckets)
+        histogram.observe(value)
+
+    def before_call(self, record):
+        with self._lock:
+            self._increment(self.in_flight, record.endpoint)
+
+    def after_call(self, record):
+        endpoint = record.endpoint
+        with self._lock:
+            self._increment(self.in_flight, endpoint, -1)
+            status = record.status if record.status is not None else 'none'
+            self._increment(self.requests, (endpoint, status))
+            if record.error is not None:
+                self._increment(self.errors, (endpoint, type(record.error).__name__))
+            self._increment(self.retries, endpoint, record.retries)
+            self._increment(self.request_bytes, endpoint, record.request_bytes)
+            self._increment(self.response_bytes, endpoint, record.response_bytes)
+            self._observe(self.durations, endpoint, record.duration)
+            for phase, seconds in record.phases.items():
+                self._observe(self.phase_durations, (endpoint, phase), seconds)
+
+    def _counter_lines(self, lines, name, kind, help_text, counter, label_names):
+        name = '{}_{}'.format(self.namespace, name)
+        lines.append('# HELP {} {}'.format(name, help_text))
+        lines.append('# TYPE {} {}'.format(name, kind))
+        for key in sorted(counter, key=str):
+            values = key if isinstance(key, tuple) else (key,)
+            lines.append('{}{{{}}} {}'.format(name, _format_labels(zip(label_names, values)),
+                                             _format_value(counter[key])))
+
+    def _histogram_lines(self, lines, name, help_text, histograms, label_names):
+        name = '{}_{}'.format(self.namespace, name)
+        lines.append('# HELP {} {}'.format(name, help_text))
+        lines.append('# TYPE {} histogram'.format(name))
+        for key in sorted(histograms, key=str):
+            histogram = histograms[key]
+            labels = list(zip(label_names, key if isinstance(key, tuple) else (key,)))
+            for bound, count in histogram.cumulative():
+                lines.append('{}_bucket{{{}}} {}'.format(
+                    name, _format_labels(labels + [('le', _format_value(bound))]), count))
+            lines.append('{}_sum{{{}}} {}'.format(name, _format_labels(labels),
+                                                  _format_value(histogram.sum)))
+            lines.append('{}_count{{{}}} {}'.format(name, _format_labels(labels),
+                                                    histogram.count))
+
+    def render(self):
+        """Returns every metric in the Prometheus text exposition format."""
+        lines = []
+        with self._lock:
+            self._counter_lines(lines, 'requests_total', 'counter',
+                                'API calls by endpoint and final status.',
+                                self.requests, ('endpoint', 'status'))
+            self._counter_lines(lines, 'errors_total', 'counter',
+                                'API calls that raised, by endpoint and exception.',
+                                self.errors, ('endpoint', 'error'))
+            self._counter_lines(lines, 'retries_total', 'counter',
+                                'Retried attempts by endpoint.',
+                                self.retries, ('endpoint',))
+            self._counter_lines(lines, 'request_bytes_total', 'counter',
+                                'Request body bytes by endpoint.',
+                                self.request_bytes, ('endpoint',))
+            self._counter_lines(lines, 'response_bytes_total', 'counter',
+                                'Response body bytes by endpoint.',
+                                self.response_bytes, ('endpoint',))
+            self._counter_lines(lines, 'in_flight', 'gauge',
+                                'API calls in progress by endpoint.',
+                                self.in_flight, ('endpoint',))
+            self._histogram_lines(lines, 'call_duration_seconds',
+                                  'Duration of API calls, retries included.',
+                                  self.durations, ('endpoint',))
+            self._histogram_lines(lines, 'phase_duration_seconds',
+                                  'Duration of each phase of API calls.',
+                                  self.phase_durations, ('endpoint', 'phase'))
+        return '\n'.join(lines) + '\n'
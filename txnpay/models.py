@@ -0,0 +1,204 @@
+"""Compact response models decoded lazily from the response body
+
+Enabled with `response_models=True` on a client. Each record keeps the raw
+bytes of its JSON object and decodes them on first field access into
+`__slots__`, so large cached lists hold neither a dict nor key strings per
+record. Models are read-only mappings, so code written for the plain
+`response.json()` dicts keeps working: `bank['code']`, `bank.get('name')`,
+`'id' in account` and `dict(account)`.
+"""
+import re
+import sys
+
+try:
+    from collections.abc import Mapping
+except ImportError:
+    from collections import Mapping
+
+# a JSON object with no nested object or array; each character matches one way,
+# so a failed match backtracks linearly
+_FLAT_OBJECT = re.compile(rb'\{(?:[^{}\[\]"]|"[^"\\]*(?:\\.[^"\\]*)*")*\}')
+# a string runs to the end of `content` when its closing quote is missing, so
+# brackets in a string cut short by a chunk boundary are not counted
+_TOKEN = re.compile(rb'"[^"\\]*(?:\\.[^"\\]*)*"?|[{}\[\]]')
+_SEPARATOR = re.compile(rb'[\s,]*')
+
+
+def _value_end(content, pos):
+    """Index after the object or array starting at `pos`, found by counting brackets,
+    or None when `content` ends before it does."""
+    depth = 0
+    for token in _TOKEN.finditer(content, pos):
+        char = token.group()[:1]
+        if char in (b'{', b'['):
+            depth += 1
+        elif char in (b'}', b']'):
+            depth -= 1
+            if depth == 0:
+                return token.end()
+    return None
+
+
+def split_array(content):
+    """Returns the raw bytes of each object in the JSON array `content`, without decoding them.
+
+        Only the boundaries of the objects are found; their contents are checked
+        when a model decodes them.
+    """
+    pos = _SEPARATOR.match(content).end()
+    if content[pos:pos + 1] != b'[':
+        raise ValueError('expected a JSON array')
+    items = []
+    pos += 1
+    while True:
+        pos = _SEPARATOR.match(content, pos).end()
+        char = content[pos:pos + 1]
+        if char == b']':
+            return items
+        if char != b'{':
+            raise ValueError('expected a JSON object at byte {}'.format(pos))
+        match = _FLAT_OBJECT.match(content, pos)
+        end = match.end() if match is not None else _value_end(content, pos)
+        if end is None:
+            raise ValueError('unterminated JSON value at byte {}'.format(pos))
+        items.append(content[pos:end])
+        pos = end
+
+
+def to_json(obj):
+    """`default` of JSON encoders, turning models back into dicts."""
+    if isinstance(obj, Model):
+        return obj.to_dict()
+    raise TypeError('{} is not JSON serializable'.format(type(obj).__name__))
+
+
+class Model(Mapping):
+    """Base of the response models; each subclass lists its fields as `__slots__`.
+
+        Fields are read as attributes, None when the response omitted them, or
+        by key like the dicts the client returns without models. Keys that are
+        not fields are kept in a dict of their own.
+    """
+    __slots__ = ('_raw', '_extra')
+    _fields = frozenset()
+    # fields with few distinct values, interned so records share one string
+    _interned = frozenset()
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls._fields = frozenset(cls.__slots__)
+
+    def __init__(self, raw=None):
+        self._raw = raw
+        self._extra = None
+
+    @classmethod
+    def from_dict(cls, data):
+        model = cls()
+        model._fill(data)
+        return model
+
+    @classmethod
+    def from_json(cls, body):
+        """Model of one JSON object, decoded on first access."""
+        return cls(body.encode() if isinstance(body, str) else body)
+
+    @classmethod
+    def list_from_json(cls, body):
+        """Models of every object in a JSON array, each decoded on first access."""
+        return [cls(raw) for raw in split_array(body.encode() if isinstance(body, str)
+                                                else body)]
+
+    def _fill(self, data):
+        if not isinstance(data, dict):
+            raise ValueError('{} expects a JSON object'.format(type(self).__name__))
+        fields = self._fields
+        interned = self._interned
+        extra = None
+        for key, value in data.items():
+            if key in fields:
+                if key in interned and isinstance(value, str):
+                    value = sys.intern(value)
+                setattr(self, key, value)
+            else:
+                if extra is None:
+                    extra = {}
+                extra[sys.intern(key)] = value
+        self._extra = extra
+        self._raw = None
+
+    def _decode(self):
+        raw = self._raw
+        if raw is not None:
+            import json
+            self._fill(json.loads(raw.decode('utf-8')))
+
+    def __getattr__(self, name):
+        # only reached for fields not set yet
+        if name in self._fields:
+            if self._raw is not None:
+                self._decode()
+                return getattr(self, name)
+            return None
+        raise AttributeError('{} has no attribute {!r}'.format(type(self).__name__, name))
+
+    def _present(self):
+        """Yields `(key, value)` of every field in the response, in field order then extras."""
+        self._decode()
+        for name in self.__slots__:
+            try:
+                yield name, object.__getattribute__(self, name)
+            except AttributeError:
+                pass
+        if self._extra is not None:
+            for item in self._extra.items():
+                yield item
+
+    def __getitem__(self, key):
+        self._decode()
+        if key in self._fields:
+            try:
+                return object.__getattribute__(self, key)
+            except AttributeError:
+                raise KeyError(key)
+        if self._extra is not None and key in self._extra:
+            return self._extra[key]
+        raise KeyError(key)
+
+    def __iter__(self):
+        return (key for key, _ in self._present())
+
+    def __len__(self):
+        return sum(1 for _ in self._present())
+
+    def to_dict(self):
+        """The record as the dict `response.json()` would have returned."""
+        return dict(self._present())
+
+    def __repr__(self):
+        return '{}({!r})'.format(type(self).__name__, self.to_dict())
+
+    def __reduce__(self):
+        return type(self).from_dict, (self.to_dict(),)
+
+
+class Bank(Model):
+    """A bank from `fetch_banks`."""
+    __slots__ = ('code', 'name')
+
+
+class BankAccount(Model):
+    """A linked bank account from `fetch_bank_accounts` or `link_bank_account`."""
+    __slots__ = ('id', 'bank', 'bank_type', 'account_number', 'account_name')
+    _interned = frozenset(('bank', 'bank_type'))
+
+
+class OtpResult(Model):
+    """The one-time password from `fetch_otp`, pass its `code` to `cash_out`."""
+    __slots__ = ('code',)
+
+
+class Payout(Model):
+    """A bank payout from `cash_out`."""
+    __slots__ = ('id', 'amount', 'bank_account', 'status')
+    _interned = frozenset(('status',))
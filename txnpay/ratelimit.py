@@ -0,0 +1,163 @@
+"""Client-side token-bucket rate limiting for traxionpay client"""
+import os
+import threading
+import time
+
+# fraction of the configured rate restored after each granted token following a throttle
+RECOVERY_STEP = 0.01
+# lowest fraction of the configured rate a throttled bucket slows down to
+MIN_RATE_FACTOR = 0.1
+
+
+def parse_retry_after(value, default=1.0):
+    """Seconds from a `Retry-After` header holding either seconds or an HTTP date."""
+    if value is None:
+        return default
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    import email.utils
+
+    parsed = email.utils.parsedate_tz(value)
+    if parsed is None:
+        return default
+    return max(0.0, email.utils.mktime_tz(parsed) - time.time())
+
+
+class TokenBucket():
+    """Thread-safe token bucket.
+
+        Tokens are reserved rather than waited for: `reserve` always takes a token
+        and returns how long the caller must wait before using it, so the same
+        bucket serves blocking threads and asyncio tasks.
+
+        A throttle signal (`throttled`) blocks the bucket for the `Retry-After`
+        period and halves its rate; the rate then recovers gradually with every
+        granted token, settling near the highest rate the server accepts.
+
+        :param rate: tokens added per second
+
+        :param capacity: maximum burst size
+    """
+
+    def __init__(self, rate, capacity=None):
+        self.rate = float(rate)
+        self.capacity = float(capacity if capacity is not None else rate)
+        self._lock = threading.Lock()
+        self._state = self.initial_state()
+
+    def initial_state(self):
+        return {'tokens': self.capacity, 'updated': time.time(), 'rate': self.rate}
+
+    def _reserve(self, state, tokens, now):
+        rate = state['rate']
+        if now > state['updated']:
+            state['tokens'] = min(self.capacity,
+                                  state['tokens'] + (now - state['updated']) * rate)
+            state['updated'] = now
+        state['tokens'] -= tokens
+        wait = (state['updated'] - now) + max(0.0, -state['tokens']) / rate
+        state['rate'] = min(self.rate, rate + self.rate * RECOVERY_STEP)
+        return wait
+
+    def _throttled(self, state, retry_after, now):
+        state['tokens'] = min(state['tokens'], 0.0)
+        state['updated'] = max(state['updated'], now + retry_after)
+        state['rate'] = max(self.rate * MIN_RATE_FACTOR, state['rate'] / 2)
+
+    def reserve(self, tokens=1):
+        """Takes `tokens` and returns the seconds to wait before sending."""
+        with self._lock:
+            return self._reserve(self._state, tokens, time.time())
+
+    def throttled(self, retry_after):
+        """Feeds a throttle response back into the bucket."""
+        with self._lock:
+            self._throttled(self._state, retry_after, time.time())
+
+
+class FileTokenBucket(TokenBucket):
+    """Token bucket whose state lives in a file, shared by every process on the host.
+
+        Updates are serialized with an exclusive `fcntl` lock on the file, so
+        worker processes configured with the same path share one budget.
+
+        :param path: location of the bucket state file
+
+        :param rate: tokens added per second
+
+        :param capacity: maximum burst size
+    """
+
+    def __init__(self, path, rate, capacity=None):
+        super(FileTokenBucket, self).__init__(rate, capacity)
+        self.path = path
+
+    def _update(self, operation, *args):
+        import fcntl
+        import json
+
+        with self._lock:
+            handle = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+            try:
+                fcntl.flock(handle, fcntl.LOCK_EX)
+                raw = b''
+                while True:
+                    chunk = os.read(handle, 4096)
+                    if not chunk:
+                        break
+                    raw += chunk
+                try:
+                    state = json.loads(raw.decode()) if raw else self.initial_state()
+                except ValueError:
+                    state = self.initial_state()
+                result = operation(state, *args)
+                data = json.dumps(state).encode()
+                os.lseek(handle, 0, os.SEEK_SET)
+                os.ftruncate(handle, 0)
+                os.write(handle, data)
+                return result
+            finally:
+                os.close(handle)
+
+    def reserve(self, tokens=1):
+        return self._update(self._reserve, tokens, time.time())
+
+    def throttled(self, retry_after):
+        self._update(self._throttled, retry_after, time.time())
+
+
+class RateLimiter():
+    """Per-endpoint token buckets.
+
+        Endpoints are the names in `txnpay.constants.ENDPOINT_PATHS`:
+        `payform-link`, `banks`, `bank-account`, `get-otp` and `payout`.
+        Endpoints without a limit are not throttled on the client side.
+
+        :param limits: mapping of endpoint to `(rate, capacity)` or requests per second
+
+        :param shared_dir: (optional) directory for :class:`FileTokenBucket` state files,
+            so every process using the same directory shares one budget per endpoint
+    """
+
+    def __init__(self, limits, shared_dir=None):
+        self.buckets = {}
+        for endpoint, limit in limits.items():
+            rate, capacity = limit if isinstance(limit, (tuple, list)) else (limit, None)
+            if shared_dir is not None:
+                path = os.path.join(shared_dir, 'txnpay-{}.bucket'.format(endpoint))
+                self.buckets[endpoint] = FileTokenBucket(path, rate, capacity)
+            else:
+                self.buckets[endpoint] = TokenBucket(rate, capacity)
+
+    def reserve(self, endpoint):
+        """Seconds to wait before calling `endpoint`."""
+        bucket = self.buckets.get(endpoint)
+        return bucket.reserve() if bucket is not None else 0.0
+
+    def throttled(self, endpoint, retry_after):
+        """Records a `429 Too Many Requests` answer from `endpoint`."""
+        bucket = self.buckets.get(endpoint)
+        if bucket is not None:
+            bucket.throttled(retry_after)
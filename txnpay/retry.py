@@ -0,0 +1,122 @@
+"""Retry policy and circuit breakers for traxionpay client"""
+import random
+import threading
+import time
+
+from .exceptions import CircuitOpenError
+
+RETRY_STATUSES = (500, 502, 503, 504)
+
+
+class RetryPolicy():
+    """Exponential backoff with full jitter.
+
+        Only idempotent calls are retried: `fetch_banks`, `fetch_bank_accounts`,
+        `cash_in` (keyed by `merchant_ref_no`), and `cash_out` when an
+        `idempotency_key` is given and `retry_payouts` is set.
+
+        :param max_retries: retries after the first attempt, 0 disables retrying
+
+        :param backoff_base: seconds of the first backoff window
+
+        :param backoff_max: upper bound of any backoff window
+
+        :param retry_statuses: response statuses treated as transient failures
+
+        :param retry_payouts: retry `cash_out` calls given an `idempotency_key`,
+            defaults to False. Only set it when the server deduplicates payouts by
+            their `Idempotency-Key` header: the TraxionPay API is not known to, and
+            a payout retried after its request reached the server may be paid twice.
+    """
+
+    def __init__(self, max_retries=2, backoff_base=0.1, backoff_max=5.0,
+                 retry_statuses=RETRY_STATUSES, retry_payouts=False):
+        self.max_retries = max_retries
+        self.retry_payouts = retry_payouts
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.retry_statuses = frozenset(retry_statuses)
+
+    def backoff(self, attempt):
+        """Seconds to wait before retry number `attempt` (starting at 0)."""
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+
+
+class CircuitBreaker():
+    """Fails fast while an endpoint keeps failing.
+
+        After `failure_threshold` consecutive failures the circuit opens and calls
+        raise :class:`CircuitOpenError` without touching the network. Once
+        `reset_timeout` seconds pass, one trial call is let through; its success
+        closes the circuit and its failure opens it again.
+
+        :param failure_threshold: consecutive failures that open the circuit
+
+        :param reset_timeout: seconds the circuit stays open
+    """
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half-open'
+
+    def __init__(self, failure_threshold=5, reset_timeout=30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self._opened_at = 0
+        self._lock = threading.Lock()
+
+    def before_call(self, endpoint=None):
+        """Raises :class:`CircuitOpenError` when the call must not be attempted."""
+        with self._lock:
+            if self.state == self.CLOSED:
+                return
+            if self.state == self.OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+                self.state = self.HALF_OPEN
+                return
+            raise CircuitOpenError('circuit for {} is open'.format(endpoint or 'endpoint'))
+
+    def release(self):
+        """Gives back the trial call of a half-open circuit when it was not made."""
+        with self._lock:
+            if self.state == self.HALF_OPEN:
+                self.state = self.OPEN
+
+    def record_success(self):
+        with self._lock:
+            self.state = self.CLOSED
+            self.failures = 0
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                self.state = self.OPEN
+                self._opened_at = time.monotonic()
+
+
+class CircuitBreakers():
+    """One :class:`CircuitBreaker` per endpoint, created on first use.
+
+        :param failure_threshold: consecutive failures that open a circuit,
+            None disables circuit breaking
+
+        :param reset_timeout: seconds a circuit stays open
+    """
+
+    def __init__(self, failure_threshold=5, reset_timeout=30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._breakers = {}
+        self._lock = threading.Lock()
+
+    def get(self, endpoint):
+        """Returns the breaker of `endpoint`, or None when circuit breaking is disabled."""
+        if self.failure_threshold is None:
+            return None
+        breaker = self._breakers.get(endpoint)
+        if breaker is None:
+            with self._lock:
+                breaker = self._breakers.setdefault(
+                    endpoint, CircuitBreaker(self.failure_threshold, self.reset_timeout))
+        return breaker
@@ -0,0 +1,200 @@
+"""Declarative field schemas used to validate and serialize request payloads"""
+from .utils import PY2, encode_additional_data
+
+if PY2:
+    STRING_TYPES = (basestring,)  # pylint: disable=undefined-variable
+else:
+    STRING_TYPES = (str,)
+ID_TYPES = (int,)
+AMOUNT_TYPES = (float, int)
+DICT_TYPES = (dict,)
+
+
+class Field():
+    """Describes a single request field.
+
+        :param name: argument name, also used in error messages
+
+        :param types: tuple of accepted types
+
+        :param type_name: type shown in the `TypeError` message
+
+        :param required: raise `ValueError` when the value is None
+
+        :param default: value sent when an optional field is None,
+            the field is omitted when this is None too
+
+        :param max_length: maximum accepted `len()` of the value
+
+        :param choices: accepted values
+
+        :param choices_message: `ValueError` message when the value is not in `choices`
+
+        :param key: payload key, defaults to `name`
+
+        :param encode: callable applied to the value before it is stored
+
+        :param verb: "should" or "must", as worded in the error messages
+    """
+
+    def __init__(self, name, types, type_name, required=False, default=None,
+                 max_length=None, choices=None, choices_message=None,
+                 key=None, encode=None, verb='should'):
+        self.name = name
+        self.types = types
+        self.type_name = type_name
+        self.required = required
+        self.default = default
+        self.max_length = max_length
+        self.choices = choices
+        self.choices_message = choices_message
+        self.key = key if key is not None else name
+        self.encode = encode
+        self.verb = verb
+
+
+class Schema():
+    """Compiles a sequence of :class:`Field` into a validator/serializer.
+
+        The fields are turned once, on first use, into a straight-line Python
+        function with error messages, payload key order and per-field checks
+        inlined as constants. Optional fields left as None cost a single dict lookup
+        and are filled from a prebuilt defaults mapping.
+
+        :param fields: fields in validation and payload order
+    """
+
+    def __init__(self, *fields):
+        self.fields = fields
+        self._validate = None
+
+    @property
+    def validate(self):
+        """The compiled validator, built on first use."""
+        validate = self._validate
+        if validate is None:
+            validate = self._validate = self._compile()
+        return validate
+
+    def _compile(self):
+        template = {}
+        namespace = {'template': template}
+        lines = ['def validate(values):',
+                 '    payload = template.copy()',
+                 '    get = values.get']
+        for index, field in enumerate(self.fields):
+            if field.required or field.default is not None:
+                # reserve the key so payloads keep the declared order
+                template[field.key] = field.default
+
+            constants = {
+                'types': field.types,
+                'none_message': '{} cannot be None'.format(field.name),
+                'type_message': '{} {} be of type {}'.format(field.name, field.verb,
+                                                             field.type_name),
+                'length_message': '{} must be less than or equal to {}'.format(
+                    field.name, field.max_length),
+                'choices': field.choices,
+                'choices_message': field.choices_message,
+                'encode': field.encode,
+            }
+            names = {}
+            for constant, value in constants.items():
+                names[constant] = '{}_{}'.format(constant, index)
+                namespace[names[constant]] = value
+
+            lines.append('    value = get({!r})'.format(field.name))
+            if field.required:
+                lines.append('    if value is None:')
+                lines.append('        raise ValueError({})'.format(names['none_message']))
+                indent = '    '
+            else:
+                lines.append('    if value is not None:')
+                indent = '        '
+            lines.append('{}if not isinstance(value, {}):'.format(indent, names['types']))
+            lines.append('{}    raise TypeError({})'.format(indent, names['type_message']))
+            if field.choices is not None:
+                lines.append('{}if value not in {}:'.format(indent, names['choices']))
+                lines.append('{}    raise ValueError({})'.format(indent,
+                                                                names['choices_message']))
+            if field.max_length is not None:
+                lines.append('{}if len(value) > {}:'.format(indent, field.max_length))
+                lines.append('{}    raise ValueError({})'.format(indent, names['length_message']))
+            if field.encode is not None:
+                lines.append('{}value = {}(value)'.format(indent, names['encode']))
+            lines.append('{}payload[{!r}] = value'.format(indent, field.key))
+        lines.append('    return payload')
+
+        exec('\n'.join(lines), namespace)  # pylint: disable=exec-used
+        validate = namespace['validate']
+        validate.__doc__ = """Validates `values` and returns the serialized payload dict.
+
+            Unknown keys in `values` are ignored.
+
+            :param values: mapping of field name to value
+        """
+        return validate
+
+    @property
+    def names(self):
+        return tuple(field.name for field in self.fields)
+
+    def only(self, names):
+        """Returns a schema of the fields named in `names`, in declared order."""
+        names = frozenset(names)
+        return Schema(*[field for field in self.fields if field.name in names])
+
+    def without(self, names):
+        """Returns a schema of the fields not named in `names`, in declared order."""
+        names = frozenset(names)
+        return Schema(*[field for field in self.fields if field.name not in names])
+
+
+def _billing_field(name, default=''):
+    return Field(name, STRING_TYPES, 'str', default=default)
+
+
+CASH_IN_SCHEMA = Schema(
+    Field('merchant_id', ID_TYPES, 'int', required=True),
+    Field('merchant_ref_no', STRING_TYPES, 'str', required=True, max_length=100),
+    Field('description', STRING_TYPES, 'str', required=True, max_length=500),
+    Field('amount', AMOUNT_TYPES, 'float', required=True),
+    Field('merchant_additional_data', DICT_TYPES, 'dict', required=True,
+          encode=encode_additional_data),
+    Field('currency', STRING_TYPES, 'str', default='PHP'),
+    _billing_field('billing_email'),
+    _billing_field('billing_first_name'),
+    _billing_field('billing_last_name'),
+    _billing_field('billing_middle_name'),
+    _billing_field('billing_phone'),
+    _billing_field('billing_mobile'),
+    _billing_field('billing_address'),
+    _billing_field('billing_address2'),
+    _billing_field('billing_city'),
+    _billing_field('billing_state'),
+    _billing_field('billing_zip'),
+    _billing_field('billing_country', default='PH'),
+    _billing_field('billing_remark'),
+    Field('payment_method', STRING_TYPES, 'str', default=''),
+    Field('status_notification_url', STRING_TYPES, 'str', default=''),
+    Field('success_page_url', STRING_TYPES, 'str', default=''),
+    Field('failure_page_url', STRING_TYPES, 'str', default=''),
+    Field('cancel_page_url', STRING_TYPES, 'str', default=''),
+    Field('pending_page_url', STRING_TYPES, 'str', default=''),
+)
+
+LINK_BANK_ACCOUNT_SCHEMA = Schema(
+    Field('bank_code', STRING_TYPES, 'str', required=True, key='bank', verb='must'),
+    Field('bank_type', STRING_TYPES, 'str', required=True, verb='must',
+          choices=('savings', 'checkings'),
+          choices_message='bank_type must either be "checkings" or "savings"'),
+    Field('account_number', STRING_TYPES, 'str', required=True, verb='must'),
+    Field('account_name', STRING_TYPES, 'str', required=True, max_length=50, verb='must'),
+)
+
+CASH_OUT_SCHEMA = Schema(
+    Field('otp', STRING_TYPES, 'str', required=True, key='OTP', verb='must'),
+    Field('amount', AMOUNT_TYPES, 'float', required=True, verb='must'),
+    # the message says str although ids are ints; kept as-is for compatibility
+    Field('bank_account', ID_TYPES, 'str', required=True, verb='must'),
+)
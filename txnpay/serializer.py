@@ -0,0 +1,102 @@
+"""JSON and base64 encoding of payloads for traxionpay client"""
+import base64
+
+FORM_CONTENT_TYPE = 'application/x-www-form-urlencoded'
+
+# base64 characters that must be percent-encoded in a form body
+_FORM_QUOTES = ((b'+', b'%2B'), (b'/', b'%2F'), (b'=', b'%3D'))
+
+
+class JSONSerializer():
+    """Serializes payloads with the standard library `json` module.
+
+        Output is compact UTF-8, with no spaces after separators and non-ASCII
+        text left unescaped, as :class:`OrjsonSerializer` writes it.
+    """
+    name = 'json'
+
+    def __init__(self):
+        import json
+        self._encode = json.JSONEncoder(separators=(',', ':'), ensure_ascii=False).encode
+
+    def dumps(self, obj):
+        """Returns `obj` as JSON bytes."""
+        return self._encode(obj).encode()
+
+    def b64encode(self, obj):
+        """Returns `obj` as base64 encoded JSON bytes."""
+        return base64.b64encode(self.dumps(obj))
+
+    def form_body(self, field, obj):
+        """Returns the url-encoded form body `field=<base64 JSON of obj>` as bytes.
+
+            The body is built straight from bytes, so it can be sent as-is
+            with a `Content-Type` of :data:`FORM_CONTENT_TYPE`.
+        """
+        return self.form_encode(field, self.dumps(obj))
+
+    def form_encode(self, field, data):
+        """Returns the url-encoded form body `field=<base64 of data>` as bytes."""
+        encoded = base64.b64encode(data)
+        for char, quoted in _FORM_QUOTES:
+            if char in encoded:
+                encoded = encoded.replace(char, quoted)
+        return field.encode() + b'=' + encoded
+
+
+class OrjsonSerializer(JSONSerializer):
+    """Serializes payloads with `orjson`, which encodes straight to bytes.
+
+        Dict keys that are not strings are converted like the `json` module
+        converts them, e.g. `{1: 'x'}` becomes `{"1":"x"}`. Payloads `orjson`
+        cannot encode, such as integers wider than 64 bits, and those it would
+        encode unlike `json`, such as dates and `str` subclasses, are encoded
+        with `json` instead, which raises `TypeError` for unsupported types.
+
+        Floats still differ in form: `orjson` writes `1e16` where `json` writes
+        `1e+16`, and NaN and infinity as `null` rather than `NaN`/`Infinity`.
+    """
+    name = 'orjson'
+
+    def __init__(self):
+        import orjson
+        super(OrjsonSerializer, self).__init__()
+        self._dumps = orjson.dumps
+        self._error = orjson.JSONEncodeError
+        self._option = (orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+                        | orjson.OPT_PASSTHROUGH_DATACLASS | orjson.OPT_PASSTHROUGH_SUBCLASS)
+
+    def dumps(self, obj):
+        try:
+            return self._dumps(obj, option=self._option)
+        except self._error:
+            return super(OrjsonSerializer, self).dumps(obj)
+
+
+def _default_serializer():
+    try:
+        return OrjsonSerializer()
+    except ImportError:
+        return JSONSerializer()
+
+
+# chosen on first use, so importing the client does not load a JSON library
+_serializer = None
+
+
+def get_serializer():
+    """Returns the serializer used to encode payloads, `orjson` backed when installed."""
+    global _serializer
+    if _serializer is None:
+        _serializer = _default_serializer()
+    return _serializer
+
+
+def set_serializer(serializer):
+    """Replaces the serializer used to encode payloads, e.g. with `JSONSerializer()`.
+
+        :param serializer: object with the `dumps`, `b64encode`, `form_body` and
+            `form_encode` methods of :class:`JSONSerializer`
+    """
+    global _serializer
+    _serializer = serializer
@@ -0,0 +1,56 @@
+"""Pooled HTTP sessions for traxionpay client"""
+from .transport import Transport
+
+
+class SessionPool(Transport):
+    """Transport sending through a keep-alive `requests.Session`, the default of clients.
+
+        Connections are reused across calls. The underlying session is created
+        lazily and recreated whenever the current process id changes, so workers
+        forked after the pool was used (e.g. pre-fork gunicorn) never share
+        sockets with their parent.
+
+        :param pool_connections: number of per-host connection pools to cache
+
+        :param pool_maxsize: maximum number of connections kept per host
+
+        :param pool_block: block when the pool is exhausted instead of opening
+            extra throwaway connections
+
+        :param keep_alive: keep connections open between calls; when False every
+            request is sent with `Connection: close`
+
+        Cookies set by responses are dropped rather than stored, since the pool
+        may be shared by clients of different merchants.
+    """
+
+    def __init__(self, pool_connections=10, pool_maxsize=10,
+                 pool_block=False, keep_alive=True):
+        super(SessionPool, self).__init__()
+        self.pool_connections = pool_connections
+        self.pool_maxsize = pool_maxsize
+        self.pool_block = pool_block
+        self.keep_alive = keep_alive
+
+    def _create_session(self):
+        # deferred so importing the client does not load requests
+        from http.cookiejar import DefaultCookiePolicy
+
+        import requests
+        from requests.adapters import HTTPAdapter
+
+        session = requests.Session()
+        # no domain is allowed, so no cookie is ever stored or sent
+        session.cookies.set_policy(DefaultCookiePolicy(allowed_domains=[]))
+        adapter = HTTPAdapter(pool_connections=self.pool_connections,
+                              pool_maxsize=self.pool_maxsize,
+                              pool_block=self.pool_block)
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        if not self.keep_alive:
+            session.headers['Connection'] = 'close'
+        return session
+
+    def request(self, method, url, **kwargs):
+        """Sends a request through the pooled session."""
+        return self.session.request(method=method, url=url, **kwargs)
@@ -0,0 +1,79 @@
+"""HMAC-SHA256 signing for traxionpay requests"""
+ALGORITHM = 'HS256'
+
+
+def signatures_match(digest, signature):
+    """Compares a hex `digest` with an untrusted `signature` in constant time.
+
+        A signature that is not an ASCII string never matches, where
+        `hmac.compare_digest` would raise TypeError on non-ASCII text.
+    """
+    import hmac
+
+    if not isinstance(signature, str):
+        return False
+    try:
+        signature = signature.encode('ascii')
+    except UnicodeEncodeError:
+        return False
+    return hmac.compare_digest(digest.encode('ascii'), signature)
+
+
+class Signer():
+    """Signs messages with a client's secret key.
+
+        The secret is keyed into an HMAC-SHA256 state on first use, and every message
+        is signed on a copy of that state, so the key schedule is not repeated per call.
+        `auth_hash` only depends on the keys and is computed once.
+
+        :param secret_key:
+
+        :param api_key: (optional) only needed for `auth_hash`
+    """
+
+    def __init__(self, secret_key, api_key=None):
+        self._key = secret_key.encode()
+        self._keyed = None
+        self.api_key = api_key
+        self.alg = ALGORITHM
+        self._auth_hash = None
+
+    @property
+    def keyed(self):
+        """The HMAC-SHA256 state keyed with the secret, created on first use."""
+        if self._keyed is None:
+            import hashlib
+            import hmac
+            self._keyed = hmac.new(self._key, digestmod=hashlib.sha256)
+        return self._keyed
+
+    @property
+    def auth_hash(self):
+        """Signature of the api key, None without one."""
+        if self._auth_hash is None and self.api_key is not None:
+            self._auth_hash = self.sign(self.api_key)
+        return self._auth_hash
+
+    def sign(self, message):
+        """Returns the hex HMAC-SHA256 digest of `message` (str or bytes)."""
+        mac = self.keyed.copy()
+        mac.update(message.encode() if not isinstance(message, bytes) else message)
+        return mac.hexdigest()
+
+    def sign_many(self, messages):
+        """Returns a list with the hex digest of every message in `messages`."""
+        keyed = self.keyed
+        digests = []
+        for message in messages:
+            mac = keyed.copy()
+            mac.update(message.encode() if not isinstance(message, bytes) else message)
+            digests.append(mac.hexdigest())
+        return digests
+
+    def secure_hash(self, merchant_ref_no, amount, description, currency='PHP'):
+        """Returns the `secure_hash` of a cash in request."""
+        return self.sign('{}{}{}{}'.format(merchant_ref_no, amount, currency, description))
+
+    def verify(self, message, signature):
+        """Checks `signature` against `message` in constant time."""
+        return signatures_match(self.sign(message), signature)
@@ -0,0 +1,106 @@
+"""Single-flight coalescing of identical concurrent reads"""
+import collections
+import threading
+
+
+class _Flight():
+    __slots__ = ('done', 'value', 'error')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+
+
+class SingleFlight():
+    """Runs at most one call per key at a time; concurrent callers share its outcome.
+
+        While a call for `key` is in flight, later `do(key, ...)` calls wait for
+        it and get its return value, or its exception re-raised, instead of
+        running their own.
+
+        `flights` counts calls that ran and `coalesced` counts calls that waited
+        on one, both per key.
+    """
+
+    def __init__(self):
+        self.flights = collections.Counter()
+        self.coalesced = collections.Counter()
+        self._in_flight = {}
+        self._lock = threading.Lock()
+
+    def do(self, key, func):
+        """Returns `func()`, or the outcome of the call for `key` already in flight."""
+        with self._lock:
+            flight = self._in_flight.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._in_flight[key] = _Flight()
+                self.flights[key] += 1
+            else:
+                self.coalesced[key] += 1
+
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.value
+
+        try:
+            flight.value = func()
+            return flight.value
+        except BaseException as exc:
+            flight.error = exc
+            raise
+        finally:
+            with self._lock:
+                del self._in_flight[key]
+            flight.done.set()
+
+    def stats(self):
+        """Returns `{key: {'flights': n, 'coalesced': n}}` for every key seen."""
+        with self._lock:
+            return {key: {'flights': self.flights[key], 'coalesced': self.coalesced[key]}
+                    for key in set(self.flights) | set(self.coalesced)}
+
+
+class AsyncSingleFlight(SingleFlight):
+    """asyncio counterpart of :class:`SingleFlight`.
+
+        Waiters are shielded, so cancelling one of them leaves the shared call
+        running. Cancelling the caller that runs it only cancels that caller:
+        one of the waiters runs the call again and the others wait on it.
+    """
+
+    async def do(self, key, coro_func):
+        """Awaits `coro_func()`, or the outcome of the call for `key` already in flight."""
+        import asyncio
+
+        future = self._in_flight.get(key)
+        while future is not None:
+            self.coalesced[key] += 1
+            try:
+                return await asyncio.shield(future)
+            except asyncio.CancelledError:
+                if not future.cancelled():
+                    # this waiter was cancelled, not the call
+                    raise
+            future = self._in_flight.get(key)
+
+        future = self._in_flight[key] = asyncio.get_running_loop().create_future()
+        self.flights[key] += 1
+        try:
+            value = await coro_func()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except BaseException as exc:
+            future.set_exception(exc)
+            # mark the exception retrieved when nobody was waiting on it
+            future.exception()
+            raise
+        else:
+            future.set_result(value)
+            return value
+        finally:
+            del self._in_flight[key]
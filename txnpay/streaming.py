@@ -0,0 +1,219 @@
+"""Incremental parsing of list responses, one record at a time as the body arrives
+
+Used by `iter_banks` and `iter_bank_accounts`, which feed the body to a
+:class:`RecordParser` chunk by chunk as it is read off the socket, so only
+the record being parsed is held rather than the whole body.
+"""
+import json
+import re
+
+from .models import _FLAT_OBJECT, _SEPARATOR, _value_end
+
+_STRING = re.compile(rb'"[^"\\]*(?:\\.[^"\\]*)*"')
+# numbers, true, false and null; always followed by `,` or `}` in a page object
+_SCALAR = re.compile(rb'[^\s,}\]]+')
+_COLON = re.compile(rb'\s*:\s*')
+_WHITESPACE = re.compile(rb'\s*')
+
+
+class RecordParser():
+    """Splits a JSON list response fed in chunks into the raw bytes of each record.
+
+        The body is either an array of objects or a page object holding them in
+        `key`, such as `{"count": 120, "next": url, "results": [...]}`; the other
+        fields of a page are decoded into `page` as they are read. Records are
+        returned once complete, so memory is bounded by the largest record and
+        chunk rather than by the size of the body.
+
+        :param record: (optional) callable turning the raw bytes of a record into
+            what `feed` returns, such as a model class; by default the records
+            completed by a chunk are decoded into dicts together
+
+        :param key: (optional) field of a page object holding its records,
+            defaults to `results`
+    """
+
+    def __init__(self, record=None, key='results'):
+        self.record = record
+        self.key = key
+        self.page = {}
+        self._buffer = bytearray()
+        self._pos = 0
+        # bytes of the body dropped from the buffer, for error positions
+        self._offset = 0
+        # start, array, page or done
+        self._state = 'start'
+        self._paged = False
+        # whether a page object had its `key` array
+        self._listed = False
+
+    @property
+    def done(self):
+        """True once the whole array or page object was parsed."""
+        return self._state == 'done'
+
+    def feed(self, chunk):
+        """Adds the next `chunk` of the body, returning the records it completed.
+
+            Raises ValueError when the body is not a list response.
+        """
+        buffer = self._buffer
+        if self._pos:
+            self._offset += self._pos
+            del buffer[:self._pos]
+            self._pos = 0
+        buffer += chunk
+        records = []
+        while self._step(records):
+            pass
+        return records
+
+    def close(self):
+        """Raises ValueError when the body ended before the array or page object did."""
+        if self._state != 'done':
+            raise ValueError('JSON list response ended before its {} did'.format(
+                'page object' if self._paged else 'array'))
+
+    def _step(self, records):
+        """Parses the next token, returning False once more of the body is needed."""
+        buffer = self._buffer
+        state = self._state
+        pos = (_WHITESPACE if state != 'array' else _SEPARATOR).match(buffer, self._pos).end()
+        self._pos = pos
+        if pos == len(buffer):
+            return False
+        char = buffer[pos:pos + 1]
+
+        if state == 'start':
+            if char not in (b'[', b'{'):
+                raise ValueError('expected a JSON array or object')
+            self._paged = char == b'{'
+            self._state = 'page' if self._paged else 'array'
+            self._pos = pos + 1
+            return True
+
+        if state == 'array':
+            if char == b']':
+                self._state = 'page' if self._paged else 'done'
+                self._pos = pos + 1
+                return True
+            if char != b'{':
+                raise ValueError('expected a JSON object at byte {}'.format(self._offset + pos))
+            return self._records(records)
+
+        if state == 'done':
+            raise ValueError('unexpected data after the JSON list at byte {}'.format(
+                self._offset + pos))
+
+        # a field of the page object, read whole or not at all
+        if char == b',':
+            self._pos = pos + 1
+            return True
+        if char == b'}':
+            self._state = 'done'
+            self._pos = pos + 1
+            return True
+        name = _STRING.match(buffer, pos)
+        if name is None:
+            if char != b'"':
+                raise ValueError('expected a field name at byte {}'.format(self._offset + pos))
+            return False
+        colon = _COLON.match(buffer, name.end())
+        if colon is None:
+            if _WHITESPACE.match(buffer, name.end()).end() < len(buffer):
+                raise ValueError('expected `:` at byte {}'.format(self._offset + name.end()))
+            return False
+        start = colon.end()
+        if start == len(buffer):
+            return False
+        key = json.loads(bytes(buffer[pos:name.end()]).decode('utf-8'))
+        value = buffer[start:start + 1]
+        if key == self.key and value == b'[':
+            self._state = 'array'
+            self._listed = True
+            self._pos = start + 1
+            return True
+        if value in (b'{', b'['):
+            end = _value_end(buffer, start)
+        else:
+            match = (_STRING if value == b'"' else _SCALAR).match(buffer, start)
+            end = match.end() if match is not None else None
+            if end == len(buffer):
+                # a number may continue in the next chunk
+                end = None
+        if end is None:
+            return False
+        self.page[key] = json.loads(bytes(buffer[start:end]).decode('utf-8'))
+        self._pos = end
+        return True
+
+    def _records(self, records):
+        """Adds the records complete in the buffer from its position on to `records`."""
+        buffer = self._buffer
+        size = len(buffer)
+        start = pos = self._pos
+        ends = []
+        # up to the first item that is not an object, left to `_step`
+        while pos < size and buffer[pos:pos + 1] == b'{':
+            end = buffer.find(b'}', pos) + 1
+            # the first `}` closes the record when it has no nested value and no
+            # escapes, and has an even number of quotes before it
+            if not end or (buffer.count(b'"', pos, end) % 2 or buffer.find(b'\\', pos, end) >= 0
+                           or buffer.find(b'{', pos + 1, end) >= 0
+                           or buffer.find(b'[', pos, end) >= 0):
+                match = _FLAT_OBJECT.match(buffer, pos)
+                end = match.end() if match is not None else _value_end(buffer, pos)
+                if end is None:
+                    break
+            ends.append(end)
+            pos = _SEPARATOR.match(buffer, end).end()
+        if not ends:
+            return False
+
+        if self.record is None:
+            # one decode of the records as an array, instead of one per record
+            records.extend(json.loads(b''.join((b'[', buffer[start:ends[-1]], b']'))
+                                      .decode('utf-8')))
+        else:
+            record = self.record
+            for end in ends:
+                start = _SEPARATOR.match(buffer, start).end()
+                records.append(record(bytes(buffer[start:end])))
+                start = end
+        self._pos = ends[-1]
+        return True
+
+
+def read_page(content, record=None):
+    """Returns the records of a whole list response body, and its `next` url or None.
+
+        The records are None when the body is an object without them, such as
+        an error detail.
+
+        :param record: (optional) as for :class:`RecordParser`
+    """
+    parser = RecordParser(record=record)
+    records = parser.feed(content)
+    parser.close()
+    if parser._paged and not parser._listed:
+        return None, None
+    return records, parser.page.get('next')
+
+
+def is_paged(content, headers):
+    """Whether a list response may be a page object, or links to a next page."""
+    return content.lstrip()[:1] == b'{' or next_link(headers.get('Link')) is not None
+
+
+def next_link(header):
+    """Returns the `rel="next"` url of a `Link` header, or None."""
+    for link in (header or '').split(','):
+        url, _, parameters = link.partition(';')
+        url = url.strip()
+        if not (url.startswith('<') and url.endswith('>')):
+            continue
+        for parameter in parameters.split(';'):
+            name, _, value = parameter.strip().partition('=')
+            if name.lower() == 'rel' and 'next' in value.strip('"\'').split():
+                return url[1:-1]
+    return None
@@ -0,0 +1,89 @@
+"""Prepared `cash_in` payloads with merchant-constant fields bound once"""
+from .exceptions import MissingAuthenticationError
+from .metrics import PhaseTimer
+from .schema import CASH_IN_SCHEMA
+from .serializer import get_serializer
+
+# fields signed into `secure_hash`, which differ for every payment
+VARYING_FIELDS = frozenset(('merchant_ref_no', 'amount', 'description'))
+
+
+class CashInTemplate():
+    """`cash_in` with some fields bound, returned by `prepare_cash_in`.
+
+        The bound fields are validated and serialized to JSON once. Each call only
+        validates, signs and serializes the remaining fields, and splices the
+        pre-serialized JSON into the payload. Signing and base64 encoding the body
+        still cost the same as in `cash_in`, so a template only saves noticeable
+        time when most fields are bound, like the merchant id and the page urls.
+
+        Calling the template sends the payment like `cash_in` and returns the
+        payform url; on an :class:`AsyncTraxionPay` the call must be awaited.
+
+        :param client: the :class:`TraxionPay` or :class:`AsyncTraxionPay` sending the payments
+
+        :param constant_fields: `cash_in` arguments shared by every payment
+    """
+
+    def __init__(self, client, **constant_fields):
+        names = CASH_IN_SCHEMA.names
+        for name in constant_fields:
+            if name in VARYING_FIELDS:
+                raise ValueError('{} is different for every payment and cannot be bound'.format(
+                    name))
+            if name not in names:
+                raise ValueError('{} is not a cash_in argument'.format(name))
+
+        signer = client.signer
+        if signer.auth_hash is None:
+            raise MissingAuthenticationError('api_key is required to sign cash_in requests')
+
+        self.client = client
+        self._secure_hash = signer.secure_hash
+        self.bound = frozenset(constant_fields)
+        self.schema = CASH_IN_SCHEMA.without(self.bound)
+        constant = CASH_IN_SCHEMA.only(self.bound).validate(constant_fields)
+        constant['auth_hash'] = signer.auth_hash
+        constant['alg'] = signer.alg
+        self.constant = constant
+        self.serializer = get_serializer()
+        # `{"a":1}` without its opening brace, appended after the varying fields
+        self._constant_json = b',' + self.serializer.dumps(constant)[1:]
+
+    def build(self, **fields):
+        """Validates and signs the varying `fields`, returning the url-encoded form body."""
+        if not self.bound.isdisjoint(fields):
+            raise ValueError('{} is bound by the template'.format(
+                ', '.join(sorted(self.bound.intersection(fields)))))
+
+        timer = PhaseTimer() if self.client.instrumentation is not None else None
+        payform_data = self.schema.validate(fields)
+        if timer is not None:
+            timer.mark('validate')
+
+        payform_data['secure_hash'] = self._secure_hash(payform_data['merchant_ref_no'],
+                                                        payform_data['amount'],
+                                                        payform_data['description'])
+        if timer is not None:
+            timer.mark('sign')
+
+        serializer = self.serializer
+        body = serializer.form_encode('form_data',
+                                      serializer.dumps(payform_data)[:-1] + self._constant_json)
+        if timer is not None:
+            timer.mark('encode')
+            timer.stash()
+        return body
+
+    def __call__(self, timeout=None, deadline=None, **fields):
+        """Sends a payment with the bound fields and the given varying ones.
+
+            :param fields: the remaining `cash_in` arguments, such as `merchant_ref_no`,
+                `amount`, `description`, `merchant_additional_data` and billing details
+
+            :param timeout: (optional) `(connect, read)` seconds for each attempt
+
+            :param deadline: (optional) seconds the whole call may take, retries included
+        """
+        return self.client._post_cash_in(self.build(**fields), timeout, deadline,
+                                         fields.get('merchant_ref_no'), fields.get('amount'))
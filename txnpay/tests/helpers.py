@@ -0,0 +1,17 @@
+"""Helpers shared by the test modules"""
+import json
+
+import requests
+
+
+def make_response(status_code=200, content=b'[]', headers=None, url=None):
+    """Returns a read `requests.Response`, as the session pool would.
+
+        :param content: (optional) body bytes, or a value sent as its json
+    """
+    response = requests.Response()
+    response.status_code = status_code
+    response._content = content if isinstance(content, bytes) else json.dumps(content).encode()
+    response.headers.update(headers or {})
+    response.url = url
+    return response
@@ -0,0 +1,72 @@
+"""Test module for the bank account cache"""
+import unittest
+from unittest import mock
+
+from txnpay import TraxionPay
+from txnpay.tests.helpers import make_response
+
+
+class TestBankAccountCache(unittest.TestCase):
+    """Unit tests for cached `fetch_bank_accounts`"""
+    def setUp(self):
+        self.accounts = [{'id': 413, 'bank_name': 'BDO Unibank', 'account_number': '9012345678'}]
+        self.pool = mock.Mock()
+        self.pool.request.return_value = make_response(200, self.accounts)
+        self.api = TraxionPay(secret_key='secret', api_key='api', session_pool=self.pool)
+
+
+    def test_cached(self):
+        """Test to see if bank accounts are fetched once and indexed"""
+        self.assertEqual(self.api.fetch_bank_accounts(), self.accounts)
+        self.assertEqual(self.api.get_bank_account(account_number='9012345678')['id'], 413)
+        self.assertEqual(self.api.get_bank_account(bank_account_id=413)['id'], 413)
+        self.assertIsNone(self.api.get_bank_account(bank_account_id=1))
+        self.assertEqual(self.pool.request.call_count, 1)
+
+
+    def test_link_updates_cache(self):
+        """Test to see if a linked account is added without refetching"""
+        self.api.fetch_bank_accounts()
+        linked = {'id': 414, 'bank_name': 'BDO Unibank', 'account_number': '1234123412'}
+        self.pool.request.return_value = make_response(201, linked)
+        self.api.link_bank_account(bank_code='161311',
+                                   bank_type='savings',
+                                   account_number='1234123412',
+                                   account_name='John Doe')
+
+        self.assertEqual(len(self.api.fetch_bank_accounts()), 2)
+        self.assertEqual(self.api.get_bank_account(account_number='1234123412')['id'], 414)
+        self.assertEqual(self.pool.request.call_count, 2)
+
+
+    def test_invalidate(self):
+        """Test to see if invalidation and refresh hit the API again"""
+        self.api.fetch_bank_accounts()
+        self.api.invalidate_bank_accounts()
+        self.api.fetch_bank_accounts()
+        self.api.fetch_bank_accounts(refresh=True)
+        self.assertEqual(self.pool.request.call_count, 3)
+
+
+    def test_cache_disabled(self):
+        """Test to see if accounts are found in the fetched list when the cache is disabled"""
+        api = TraxionPay(secret_key='secret', api_key='api', session_pool=self.pool,
+                         bank_accounts_ttl=None)
+        self.assertEqual(api.get_bank_account(account_number='9012345678')['id'], 413)
+        self.assertEqual(api.get_bank_account(bank_account_id=413)['id'], 413)
+        self.assertIsNone(api.get_bank_account(bank_account_id=1))
+        self.assertEqual(self.pool.request.call_count, 3)
+
+
+    def test_unindexable_response(self):
+        """Test to see if lists that cannot be indexed are not cached, and bodies that are not
+        lists do not raise"""
+        accounts = [{'account_number': '1111'}, {'id': 413, 'account_number': '9012345678'}]
+        self.pool.request.return_value = make_response(200, accounts)
+        self.assertEqual(self.api.fetch_bank_accounts(), accounts)
+        self.assertIsNone(self.api.bank_accounts_cache.get())
+        self.assertEqual(self.api.get_bank_account(bank_account_id=413)['id'], 413)
+
+        self.pool.request.return_value = make_response(200, {'detail': 'unexpected'})
+        self.assertEqual(self.api.fetch_bank_accounts(), {'detail': 'unexpected'})
+        self.assertIsNone(self.api.get_bank_account(account_number='9012345678'))
@@ -0,0 +1,77 @@
+"""Test module for the asyncio traxionpay client"""
+import unittest
+from unittest import mock
+
+try:
+    from aiohttp import web
+except ImportError:
+    web = None
+
+from txnpay import AsyncTraxionPay
+from txnpay.exceptions import APIResponseError
+
+
+@unittest.skipIf(web is None, 'aiohttp is not installed')
+class TestAsyncTraxionPay(unittest.IsolatedAsyncioTestCase):
+    """Unit tests for AsyncTraxionPay against a local server"""
+    async def asyncSetUp(self):
+        self.secret_key = "cxl+hwc%97h6+4#lx1au*ut=ml+=!fx85w94iuf*06=rf383xs"
+        self.api_key = "7)5dmcfy^dp*9bdrcfcm$k-n=p7b!x(t)_f^i8mxl@v_+rno*x"
+
+        async def banks(request):
+            return web.json_response([{'id': 1, 'code': '161333', 'name': 'Test Bank'}])
+
+        async def payform_link(request):
+            form = await request.post()
+            self.assertIn('form_data', form)
+            return web.Response(text='ok')
+
+        async def bank_payout(request):
+            return web.Response(status=400, text='invalid otp')
+
+        app = web.Application()
+        app.router.add_get('/banks/', banks)
+        app.router.add_post('/payform-link', payform_link)
+        app.router.add_post('/payout/bank-payout/', bank_payout)
+        self.runner = web.AppRunner(app)
+        await self.runner.setup()
+        site = web.TCPSite(self.runner, '127.0.0.1', 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+
+        self.patcher = mock.patch('txnpay.async_client.BASE_URL',
+                                  'http://127.0.0.1:{}'.format(port))
+        self.patcher.start()
+        self.api = AsyncTraxionPay(secret_key=self.secret_key, api_key=self.api_key)
+
+    async def asyncTearDown(self):
+        await self.api.close()
+        self.patcher.stop()
+        await self.runner.cleanup()
+
+
+    async def test_fetch_banks(self):
+        """Test to see if `fetch_banks` returns banks"""
+        banks = await self.api.fetch_banks()
+        self.assertEqual(banks[0]['code'], '161333')
+
+
+    async def test_cash_in(self):
+        """Test to see if `cash_in` validates and returns the payform url"""
+        with self.assertRaises(ValueError):
+            await self.api.cash_in(merchant_ref_no="ABC123DEF456",
+                                   description="My test payment",
+                                   amount=1500.0)
+
+        url = await self.api.cash_in(merchant_id=6328,
+                                     merchant_ref_no="ABC123DEF456",
+                                     merchant_additional_data={"payment_code": "ABC123DEF456"},
+                                     description="My test payment",
+                                     amount=1500.0)
+        self.assertTrue(url.endswith('/payform-link'))
+
+
+    async def test_cash_out_error(self):
+        """Test to see if error responses raise `APIResponseError`"""
+        with self.assertRaises(APIResponseError):
+            await self.api.cash_out(otp="AB12DE34", bank_account=413, amount=100.0)
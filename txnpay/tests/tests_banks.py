@@ -0,0 +1,68 @@
+"""Test module for the bank directory"""
+import unittest
+from unittest import mock
+
+from txnpay import TraxionPay, BankDirectory
+from txnpay.emulator import Emulator
+
+
+class TestBankDirectory(unittest.TestCase):
+    """Unit tests for BankDirectory"""
+    def setUp(self):
+        self.banks = [
+            {'id': 1, 'code': '161333', 'name': 'Bank of Commerce'},
+            {'id': 2, 'code': '161311', 'name': 'BDO Unibank'},
+            {'id': 3, 'code': '161312', 'name': 'bank of the philippine islands'},
+            {'id': 4, 'code': '161320', 'name': 'Security Bank'},
+        ]
+        self.directory = BankDirectory(self.banks)
+
+
+    def test_lookup(self):
+        """Test to see if banks are found by code"""
+        self.assertIn('161311', self.directory)
+        self.assertEqual(self.directory.get('161320')['id'], 4)
+        self.assertIsNone(self.directory.get('000000'))
+        self.assertEqual(len(self.directory), 4)
+
+
+    def test_search(self):
+        """Test to see if prefix search is case-insensitive and sorted"""
+        names = [bank['name'] for bank in self.directory.search('BANK OF')]
+        self.assertEqual(names, ['Bank of Commerce', 'bank of the philippine islands'])
+        self.assertEqual(len(self.directory.search('b', limit=2)), 2)
+        self.assertEqual(self.directory.search('zzz'), [])
+
+
+    def test_link_bank_account_rejects_unknown_code(self):
+        """Test to see if unknown bank codes are rejected without a request"""
+        api = TraxionPay(secret_key='secret', api_key='api', session_pool=mock.Mock())
+        api.fetch_banks = mock.Mock(return_value=self.banks)
+        directory = api.bank_directory()
+        self.assertIs(api.bank_directory(), directory)
+
+        with self.assertRaises(ValueError):
+            api.link_bank_account(bank_code='000000',
+                                  bank_type='savings',
+                                  account_number='1234123412',
+                                  account_name='John Doe')
+        api.session_pool.request.assert_not_called()
+
+
+    def test_directory_follows_refreshed_banks(self):
+        """Test to see if a bank added after the directory was loaded is accepted once the
+        banks are fetched again, by refresh or once their ttl expired"""
+        with Emulator() as emulator:
+            emulator.add_merchant('secret', 'api')
+            for refresh, banks_ttl in ((True, 300), (False, 0)):
+                with TraxionPay(secret_key='secret', api_key='api', base_url=emulator.url,
+                                banks_ttl=banks_ttl) as api:
+                    api.bank_directory()
+                    code = str(161400 + len(emulator.banks))
+                    emulator.banks.append({'id': len(emulator.banks) + 1, 'code': code,
+                                           'name': 'New Bank {}'.format(code)})
+                    api.fetch_banks(refresh=refresh)
+                    api.link_bank_account(bank_code=code,
+                                          bank_type='savings',
+                                          account_number='1234123412',
+                                          account_name='John Doe')
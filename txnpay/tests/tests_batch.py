@@ -0,0 +1,58 @@
+"""Test module for batch execution"""
+import asyncio
+import random
+import time
+import unittest
+
+from txnpay.batch import BatchResult, run_batch, run_batch_async
+from txnpay.exceptions import APIResponseError
+
+
+def double(value=None):
+    time.sleep(random.random() / 1000)
+    if value == 3:
+        raise APIResponseError('rejected')
+    return value * 2
+
+
+async def double_async(value=None):
+    await asyncio.sleep(random.random() / 1000)
+    return double(value)
+
+
+class TestBatch(unittest.TestCase):
+    """Unit tests for batch execution"""
+    def setUp(self):
+        self.specs = [{'value': value} for value in range(50)]
+
+
+    def test_ordered(self):
+        """Test to see if results keep input order and failures are per item"""
+        results = list(run_batch(double, iter(self.specs), workers=4))
+        self.assertEqual([result.index for result in results], list(range(50)))
+        self.assertIsInstance(results[3].error, APIResponseError)
+        self.assertFalse(results[3].ok)
+        self.assertEqual(results[4].value, 8)
+
+
+    def test_unordered(self):
+        """Test to see if every item is yielded when ordering is off"""
+        results = list(run_batch(double, self.specs, workers=4, ordered=False))
+        self.assertEqual(sorted(result.index for result in results), list(range(50)))
+        self.assertTrue(all(isinstance(result, BatchResult) for result in results))
+
+
+    def test_async(self):
+        """Test to see if the asyncio batch keeps order and isolates failures"""
+        async def collect():
+            return [result async for result in run_batch_async(double_async, self.specs,
+                                                               concurrency=4)]
+        results = asyncio.run(collect())
+        self.assertEqual([result.index for result in results], list(range(50)))
+        self.assertIsInstance(results[3].error, APIResponseError)
+
+
+    def test_invalid_workers(self):
+        """Test to see if a non-positive worker count is rejected"""
+        with self.assertRaises(ValueError):
+            list(run_batch(double, self.specs, workers=0))
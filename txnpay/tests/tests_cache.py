@@ -0,0 +1,76 @@
+"""Test module for response caching"""
+import os
+import shutil
+import tempfile
+import time
+import unittest
+from unittest import mock
+
+from txnpay import TraxionPay, FileCacheStore
+from txnpay.tests.helpers import make_response
+
+
+class TestBanksCache(unittest.TestCase):
+    """Unit tests for the `fetch_banks` cache"""
+    def setUp(self):
+        self.secret_key = "cxl+hwc%97h6+4#lx1au*ut=ml+=!fx85w94iuf*06=rf383xs"
+        self.api_key = "7)5dmcfy^dp*9bdrcfcm$k-n=p7b!x(t)_f^i8mxl@v_+rno*x"
+        self.banks = [{'id': 1, 'code': '161333', 'name': 'Test Bank'}]
+        self.pool = mock.Mock()
+        self.pool.request.return_value = make_response(200, self.banks, {'ETag': '"v1"'})
+        self.api = TraxionPay(secret_key=self.secret_key, api_key=self.api_key,
+                              session_pool=self.pool)
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+
+    def test_cached_within_ttl(self):
+        """Test to see if a fresh cache entry is served without a request"""
+        self.assertEqual(self.api.fetch_banks(), self.banks)
+        self.assertEqual(self.api.fetch_banks(), self.banks)
+        self.assertEqual(self.pool.request.call_count, 1)
+
+
+    def test_refresh(self):
+        """Test to see if `refresh=True` bypasses the cache"""
+        self.api.fetch_banks()
+        self.api.fetch_banks(refresh=True)
+        self.assertEqual(self.pool.request.call_count, 2)
+        self.assertIsNone(self.pool.request.call_args[1]['headers'])
+
+
+    def test_revalidation(self):
+        """Test to see if a stale entry is revalidated with its ETag"""
+        self.api.fetch_banks()
+        entry = self.api.banks_cache.get('banks')
+        entry.expires_at = time.time() - 1
+
+        self.pool.request.return_value = make_response(304)
+        self.assertEqual(self.api.fetch_banks(), self.banks)
+        self.assertEqual(self.pool.request.call_args[1]['headers'], {'If-None-Match': '"v1"'})
+        self.assertTrue(self.api.banks_cache.get('banks').fresh)
+
+
+    def test_disabled(self):
+        """Test to see if `banks_ttl=None` always hits the API"""
+        api = TraxionPay(secret_key=self.secret_key, api_key=self.api_key,
+                         session_pool=self.pool, banks_ttl=None)
+        api.fetch_banks()
+        api.fetch_banks()
+        self.assertEqual(self.pool.request.call_count, 2)
+
+
+    def test_file_store(self):
+        """Test to see if a new client starts warm from the file store"""
+        path = os.path.join(self.directory, 'banks.json')
+        self.api = TraxionPay(secret_key=self.secret_key, api_key=self.api_key,
+                              session_pool=self.pool, cache_store=FileCacheStore(path))
+        self.api.fetch_banks()
+
+        pool = mock.Mock()
+        api = TraxionPay(secret_key=self.secret_key, api_key=self.api_key,
+                         session_pool=pool, cache_store=FileCacheStore(path))
+        self.assertEqual(api.fetch_banks(), self.banks)
+        pool.request.assert_not_called()
@@ -0,0 +1,155 @@
+"""Test module for the command line tools"""
+import csv
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+from txnpay import TraxionPay
+from txnpay.cli import bulk_cash_in, main, read_rows, row_to_fields
+from txnpay.retry import RetryPolicy
+from txnpay.tests.helpers import make_response
+
+HEADER = ['merchant_ref_no', 'description', 'amount', 'merchant_additional_data']
+ROWS = [
+    ['REF-0', 'Invoice 0', '100.0', '{"invoice": 0}'],
+    ['REF-1', 'Invoice 1', 'not a number', '{"invoice": 1}'],
+    ['REF-2', 'Invoice 2', '300.5', '{"invoice": 2}'],
+    ['REF-3', '', '400.0', '{"invoice": 3}'],
+    ['REF-4', 'Invoice 4', '500', '{"invoice": 4}'],
+]
+
+
+class TestCli(unittest.TestCase):
+    """Unit tests for the command line tools"""
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.input_path = os.path.join(self.directory, 'invoices.csv')
+        self.output_path = os.path.join(self.directory, 'links.csv')
+        with open(self.input_path, 'w', newline='') as input_file:
+            writer = csv.writer(input_file)
+            writer.writerow(HEADER)
+            writer.writerows(ROWS)
+
+        self.pool = mock.Mock()
+        self.pool.request.return_value = make_response(
+            200, b'', url='https://devapi.traxionpay.com/payform-link/abc')
+        self.api = TraxionPay(secret_key='secret', api_key='api', session_pool=self.pool)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+
+    def read_output(self):
+        with open(self.output_path, newline='') as output_file:
+            return list(csv.DictReader(output_file))
+
+
+    def test_row_to_fields(self):
+        """Test to see if CSV cells are typed and empty cells dropped"""
+        fields = row_to_fields({'merchant_id': '6328', 'amount': '1.5', 'billing_zip': '',
+                                'merchant_additional_data': '{"a": 1}'})
+        self.assertEqual(fields, {'merchant_id': 6328, 'amount': 1.5,
+                                  'merchant_additional_data': {'a': 1}})
+        self.assertEqual(next(read_rows(self.input_path))['merchant_ref_no'], 'REF-0')
+
+
+    def test_bulk_cash_in(self):
+        """Test to see if links are written in input order with row errors"""
+        report = bulk_cash_in(self.api, self.input_path, self.output_path,
+                              constant_fields={'merchant_id': 6328}, concurrency=3)
+
+        rows = self.read_output()
+        self.assertEqual([row['row'] for row in rows], ['0', '1', '2', '3', '4'])
+        self.assertEqual([row['merchant_ref_no'] for row in rows],
+                         ['REF-0', 'REF-1', 'REF-2', 'REF-3', 'REF-4'])
+        self.assertTrue(rows[0]['url'].endswith('/payform-link/abc'))
+        self.assertTrue(rows[1]['error'].startswith('ValueError: amount'))
+        self.assertTrue(rows[3]['error'].startswith('ValueError: description'))
+        self.assertEqual((report.succeeded, report.failed), (3, 2))
+        self.assertEqual(report.errors, {'ValueError': 2})
+        self.assertEqual(self.pool.request.call_count, 3)
+
+
+    def test_invalid_jsonl_line(self):
+        """Test to see if a malformed JSONL line fails its row and the run goes on"""
+        input_path = os.path.join(self.directory, 'invoices.jsonl')
+        with open(input_path, 'w') as input_file:
+            input_file.write('{"merchant_ref_no": "REF-0", "description": "Invoice 0", '
+                             '"amount": 100.0, "merchant_additional_data": {"invoice": 0}}\n'
+                             '{"merchant_ref_no": "REF-1", \n'
+                             '\n'
+                             '[1, 2]\n'
+                             '{"merchant_ref_no": "REF-4", "description": "Invoice 4", '
+                             '"amount": 500.0, "merchant_additional_data": {"invoice": 4}}\n')
+        report = bulk_cash_in(self.api, input_path, self.output_path,
+                              constant_fields={'merchant_id': 6328})
+
+        rows = self.read_output()
+        self.assertEqual([row['merchant_ref_no'] for row in rows], ['REF-0', '', '', 'REF-4'])
+        self.assertTrue(rows[1]['error'].startswith('ValueError: line 2 is not valid JSON'))
+        self.assertEqual(rows[2]['error'], 'ValueError: line 4 is not a JSON object')
+        self.assertEqual((report.succeeded, report.failed), (2, 2))
+
+
+    def test_resume(self):
+        """Test to see if an interrupted run resumes after the last row written"""
+        bulk_cash_in(self.api, self.input_path, self.output_path,
+                     constant_fields={'merchant_id': 6328}, checkpoint_every=1)
+        with open(self.output_path, 'rb') as output_file:
+            complete = output_file.read()
+
+        # cut the output in the middle of the fourth row, without a checkpoint
+        lines = complete.splitlines(True)
+        with open(self.output_path, 'wb') as output_file:
+            output_file.write(b''.join(lines[:3]) + lines[3][:5])
+        os.remove(self.output_path + '.checkpoint')
+
+        self.pool.request.reset_mock()
+        report = bulk_cash_in(self.api, self.input_path, self.output_path,
+                              constant_fields={'merchant_id': 6328})
+        with open(self.output_path, 'rb') as output_file:
+            self.assertEqual(output_file.read(), complete)
+        self.assertEqual(report.resumed, 2)
+        self.assertEqual(self.pool.request.call_count, 2)
+
+        # a finished run has nothing left to do
+        report = bulk_cash_in(self.api, self.input_path, self.output_path,
+                              constant_fields={'merchant_id': 6328})
+        self.assertEqual((report.resumed, report.processed), (5, 0))
+
+
+    def test_retry_failed(self):
+        """Test to see if failed rows are only sent again with retry_failed"""
+        self.pool.request.side_effect = [make_response(503, b'unavailable')] + [
+            make_response(200, b'', url='https://devapi.traxionpay.com/payform-link/abc')] * 9
+        api = TraxionPay(secret_key='secret', api_key='api', session_pool=self.pool,
+                         retry_policy=RetryPolicy(max_retries=0))
+        report = bulk_cash_in(api, self.input_path, self.output_path,
+                              constant_fields={'merchant_id': 6328})
+        self.assertEqual((report.succeeded, report.failed), (2, 3))
+        self.assertTrue(self.read_output()[0]['error'].startswith('APIResponseError'))
+
+        report = bulk_cash_in(api, self.input_path, self.output_path,
+                              constant_fields={'merchant_id': 6328})
+        self.assertEqual((report.resumed, report.processed), (5, 0))
+
+        report = bulk_cash_in(api, self.input_path, self.output_path,
+                              constant_fields={'merchant_id': 6328}, retry_failed=True)
+        self.assertEqual((report.resumed, report.succeeded, report.failed), (2, 1, 2))
+        rows = self.read_output()
+        self.assertEqual([row['row'] for row in rows], ['0', '1', '2', '3', '4'])
+        self.assertEqual([bool(row['url']) for row in rows], [True, False, True, False, True])
+        self.assertEqual(self.pool.request.call_count, 4)
+
+        report = bulk_cash_in(api, self.input_path, self.output_path,
+                              constant_fields={'merchant_id': 6328})
+        self.assertEqual((report.resumed, report.processed), (5, 0))
+
+
+    def test_main_requires_keys(self):
+        """Test to see if the command refuses to run without credentials"""
+        with mock.patch.dict(os.environ, {}, clear=True):
+            with mock.patch('sys.stderr'):
+                self.assertEqual(main(['bulk-cash-in', self.input_path, self.output_path]), 2)
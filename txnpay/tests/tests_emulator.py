@@ -0,0 +1,173 @@
+"""Test module for the local TraxionPay API emulator"""
+import asyncio
+import base64
+import json
+import unittest
+
+import requests
+
+from txnpay import AsyncTraxionPay, TraxionPay
+from txnpay.emulator import Emulator, Faults
+from txnpay.exceptions import APIResponseError
+from txnpay.retry import RetryPolicy
+
+PAYMENT = {
+    'merchant_id': 6328,
+    'merchant_ref_no': 'ABX4443',
+    'description': 'Order #4443',
+    'amount': 1500.0,
+    'merchant_additional_data': {'payment_code': 'ABX4443'},
+}
+
+
+class TestEmulator(unittest.TestCase):
+    """Unit tests for Emulator"""
+    def setUp(self):
+        self.emulator = Emulator(merchants={'secret': 'api'}, seed=1).start()
+        self.api = TraxionPay(secret_key='secret', api_key='api', base_url=self.emulator.url,
+                              retry_policy=RetryPolicy(max_retries=0))
+
+    def tearDown(self):
+        self.api.close()
+        self.emulator.stop()
+
+
+    def test_cash_in(self):
+        """Test to see if a signed cash_in gets an idempotent payform url"""
+        url = self.api.cash_in(**PAYMENT)
+        self.assertTrue(url.startswith('{}/payform/'.format(self.emulator.url)))
+        self.assertEqual(self.api.cash_in(**PAYMENT), url)
+        self.assertEqual(self.emulator.requests[('payform-link', 302)], 2)
+
+
+    def test_prepared_cash_in(self):
+        """Test to see if prepared payloads pass verification"""
+        pay = self.api.prepare_cash_in(merchant_id=6328, merchant_additional_data={})
+        self.assertIn('/payform/', pay(merchant_ref_no='A1', description='x', amount=10))
+
+
+    def test_cash_in_wrong_secret(self):
+        """Test to see if a secure_hash signed with another secret is rejected"""
+        self.emulator.add_merchant('other', 'api-other')
+        forged = TraxionPay(secret_key='other', api_key='api-other',
+                            base_url=self.emulator.url)
+        forged.signer.secure_hash = self.api.signer.secure_hash
+        with self.assertRaisesRegex(APIResponseError, 'invalid secure_hash'):
+            forged.cash_in(**PAYMENT)
+
+
+    def test_cash_in_unknown_merchant(self):
+        """Test to see if an unknown auth_hash is rejected"""
+        api = TraxionPay(secret_key='unknown', api_key='api', base_url=self.emulator.url)
+        with self.assertRaisesRegex(APIResponseError, 'invalid auth_hash'):
+            api.cash_in(**PAYMENT)
+
+
+    def test_tampered_amount(self):
+        """Test to see if a payload changed after signing is rejected"""
+        payload = dict(PAYMENT, merchant_additional_data='e30=', currency='PHP', alg='HS256',
+                       auth_hash=self.api.signer.auth_hash)
+        payload['secure_hash'] = self.api.signer.secure_hash('ABX4443', 1500.0, 'Order #4443')
+        payload['amount'] = 1.0
+        response = requests.post('{}/payform-link'.format(self.emulator.url), data={
+            'form_data': base64.b64encode(json.dumps(payload).encode())})
+        self.assertEqual(response.status_code, 401)
+
+
+    def test_banks_revalidated(self):
+        """Test to see if fetch_banks revalidates with the ETag"""
+        api = TraxionPay(secret_key='secret', api_key='api', base_url=self.emulator.url,
+                         banks_ttl=0)
+        banks = api.fetch_banks()
+        self.assertEqual(api.fetch_banks(), banks)
+        self.assertEqual(self.emulator.requests[('banks', 304)], 1)
+
+
+    def test_cash_out(self):
+        """Test to see if the payout flow works and OTPs are single use"""
+        account = self.api.link_bank_account(bank_code='161311', bank_type='savings',
+                                             account_number='9012345678',
+                                             account_name='John Doe')
+        self.assertEqual(self.api.fetch_bank_accounts(refresh=True), [account])
+        otp = self.api.fetch_otp()['code']
+        payout = self.api.cash_out(otp=otp, amount=100.0, bank_account=account['id'],
+                                   idempotency_key='p-1')
+        self.assertEqual(payout['status'], 'processing')
+        self.assertEqual(self.api.cash_out(otp=otp, amount=100.0, bank_account=account['id'],
+                                           idempotency_key='p-1'), payout)
+        with self.assertRaisesRegex(APIResponseError, 'invalid otp'):
+            self.api.cash_out(otp=otp, amount=100.0, bank_account=account['id'])
+
+
+    def test_requires_authorization(self):
+        """Test to see if payout endpoints reject unknown credentials"""
+        api = TraxionPay(secret_key='unknown', api_key='api', base_url=self.emulator.url)
+        with self.assertRaises(APIResponseError):
+            api.fetch_otp()
+
+
+    def test_unknown_bank(self):
+        """Test to see if linking an unknown bank is rejected"""
+        with self.assertRaisesRegex(APIResponseError, 'unknown bank'):
+            self.api.link_bank_account(bank_code='999', bank_type='savings',
+                                       account_number='1', account_name='John Doe')
+
+
+    def test_error_rate(self):
+        """Test to see if injected errors are retried by the client"""
+        self.emulator.set_faults(Faults(error_rate=1.0, error_statuses=(503,)), 'banks')
+        with self.assertRaises(APIResponseError):
+            self.api.fetch_banks()
+        api = TraxionPay(secret_key='secret', api_key='api', base_url=self.emulator.url,
+                         retry_policy=RetryPolicy(max_retries=20, backoff_base=0.001))
+        self.emulator.set_faults(Faults(error_rate=0.5, error_statuses=(503,)), 'banks')
+        self.assertTrue(api.fetch_banks())
+        self.assertIsNone(self.emulator.faults_for('payout'))
+
+
+    def test_reset(self):
+        """Test to see if resets surface as connection errors"""
+        self.emulator.set_faults(Faults(reset_rate=1.0))
+        with self.assertRaises(requests.ConnectionError):
+            self.api.fetch_otp()
+        self.assertEqual(self.emulator.requests[('get-otp', 'reset')], 1)
+
+
+    def test_throttle(self):
+        """Test to see if requests over the rate get 429 with Retry-After"""
+        self.emulator.set_faults(Faults(throttle_rate=1, throttle_burst=2), 'get-otp')
+        statuses = [requests.post('{}/payout/bank-payout/get-otp/'.format(self.emulator.url),
+                                  headers=self.api.auth_headers)
+                    for _ in range(3)]
+        self.assertEqual([response.status_code for response in statuses], [200, 200, 429])
+        self.assertGreater(float(statuses[2].headers['Retry-After']), 0)
+
+
+    def test_latency(self):
+        """Test to see if latency is added to responses"""
+        self.emulator.set_faults(Faults(latency=0.05), 'banks')
+        response = requests.get('{}/banks/'.format(self.emulator.url))
+        self.assertGreaterEqual(response.elapsed.total_seconds(), 0.05)
+
+
+    def test_unknown_endpoint(self):
+        """Test to see if unknown endpoints are rejected"""
+        with self.assertRaises(ValueError):
+            self.emulator.set_faults(Faults(), 'nope')
+        self.assertEqual(requests.get('{}/nope'.format(self.emulator.url)).status_code, 404)
+
+
+    def test_async_client(self):
+        """Test to see if AsyncTraxionPay works against the emulator"""
+        async def run():
+            async with AsyncTraxionPay(secret_key='secret', api_key='api',
+                                       base_url=self.emulator.url) as api:
+                return await api.cash_in(**PAYMENT), await api.fetch_otp()
+
+        url, otp = asyncio.run(run())
+        self.assertIn('/payform/', url)
+        self.assertIn('code', otp)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,35 @@
+"""Test module for lazy imports"""
+import subprocess
+import sys
+import unittest
+
+DEFERRED_MODULES = ('requests', 'urllib3', 'asyncio', 'aiohttp', 'concurrent.futures',
+                    'hmac', 'json', 'orjson', 'email.utils')
+
+
+def run_python(code):
+    return subprocess.run([sys.executable, '-c', code],
+                          stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                          universal_newlines=True, check=True)
+
+
+class TestImports(unittest.TestCase):
+    """Unit tests for lazy imports"""
+    def test_deferred_dependencies(self):
+        """Test to see if heavy dependencies wait for the first network call"""
+        code = ('import sys\n'
+                'from txnpay import TraxionPay\n'
+                'TraxionPay(secret_key="secret", api_key="api")\n'
+                'print(" ".join(name for name in {!r} if name in sys.modules))').format(
+                    DEFERRED_MODULES)
+        self.assertEqual(run_python(code).stdout.strip(), '')
+
+
+    def test_lazy_exports(self):
+        """Test to see if every public name resolves"""
+        import txnpay
+        for name in txnpay.__all__:
+            self.assertEqual(getattr(txnpay, name).__name__, name)
+        self.assertIn('TraxionPay', dir(txnpay))
+        with self.assertRaises(AttributeError):
+            txnpay.Missing  # pylint: disable=pointless-statement
@@ -0,0 +1,103 @@
+"""Test module for the write-ahead journal"""
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+from unittest import mock
+
+import requests
+
+from txnpay import TraxionPay, Journal
+from txnpay.exceptions import APIResponseError
+from txnpay.retry import RetryPolicy
+from txnpay.tests.helpers import make_response
+
+PAYFORM_URL = 'https://devapi.traxionpay.com/payform-link'
+
+CASH_IN_VALUES = {
+    'merchant_id': 6328,
+    'merchant_ref_no': 'ABC123DEF456',
+    'merchant_additional_data': {'payment_code': 'ABC123DEF456'},
+    'description': 'My test payment',
+    'amount': 1500.0,
+}
+
+
+
+class TestJournal(unittest.TestCase):
+    """Unit tests for the write-ahead journal"""
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'txnpay.journal')
+        self.journal = Journal(self.path)
+        self.pool = mock.Mock()
+        self.pool.request.return_value = make_response(200, b'{}', url=PAYFORM_URL)
+        self.api = TraxionPay(secret_key='secret', api_key='api', session_pool=self.pool,
+                              journal=self.journal, retry_policy=RetryPolicy(max_retries=0))
+
+    def tearDown(self):
+        self.journal.close()
+        shutil.rmtree(self.directory)
+
+
+    def test_cash_in_deduplicated(self):
+        """Test to see if a cash in already done is answered from the journal"""
+        url = self.api.cash_in(**CASH_IN_VALUES)
+        self.assertEqual(self.api.cash_in(**CASH_IN_VALUES), url)
+        self.assertEqual(self.pool.request.call_count, 1)
+        self.assertEqual(self.journal.get('cash_in', 'ABC123DEF456')['state'], Journal.DONE)
+
+        # a restarted process sees the same journal
+        self.journal.close()
+        self.journal = Journal(self.path)
+        self.assertEqual(self.journal.result('cash_in', 'ABC123DEF456'), url)
+
+
+    def test_outcomes(self):
+        """Test to see if failures are told apart from unknown outcomes"""
+        self.pool.request.return_value = make_response(400, b'declined', url=PAYFORM_URL)
+        with self.assertRaises(APIResponseError):
+            self.api.cash_out(otp='AB12DE34', bank_account=413, amount=100.0,
+                              idempotency_key='payout-1')
+        self.assertEqual(self.journal.get('cash_out', 'payout-1')['state'], Journal.FAILED)
+
+        self.pool.request.side_effect = requests.ConnectionError('reset')
+        with self.assertRaises(requests.ConnectionError):
+            self.api.cash_out(otp='AB12DE34', bank_account=413, amount=100.0,
+                              idempotency_key='payout-2')
+        unresolved = self.journal.unresolved()
+        self.assertEqual([entry['key'] for entry in unresolved], ['payout-2'])
+        self.assertEqual(unresolved[0]['bank_account'], 413)
+
+
+    def test_crash_recovery(self):
+        """Test to see if intents without outcome are unresolved and torn records dropped"""
+        self.journal.intent('cash_in', 'REF-1', amount=10.0)
+        self.journal.close()
+        with open(self.path, 'ab') as journal_file:
+            journal_file.write(b'{"op":"cash_in","key":"REF-2","sta')
+
+        self.journal = Journal(self.path)
+        self.assertEqual([entry['key'] for entry in self.journal.unresolved()], ['REF-1'])
+        self.journal.outcome('cash_in', 'REF-1', result='https://pay/1')
+        self.journal.close()
+
+        self.journal = Journal(self.path)
+        self.assertEqual(self.journal.result('cash_in', 'REF-1'), 'https://pay/1')
+        self.assertEqual(self.journal.unresolved(), [])
+
+
+    def test_group_commit(self):
+        """Test to see if concurrent durable intents share fsyncs"""
+        self.journal.close()
+        self.journal = Journal(self.path, commit_interval=0.01, sync_intents=True)
+        with mock.patch('txnpay.journal.os.fsync', wraps=os.fsync) as fsync:
+            threads = [threading.Thread(target=self.journal.intent, args=('cash_in', str(index)))
+                       for index in range(20)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            self.assertTrue(self.journal.wait(timeout=5))
+            self.assertLess(fsync.call_count, 20)
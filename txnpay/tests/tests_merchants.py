@@ -0,0 +1,154 @@
+"""Test module for the multi-merchant client registry"""
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from unittest import mock
+
+from txnpay import MerchantRegistry
+from txnpay.utils import generate_token
+from txnpay.tests.helpers import make_response
+
+
+def credentials(merchant):
+    return 'secret-{}'.format(merchant), 'api-{}'.format(merchant)
+
+
+class TestMerchantRegistry(unittest.TestCase):
+    """Unit tests for MerchantRegistry"""
+    def setUp(self):
+        self.pool = mock.Mock()
+        self.pool.request.return_value = make_response(200, b'[{"code": 1}]')
+
+
+    def test_clients_share_pool(self):
+        """Test to see if every merchant's client uses the shared pool and its own keys"""
+        registry = MerchantRegistry(credentials, session_pool=self.pool)
+        first, second = registry.get(1), registry.get(2)
+        self.assertIs(first.session_pool, self.pool)
+        self.assertIs(second.session_pool, self.pool)
+        self.assertIs(first.circuit_breakers, second.circuit_breakers)
+        self.assertEqual(first.auth_headers['Authorization'],
+                         'Basic {}'.format(generate_token(secret_key='secret-1')))
+        self.assertNotEqual(first.signer.auth_hash, second.signer.auth_hash)
+
+
+    def test_get_reuses_client(self):
+        """Test to see if a merchant's client is created once"""
+        lookup = mock.Mock(side_effect=credentials)
+        registry = MerchantRegistry(lookup, session_pool=self.pool)
+        self.assertIs(registry.get(1), registry[1])
+        lookup.assert_called_once_with(1)
+        self.assertEqual(registry.stats(), {'clients': 1, 'hits': 1, 'misses': 1,
+                                            'evictions': 0})
+
+
+    def test_lru_eviction(self):
+        """Test to see if the least recently used client is dropped"""
+        registry = MerchantRegistry(credentials, max_clients=2, session_pool=self.pool)
+        first = registry.get(1)
+        registry.get(2)
+        registry.get(1)
+        registry.get(3)
+        self.assertEqual(len(registry), 2)
+        self.assertIn(1, registry)
+        self.assertNotIn(2, registry)
+        self.assertIs(registry.get(1), first)
+        self.assertEqual(registry.evictions, 1)
+        self.pool.close.assert_not_called()
+
+
+    def test_dropped_clients_released(self):
+        """Test to see if evicted and invalidated clients stop their hedging threads"""
+        registry = MerchantRegistry(credentials, max_clients=1, session_pool=self.pool)
+        executors = []
+        for merchant in (1, 2, 3):
+            executor = mock.Mock()
+            registry.get(merchant)._hedge_executor = executor
+            executors.append(executor)
+        registry.invalidate(3)
+        for executor in executors:
+            executor.shutdown.assert_called_once_with(wait=False)
+        self.pool.close.assert_not_called()
+
+
+    def test_cookies_not_shared(self):
+        """Test to see if a cookie set for one merchant is never sent for another"""
+        cookies = []
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):  # pylint: disable=arguments-differ
+                pass
+
+            def do_GET(self):  # pylint: disable=invalid-name
+                cookies.append(self.headers.get('Cookie'))
+                self.send_response(200)
+                self.send_header('Set-Cookie', 'sessionid={}; Path=/'.format(
+                    self.headers['Authorization']))
+                self.send_header('Content-Length', '2')
+                self.end_headers()
+                self.wfile.write(b'[]')
+
+        httpd = HTTPServer(('127.0.0.1', 0), Handler)
+        threading.Thread(target=httpd.serve_forever, daemon=True).start()
+        url = 'http://127.0.0.1:{}'.format(httpd.server_address[1])
+        try:
+            with MerchantRegistry(credentials, base_url=url) as registry:
+                for merchant in (1, 2, 1):
+                    registry.get(merchant).fetch_bank_accounts(refresh=True)
+        finally:
+            httpd.shutdown()
+            httpd.server_close()
+        self.assertEqual(cookies, [None, None, None])
+
+
+    def test_stays_flat(self):
+        """Test to see if the number of clients stays bounded as merchants grow"""
+        registry = MerchantRegistry(credentials, max_clients=10, session_pool=self.pool)
+        for merchant in range(500):
+            registry.get(merchant).fetch_banks()
+        self.assertEqual(len(registry), 10)
+        self.assertEqual(registry.evictions, 490)
+
+
+    def test_banks_cache_shared(self):
+        """Test to see if merchants share the fetch_banks cache"""
+        registry = MerchantRegistry(credentials, session_pool=self.pool)
+        registry.get(1).fetch_banks()
+        self.assertEqual(registry.get(2).fetch_banks(), [{'code': 1}])
+        self.assertEqual(self.pool.request.call_count, 1)
+
+
+    def test_mapping_credentials(self):
+        """Test to see if an unknown merchant raises KeyError"""
+        registry = MerchantRegistry({'shop': ('secret', 'api')}, session_pool=self.pool)
+        self.assertEqual(registry.get('shop').api_key, 'api')
+        with self.assertRaises(KeyError):
+            registry.get('other')
+
+
+    def test_invalidate(self):
+        """Test to see if an invalidated client is created again"""
+        lookup = mock.Mock(side_effect=credentials)
+        registry = MerchantRegistry(lookup, session_pool=self.pool)
+        first = registry.get(1)
+        registry.invalidate(1)
+        self.assertIsNot(registry.get(1), first)
+        self.assertEqual(lookup.call_count, 2)
+
+
+    def test_close(self):
+        """Test to see if closing the registry closes the shared pool"""
+        with MerchantRegistry(credentials, session_pool=self.pool) as registry:
+            registry.get(1)
+        self.assertEqual(len(registry), 0)
+        self.pool.close.assert_called_once_with()
+
+
+    def test_journal_rejected(self):
+        """Test to see if a journal, keyed by merchant_ref_no, cannot be shared by merchants"""
+        with self.assertRaises(ValueError):
+            MerchantRegistry(credentials, session_pool=self.pool, journal=mock.Mock())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,150 @@
+"""Test module for instrumentation hooks and metrics"""
+import json
+import subprocess
+import sys
+import unittest
+from unittest import mock
+
+import requests
+
+from txnpay import TraxionPay, Instrumentation, MetricsCollector
+from txnpay.exceptions import MissingAuthenticationError
+from txnpay.retry import RetryPolicy
+from txnpay.metrics import Histogram
+from txnpay.tests.helpers import make_response
+
+
+class TestMetrics(unittest.TestCase):
+    """Unit tests for instrumentation hooks and metrics"""
+    def setUp(self):
+        self.pool = mock.Mock()
+        self.pool.request.return_value = make_response(
+            200, url='https://devapi.traxionpay.com/payform-link')
+        self.metrics = MetricsCollector()
+        self.api = TraxionPay(secret_key='secret', api_key='api', session_pool=self.pool,
+                              instrumentation=self.metrics,
+                              retry_policy=RetryPolicy(max_retries=2, backoff_base=0))
+
+
+    def test_hooks(self):
+        """Test to see if hooks receive a complete call record"""
+        records = []
+
+        class Recorder(Instrumentation):
+            def before_call(self, record):
+                records.append(('before', record.endpoint, record.duration))
+
+            def after_call(self, record):
+                records.append(('after', record))
+
+        api = TraxionPay(secret_key='secret', api_key='api', session_pool=self.pool,
+                         instrumentation=Recorder())
+        api.cash_in(merchant_id=6328,
+                    merchant_ref_no="ABC123DEF456",
+                    merchant_additional_data={"payment_code": "ABC123DEF456"},
+                    description="My test payment",
+                    amount=1500.0)
+
+        self.assertEqual(records[0], ('before', 'payform-link', None))
+        record = records[1][1]
+        self.assertEqual(record.status, 200)
+        self.assertIsNone(record.error)
+        self.assertEqual(record.retries, 0)
+        self.assertGreater(record.request_bytes, 0)
+        self.assertEqual(record.response_bytes, 2)
+        self.assertEqual(set(record.phases), {'validate', 'sign', 'encode', 'send'})
+        self.assertGreaterEqual(record.duration, record.phases['send'])
+
+
+    def test_retries_and_errors(self):
+        """Test to see if retries and raised errors are counted"""
+        self.pool.request.side_effect = requests.ConnectionError('unreachable')
+        with self.assertRaises(requests.ConnectionError):
+            self.api.fetch_banks()
+
+        self.assertEqual(self.metrics.retries['banks'], 2)
+        self.assertEqual(self.metrics.errors[('banks', 'ConnectionError')], 1)
+        self.assertEqual(self.metrics.requests[('banks', 'none')], 1)
+        self.assertEqual(self.metrics.in_flight['banks'], 0)
+
+
+    def test_histogram(self):
+        """Test to see if histogram buckets are cumulative and inclusive"""
+        histogram = Histogram((0.1, 1.0))
+        for value in (0.05, 0.1, 0.5, 2.0):
+            histogram.observe(value)
+        self.assertEqual(list(histogram.cumulative()), [(0.1, 2), (1.0, 3), (float('inf'), 4)])
+        self.assertEqual(histogram.count, 4)
+
+
+    def test_render(self):
+        """Test to see if metrics render in the Prometheus text format"""
+        self.api.fetch_banks()
+        text = self.metrics.render()
+
+        self.assertIn('# TYPE txnpay_requests_total counter', text)
+        self.assertIn('txnpay_requests_total{endpoint="banks",status="200"} 1', text)
+        self.assertIn('# TYPE txnpay_call_duration_seconds histogram', text)
+        self.assertIn('txnpay_call_duration_seconds_bucket{endpoint="banks",le="+Inf"} 1', text)
+        self.assertIn('txnpay_call_duration_seconds_count{endpoint="banks"} 1', text)
+        self.assertIn('txnpay_phase_duration_seconds_count{endpoint="banks",phase="send"} 1',
+                      text)
+        self.assertTrue(text.endswith('\n'))
+
+
+    def test_request_bytes_sent(self):
+        """Test to see if request_bytes counts the json body as it is sent"""
+        records = []
+
+        class Recorder(Instrumentation):
+            def after_call(self, record):
+                records.append(record)
+
+        api = TraxionPay(secret_key='secret', api_key='api', session_pool=self.pool,
+                         instrumentation=Recorder())
+        api.cash_out(otp='123456', amount=1500.0, bank_account=413)
+        kwargs = self.pool.request.call_args[1]
+        self.assertNotIn('json', kwargs)
+        self.assertEqual(kwargs['headers']['Content-Type'], 'application/json')
+        self.assertEqual(records[0].request_bytes, len(kwargs['data']))
+        self.assertEqual(json.loads(kwargs['data']),
+                         {'OTP': '123456', 'amount': 1500.0, 'bank_account': 413})
+
+
+    def test_unsent_payload_phases_dropped(self):
+        """Test to see if phases of a payload that was never sent do not reach the next call"""
+        records = []
+
+        class Recorder(Instrumentation):
+            def after_call(self, record):
+                records.append(record)
+
+        journal = mock.Mock()
+        journal.result.return_value = 'https://devapi.traxionpay.com/payform-link'
+        api = TraxionPay(secret_key='secret', api_key='api', session_pool=self.pool,
+                         instrumentation=Recorder(), journal=journal)
+        api.cash_in(merchant_id=6328, merchant_ref_no='ABC123DEF456',
+                    merchant_additional_data={'payment_code': 'ABC123DEF456'},
+                    description='My test payment', amount=1500.0)
+        del api.auth_headers
+        with self.assertRaises(MissingAuthenticationError):
+            api.link_bank_account(bank_code='161311', bank_type='savings',
+                                  account_number='1234123412', account_name='John Doe')
+        api.fetch_banks()
+        self.assertEqual(len(records), 1)
+        self.assertNotIn('validate', records[0].phases)
+
+
+    def test_without_contextvars(self):
+        """Test to see if phases are stashed per thread on pythons without contextvars"""
+        code = ('import sys\n'
+                'sys.modules["contextvars"] = None\n'
+                'from txnpay import TraxionPay\n'
+                'from txnpay.metrics import PhaseTimer, take_phases\n'
+                'timer = PhaseTimer()\n'
+                'timer.mark("validate")\n'
+                'timer.stash()\n'
+                'print(sorted(take_phases()), take_phases())')
+        output = subprocess.run([sys.executable, '-c', code], stdout=subprocess.PIPE,
+                                universal_newlines=True, check=True).stdout
+        self.assertEqual(output.strip(), "['validate'] {}")
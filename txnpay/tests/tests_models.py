@@ -0,0 +1,136 @@
+"""Test module for lazily decoded response models"""
+import json
+import pickle
+import unittest
+from unittest import mock
+
+from txnpay import Bank, BankAccount, Payout, TraxionPay
+from txnpay.models import split_array
+from txnpay.tests.helpers import make_response
+
+
+ACCOUNTS = [
+    {'id': 413, 'bank': '161311', 'bank_type': 'savings', 'account_number': '9012345678',
+     'account_name': 'John Doe'},
+    {'id': 414, 'bank': '161312', 'bank_type': 'checkings', 'account_number': '9012345679',
+     'account_name': 'Jane "JD" Doe {}', 'branch': {'name': 'Makati', 'codes': [1, 2]}},
+]
+
+
+class TestSplitArray(unittest.TestCase):
+    """Unit tests for split_array"""
+
+    def test_flat_and_nested(self):
+        """Test to see if objects are split without decoding them"""
+        content = json.dumps(ACCOUNTS).encode()
+        self.assertEqual([json.loads(raw) for raw in split_array(content)], ACCOUNTS)
+
+
+    def test_strings_with_brackets(self):
+        """Test to see if brackets and escaped quotes in strings are skipped"""
+        content = b' [ {"a": "}]\\"{["} , {"b": [{"c": "]"}]} ] '
+        self.assertEqual(split_array(content), [b'{"a": "}]\\"{["}', b'{"b": [{"c": "]"}]}'])
+
+
+    def test_empty_and_invalid(self):
+        """Test to see if empty arrays split and non-arrays raise"""
+        self.assertEqual(split_array(b'[]'), [])
+        with self.assertRaises(ValueError):
+            split_array(b'{"a": 1}')
+        with self.assertRaises(ValueError):
+            split_array(b'[1, 2]')
+        with self.assertRaises(ValueError):
+            split_array(b'[{"a": [}')
+
+
+class TestModels(unittest.TestCase):
+    """Unit tests for response models"""
+
+    def test_lazy_decoding(self):
+        """Test to see if fields are decoded on first access"""
+        account = BankAccount.list_from_json(json.dumps(ACCOUNTS).encode())[0]
+        self.assertIsNotNone(account._raw)
+        self.assertEqual(account.account_number, '9012345678')
+        self.assertIsNone(account._raw)
+        self.assertEqual(account.id, 413)
+
+
+    def test_dict_access(self):
+        """Test to see if models read like the dicts they replace"""
+        account = BankAccount.from_json(json.dumps(ACCOUNTS[1]))
+        self.assertEqual(account['account_name'], 'Jane "JD" Doe {}')
+        self.assertEqual(account['branch'], {'name': 'Makati', 'codes': [1, 2]})
+        self.assertEqual(account.get('missing', 'default'), 'default')
+        self.assertIn('id', account)
+        self.assertEqual(account, ACCOUNTS[1])
+        self.assertEqual(dict(account), ACCOUNTS[1])
+        self.assertEqual(list(account), list(ACCOUNTS[1]))
+        self.assertEqual(len(account), 6)
+
+
+    def test_missing_fields(self):
+        """Test to see if fields missing from the response are None but not keys"""
+        bank = Bank.from_json(b'{"code": "161311"}')
+        self.assertIsNone(bank.name)
+        self.assertNotIn('name', bank)
+        with self.assertRaises(KeyError):
+            bank['name']
+        with self.assertRaises(AttributeError):
+            bank.nope
+
+
+    def test_compact(self):
+        """Test to see if models have no instance dict"""
+        bank = Bank.from_dict({'code': '161311', 'name': 'BPI'})
+        with self.assertRaises(AttributeError):
+            bank.__dict__
+        with self.assertRaises(AttributeError):
+            bank.other = 1
+
+
+    def test_serialization(self):
+        """Test to see if models pickle and encode as JSON"""
+        payout = Payout.from_json(b'{"id": 1, "amount": 100.0, "status": "processing"}')
+        self.assertEqual(pickle.loads(pickle.dumps(payout)), payout)
+        from txnpay.models import to_json
+        self.assertEqual(json.loads(json.dumps([payout], default=to_json)), [payout.to_dict()])
+
+
+class TestClientModels(unittest.TestCase):
+    """Unit tests for clients with response_models"""
+    def setUp(self):
+        self.pool = mock.Mock()
+        self.api = TraxionPay(secret_key='secret', api_key='api', session_pool=self.pool,
+                              response_models=True)
+
+
+    def test_fetch_bank_accounts(self):
+        """Test to see if lists come back as models indexed by the accounts cache"""
+        self.pool.request.return_value = make_response(200, ACCOUNTS)
+        accounts = self.api.fetch_bank_accounts()
+        self.assertIsInstance(accounts[0], BankAccount)
+        self.assertEqual(self.api.get_bank_account(account_number='9012345679')['id'], 414)
+
+
+    def test_link_bank_account(self):
+        """Test to see if linked account models are added to the cache"""
+        self.pool.request.return_value = make_response(200, ACCOUNTS[:1])
+        self.api.fetch_bank_accounts()
+        self.pool.request.return_value = make_response(200, ACCOUNTS[1])
+        account = self.api.link_bank_account(bank_code='161312', bank_type='checkings',
+                                             account_number='9012345679',
+                                             account_name='Jane Doe')
+        self.assertIsInstance(account, BankAccount)
+        self.assertEqual(len(self.api.fetch_bank_accounts()), 2)
+
+
+    def test_defaults_to_dicts(self):
+        """Test to see if clients return dicts without response_models"""
+        self.pool.request.return_value = make_response(200, b'{"code": "AB12"}')
+        api = TraxionPay(secret_key='secret', api_key='api', session_pool=self.pool)
+        self.assertIs(type(api.fetch_otp()), dict)
+        self.assertEqual(self.api.fetch_otp().code, 'AB12')
+
+
+if __name__ == '__main__':
+    unittest.main()
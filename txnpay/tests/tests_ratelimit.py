@@ -0,0 +1,74 @@
+"""Test module for client-side rate limiting"""
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+from txnpay import TraxionPay, RateLimiter
+from txnpay.ratelimit import TokenBucket, FileTokenBucket, parse_retry_after
+from txnpay.tests.helpers import make_response
+
+
+class TestRateLimiter(unittest.TestCase):
+    """Unit tests for token buckets"""
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.now = 1000.0
+        patcher = mock.patch('txnpay.ratelimit.time.time', side_effect=lambda: self.now)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+
+    def test_burst_then_rate(self):
+        """Test to see if a bucket allows its burst, then spaces out calls"""
+        bucket = TokenBucket(rate=10, capacity=2)
+        self.assertEqual(bucket.reserve(), 0)
+        self.assertEqual(bucket.reserve(), 0)
+        self.assertAlmostEqual(bucket.reserve(), 0.1)
+        self.assertAlmostEqual(bucket.reserve(), 0.2)
+
+        self.now += 1
+        self.assertEqual(bucket.reserve(), 0)
+
+
+    def test_throttled(self):
+        """Test to see if a throttle blocks the bucket and slows its rate"""
+        bucket = TokenBucket(rate=10, capacity=5)
+        bucket.throttled(2.0)
+        self.assertAlmostEqual(bucket.reserve(), 2.0 + 1 / 5.0)
+
+
+    def test_shared_file_bucket(self):
+        """Test to see if buckets on the same file share one budget"""
+        path = os.path.join(self.directory, 'payout.bucket')
+        first = FileTokenBucket(path, rate=1, capacity=1)
+        second = FileTokenBucket(path, rate=1, capacity=1)
+        self.assertEqual(first.reserve(), 0)
+        self.assertAlmostEqual(second.reserve(), 1.0)
+
+
+    def test_parse_retry_after(self):
+        """Test to see if Retry-After seconds and defaults are understood"""
+        self.assertEqual(parse_retry_after('3'), 3.0)
+        self.assertEqual(parse_retry_after(None), 1.0)
+        self.assertEqual(parse_retry_after('soon'), 1.0)
+
+
+    def test_client_feedback(self):
+        """Test to see if 429 responses feed the limiter and are retried"""
+        throttled = make_response(429, b'slow down', {'Retry-After': '2'})
+        ok = make_response(200)
+
+        pool = mock.Mock()
+        pool.request.side_effect = [throttled, ok]
+        limiter = RateLimiter({'banks': (100, 1)})
+        api = TraxionPay(secret_key='secret', api_key='api', session_pool=pool,
+                         rate_limiter=limiter)
+        with mock.patch('txnpay.traxionpay_client.time.sleep') as sleep:
+            self.assertEqual(api.fetch_banks(), [])
+        self.assertGreaterEqual(sleep.call_args[0][0], 2.0)
+        self.assertEqual(pool.request.call_count, 2)
@@ -0,0 +1,127 @@
+"""Test module for retries and circuit breakers"""
+import unittest
+from unittest import mock
+
+import requests
+
+from txnpay import TraxionPay
+from txnpay.exceptions import APIResponseError, CircuitOpenError
+from txnpay.retry import RetryPolicy, CircuitBreaker, CircuitBreakers
+from txnpay.tests.helpers import make_response
+
+
+class TestRetry(unittest.TestCase):
+    """Unit tests for RetryPolicy and CircuitBreaker"""
+    def setUp(self):
+        self.pool = mock.Mock()
+        self.sleep = mock.patch('txnpay.traxionpay_client.time.sleep').start()
+        self.addCleanup(mock.patch.stopall)
+        self.api = TraxionPay(secret_key='secret', api_key='api', session_pool=self.pool,
+                              banks_ttl=None, bank_accounts_ttl=None,
+                              retry_policy=RetryPolicy(max_retries=2))
+
+
+    def test_backoff_full_jitter(self):
+        """Test to see if backoff stays within the exponential window"""
+        policy = RetryPolicy(backoff_base=0.5, backoff_max=3.0)
+        for attempt, ceiling in ((0, 0.5), (1, 1.0), (2, 2.0), (5, 3.0)):
+            for _ in range(50):
+                self.assertTrue(0 <= policy.backoff(attempt) <= ceiling)
+
+
+    def test_idempotent_retried(self):
+        """Test to see if idempotent reads are retried after transient failures"""
+        self.pool.request.side_effect = [requests.ConnectionError(), make_response(503),
+                                         make_response(200, b'[{"id": 1}]')]
+        self.assertEqual(self.api.fetch_banks(), [{'id': 1}])
+        self.assertEqual(self.pool.request.call_count, 3)
+        self.assertEqual(self.sleep.call_count, 2)
+
+
+    def test_retries_exhausted(self):
+        """Test to see if the last failure surfaces once retries run out"""
+        self.pool.request.return_value = make_response(502, b'bad gateway')
+        with self.assertRaises(APIResponseError):
+            self.api.fetch_banks()
+        self.assertEqual(self.pool.request.call_count, 3)
+
+
+    def test_cash_out_needs_idempotency_key(self):
+        """Test to see if payouts are only retried with an idempotency key and the opt-in"""
+        self.pool.request.return_value = make_response(503, b'unavailable')
+        with self.assertRaises(APIResponseError):
+            self.api.cash_out(otp='AB12DE34', bank_account=413, amount=100.0)
+        self.assertEqual(self.pool.request.call_count, 1)
+        with self.assertRaises(APIResponseError):
+            self.api.cash_out(otp='AB12DE34', bank_account=413, amount=100.0,
+                              idempotency_key='payout-1')
+        self.assertEqual(self.pool.request.call_count, 2)
+
+        self.api.retry_policy = RetryPolicy(max_retries=2, retry_payouts=True)
+        self.pool.request.side_effect = [make_response(503), make_response(200, b'{}')]
+        self.api.cash_out(otp='AB12DE34', bank_account=413, amount=100.0,
+                          idempotency_key='payout-1')
+        headers = self.pool.request.call_args[1]['headers']
+        self.assertEqual(headers['Idempotency-Key'], 'payout-1')
+
+
+    def test_circuit_breaker(self):
+        """Test to see if an open circuit fails fast and recovers after its timeout"""
+        breaker = CircuitBreaker(failure_threshold=2, reset_timeout=10)
+        breaker.record_failure()
+        breaker.before_call()
+        breaker.record_failure()
+        with self.assertRaises(CircuitOpenError):
+            breaker.before_call('banks')
+
+        with mock.patch('txnpay.retry.time.monotonic', return_value=breaker._opened_at + 10):
+            breaker.before_call()
+            self.assertEqual(breaker.state, CircuitBreaker.HALF_OPEN)
+            with self.assertRaises(CircuitOpenError):
+                breaker.before_call()
+        breaker.record_success()
+        breaker.before_call()
+
+
+    def test_half_open_trial_released(self):
+        """Test to see if a trial call raising another error does not leave the circuit half-open"""
+        breakers = CircuitBreakers(failure_threshold=1, reset_timeout=0)
+        api = TraxionPay(secret_key='secret', api_key='api', session_pool=self.pool,
+                         banks_ttl=None, retry_policy=RetryPolicy(max_retries=0),
+                         circuit_breakers=breakers)
+        self.pool.request.side_effect = [make_response(500, b'error'),
+                                         requests.TooManyRedirects(),
+                                         make_response(200, b'[{"id": 1}]')]
+        with self.assertRaises(APIResponseError):
+            api.fetch_banks()
+        with self.assertRaises(requests.TooManyRedirects):
+            api.fetch_banks()
+        self.assertEqual(breakers.get('banks').state, CircuitBreaker.OPEN)
+        self.assertEqual(api.fetch_banks(), [{'id': 1}])
+        self.assertEqual(breakers.get('banks').state, CircuitBreaker.CLOSED)
+
+
+    def test_half_open_trial_not_sent(self):
+        """Test to see if a trial call that is never sent gives its turn to the next call"""
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0)
+        breaker.record_failure()
+        breaker.before_call()
+        breaker.release()
+        self.assertEqual(breaker.state, CircuitBreaker.OPEN)
+        breaker.before_call()
+        self.assertEqual(breaker.state, CircuitBreaker.HALF_OPEN)
+
+
+    def test_client_circuit_per_endpoint(self):
+        """Test to see if an open circuit stops calls to its endpoint only"""
+        api = TraxionPay(secret_key='secret', api_key='api', session_pool=self.pool,
+                         banks_ttl=None, retry_policy=RetryPolicy(max_retries=0),
+                         circuit_breakers=CircuitBreakers(failure_threshold=1))
+        self.pool.request.return_value = make_response(500, b'error')
+        with self.assertRaises(APIResponseError):
+            api.fetch_banks()
+        with self.assertRaises(CircuitOpenError):
+            api.fetch_banks()
+        self.assertEqual(self.pool.request.call_count, 1)
+        with self.assertRaises(APIResponseError):
+            api.fetch_otp()
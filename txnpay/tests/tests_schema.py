@@ -0,0 +1,63 @@
+"""Test module for request schemas"""
+import unittest
+
+from txnpay import TraxionPay
+from txnpay.schema import Field, Schema, STRING_TYPES, CASH_IN_SCHEMA, CASH_OUT_SCHEMA
+from txnpay.webhooks import parse_notification
+
+
+class TestSchema(unittest.TestCase):
+    """Unit tests for compiled schemas"""
+    def setUp(self):
+        self.values = {
+            'merchant_id': 6328,
+            'merchant_ref_no': 'ABC123DEF456',
+            'description': 'My test payment',
+            'amount': 1500.0,
+            'merchant_additional_data': {'payment_code': 'ABC123DEF456'},
+        }
+
+
+    def test_messages(self):
+        """Test to see if error messages match the documented wording"""
+        values = dict(self.values, merchant_id='6328')
+        with self.assertRaisesRegex(TypeError, '^merchant_id should be of type int$'):
+            CASH_IN_SCHEMA.validate(values)
+
+        values = dict(self.values, description='s' * 501)
+        with self.assertRaisesRegex(ValueError,
+                                    '^description must be less than or equal to 500$'):
+            CASH_IN_SCHEMA.validate(values)
+
+        with self.assertRaisesRegex(ValueError, '^otp cannot be None$'):
+            CASH_OUT_SCHEMA.validate({'amount': 100.0, 'bank_account': 413})
+
+        with self.assertRaisesRegex(TypeError, '^bank_account must be of type str$'):
+            CASH_OUT_SCHEMA.validate({'otp': 'AB12DE34', 'amount': 100.0,
+                                      'bank_account': '413'})
+
+
+    def test_defaults(self):
+        """Test to see if optional fields fall back to defaults in declared order"""
+        payload = CASH_IN_SCHEMA.validate(self.values)
+        self.assertEqual(payload['currency'], 'PHP')
+        self.assertEqual(payload['billing_country'], 'PH')
+        self.assertEqual(payload['billing_email'], '')
+        self.assertEqual(list(payload), [field.name for field in CASH_IN_SCHEMA.fields])
+
+
+    def test_optional_without_default(self):
+        """Test to see if optional fields without a default are omitted"""
+        schema = Schema(Field('note', STRING_TYPES, 'str'))
+        self.assertEqual(schema.validate({}), {})
+        self.assertEqual(schema.validate({'note': 'hi'}), {'note': 'hi'})
+
+
+    def test_billing_remark(self):
+        """Test to see if `billing_remark` is sent as given"""
+        api = TraxionPay(secret_key='secret', api_key='api')
+        payload = api._build_cash_in_payload(billing_remark='Leave at door',
+                                             billing_mobile='09171234567',
+                                             **self.values)
+        payform_data = parse_notification(payload)
+        self.assertEqual(payform_data['billing_remark'], 'Leave at door')
@@ -0,0 +1,101 @@
+"""Test module for payload serializers"""
+import base64
+import datetime
+import json
+import unittest
+
+try:
+    from urllib.parse import urlencode
+except ImportError:
+    from urllib import urlencode
+
+from txnpay import serializer
+from txnpay.serializer import JSONSerializer, OrjsonSerializer, get_serializer, set_serializer
+from txnpay.utils import encode_additional_data
+
+PAYLOAD = {'merchant_id': 6328, 'amount': 1500.0, 'description': 'Ñandú payment ' * 40,
+           'merchant_additional_data': 'eyJwYXltZW50X2NvZGUiOiAiQUJDIn0='}
+
+
+def serializers():
+    found = [JSONSerializer()]
+    try:
+        found.append(OrjsonSerializer())
+    except ImportError:
+        pass
+    return found
+
+
+class TestSerializer(unittest.TestCase):
+    """Unit tests for payload serializers"""
+    def tearDown(self):
+        set_serializer(serializer._default_serializer())
+
+
+    def test_form_body(self):
+        """Test to see if form bodies match what form-encoding the base64 string gives"""
+        for instance in serializers():
+            body = instance.form_body('form_data', PAYLOAD)
+            encoded = base64.b64encode(instance.dumps(PAYLOAD)).decode('utf-8')
+            self.assertEqual(body, urlencode({'form_data': encoded}).encode())
+            self.assertEqual(json.loads(base64.b64decode(encoded)), PAYLOAD)
+
+
+    def test_backends_agree(self):
+        """Test to see if every backend encodes the same JSON"""
+        decoded = [json.loads(instance.dumps(PAYLOAD)) for instance in serializers()]
+        for value in decoded:
+            self.assertEqual(value, PAYLOAD)
+
+
+    def test_backends_byte_identical(self):
+        """Test to see if both backends produce the same bytes, non-str keys included"""
+        try:
+            orjson_serializer = OrjsonSerializer()
+        except ImportError:
+            self.skipTest('orjson is not installed')
+        stdlib = JSONSerializer()
+        for payload in (PAYLOAD, {1: 'x', 2.5: ['ñ', None, True], None: {'a': -1.25}},
+                        {'emoji': '\U0001f4b8', 'quote': '"\\\n', 'amount': 1500.0}):
+            self.assertEqual(orjson_serializer.dumps(payload), stdlib.dumps(payload))
+            self.assertEqual(orjson_serializer.form_body('form_data', payload),
+                             stdlib.form_body('form_data', payload))
+
+
+    def test_json_fallback(self):
+        """Test to see if values orjson encodes unlike json are encoded or rejected as by json"""
+        try:
+            orjson_serializer = OrjsonSerializer()
+        except ImportError:
+            self.skipTest('orjson is not installed')
+        stdlib = JSONSerializer()
+
+        class Text(str):
+            pass
+
+        for payload in ({'id': 2 ** 70}, {'ids': [1, -2 ** 64]}, {'name': Text('x')}):
+            self.assertEqual(orjson_serializer.dumps(payload), stdlib.dumps(payload))
+        for payload in ({'at': datetime.date(2020, 1, 1)}, {'at': datetime.datetime(2020, 1, 1)},
+                        {'ref': object()}):
+            for instance in (orjson_serializer, stdlib):
+                with self.assertRaises(TypeError):
+                    instance.dumps(payload)
+
+
+    def test_non_str_keys(self):
+        """Test to see if every backend accepts dict keys that are not strings"""
+        for instance in serializers():
+            set_serializer(instance)
+            self.assertEqual(json.loads(instance.dumps({1: 'x'})), {'1': 'x'})
+            self.assertEqual(base64.b64decode(encode_additional_data({1: 'x'})), b'{"1":"x"}')
+
+
+    def test_set_serializer(self):
+        """Test to see if the serializer can be replaced"""
+        stdlib = JSONSerializer()
+        set_serializer(stdlib)
+        self.assertIs(get_serializer(), stdlib)
+        encoded = encode_additional_data({'payment_code': 'ABC123DEF456'})
+        self.assertEqual(encoded, base64.b64encode(b'{"payment_code":"ABC123DEF456"}').decode())
+        with self.assertRaises(ValueError):
+            encode_additional_data(['ABC123DEF456'])
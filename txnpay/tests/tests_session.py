@@ -0,0 +1,50 @@
+"""Test module for pooled sessions"""
+import unittest
+from unittest import mock
+
+from txnpay import TraxionPay, SessionPool
+
+
+class TestSessionPool(unittest.TestCase):
+    """Unit tests for SessionPool"""
+    def setUp(self):
+        self.secret_key = "cxl+hwc%97h6+4#lx1au*ut=ml+=!fx85w94iuf*06=rf383xs"
+        self.api_key = "7)5dmcfy^dp*9bdrcfcm$k-n=p7b!x(t)_f^i8mxl@v_+rno*x"
+
+
+    def test_session_is_reused(self):
+        """Test to see if the same session is returned across calls"""
+        pool = SessionPool(pool_maxsize=4)
+        self.assertIs(pool.session, pool.session)
+        adapter = pool.session.get_adapter('https://devapi.traxionpay.com')
+        self.assertEqual(adapter._pool_maxsize, 4)
+
+
+    def test_session_recreated_after_fork(self):
+        """Test to see if a new session is created when the process id changes"""
+        pool = SessionPool()
+        parent_session = pool.session
+        with mock.patch('txnpay.transport.os.getpid', return_value=-1):
+            child_session = pool.session
+        self.assertIsNot(parent_session, child_session)
+
+
+    def test_keep_alive_disabled(self):
+        """Test to see if `Connection: close` is sent when keep_alive is off"""
+        pool = SessionPool(keep_alive=False)
+        self.assertEqual(pool.session.headers['Connection'], 'close')
+
+
+    def test_close(self):
+        """Test to see if closing the client releases its session"""
+        with TraxionPay(secret_key=self.secret_key, api_key=self.api_key) as api:
+            session = api.session_pool.session
+        self.assertIsNot(api.session_pool.session, session)
+
+
+    def test_shared_pool(self):
+        """Test to see if clients can share one pool"""
+        pool = SessionPool()
+        first = TraxionPay(secret_key=self.secret_key, api_key=self.api_key, session_pool=pool)
+        second = TraxionPay(secret_key=self.secret_key, api_key=self.api_key, session_pool=pool)
+        self.assertIs(first.session_pool.session, second.session_pool.session)
@@ -0,0 +1,44 @@
+"""Test module for request signing"""
+import hashlib
+import hmac
+import unittest
+
+from txnpay.signing import Signer
+
+
+class TestSigner(unittest.TestCase):
+    """Unit tests for Signer"""
+    def setUp(self):
+        self.secret_key = "cxl+hwc%97h6+4#lx1au*ut=ml+=!fx85w94iuf*06=rf383xs"
+        self.api_key = "7)5dmcfy^dp*9bdrcfcm$k-n=p7b!x(t)_f^i8mxl@v_+rno*x"
+        self.signer = Signer(self.secret_key, self.api_key)
+
+    def expected(self, message):
+        return hmac.new(self.secret_key.encode(), message.encode(), hashlib.sha256).hexdigest()
+
+
+    def test_auth_hash(self):
+        """Test to see if `auth_hash` matches a freshly keyed HMAC"""
+        self.assertEqual(self.signer.auth_hash, self.expected(self.api_key))
+
+
+    def test_secure_hash(self):
+        """Test to see if `secure_hash` signs ref no, amount, currency and description"""
+        self.assertEqual(self.signer.secure_hash('ABC123DEF456', 1500.0, 'My test payment'),
+                         self.expected('ABC123DEF4561500.0PHPMy test payment'))
+
+
+    def test_sign_many(self):
+        """Test to see if `sign_many` matches signing one by one"""
+        messages = ['a', b'b', 'c' * 1000]
+        self.assertEqual(self.signer.sign_many(messages),
+                         [self.signer.sign(message) for message in messages])
+
+
+    def test_verify(self):
+        """Test to see if `verify` accepts only the matching signature"""
+        signature = self.signer.sign('payload')
+        self.assertTrue(self.signer.verify('payload', signature))
+        self.assertFalse(self.signer.verify('payload', signature[:-1] + '0'))
+        self.assertFalse(self.signer.verify('payload', None))
+        self.assertFalse(self.signer.verify('payload', '\u00e9' * len(signature)))
@@ -0,0 +1,148 @@
+"""Test module for single-flight request coalescing"""
+import asyncio
+import threading
+import time
+import unittest
+from unittest import mock
+
+import requests
+
+from txnpay import TraxionPay
+from txnpay.retry import RetryPolicy
+from txnpay.singleflight import AsyncSingleFlight, SingleFlight
+from txnpay.tests.helpers import make_response
+
+
+def wait_for(condition, timeout=5):
+    expires_at = time.monotonic() + timeout
+    while not condition() and time.monotonic() < expires_at:
+        time.sleep(0.001)
+
+
+class TestSingleFlight(unittest.TestCase):
+    """Unit tests for single-flight request coalescing"""
+    def setUp(self):
+        self.release = threading.Event()
+        self.pool = mock.Mock()
+
+
+    def run_concurrently(self, func, count=10):
+        results = [None] * count
+
+        def call(index):
+            try:
+                results[index] = func()
+            except Exception as exc:  # pylint: disable=broad-except
+                results[index] = exc
+
+        threads = [threading.Thread(target=call, args=(index,)) for index in range(count)]
+        for thread in threads:
+            thread.start()
+        return threads, results
+
+
+    def test_concurrent_fetch_banks(self):
+        """Test to see if concurrent cache misses share one request"""
+        def request(*args, **kwargs):
+            self.release.wait(5)
+            return make_response(200, b'[{"code": 1}]')
+
+        self.pool.request.side_effect = request
+        api = TraxionPay(secret_key='secret', api_key='api', session_pool=self.pool)
+        threads, results = self.run_concurrently(api.fetch_banks)
+        wait_for(lambda: api.single_flight.coalesced['banks'] == 9)
+        self.release.set()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(self.pool.request.call_count, 1)
+        self.assertEqual(results, [[{'code': 1}]] * 10)
+        self.assertEqual(api.single_flight.stats(), {'banks': {'flights': 1, 'coalesced': 9}})
+
+
+    def test_error_reaches_every_waiter(self):
+        """Test to see if the error of a shared request is raised to every caller"""
+        def request(*args, **kwargs):
+            self.release.wait(5)
+            raise requests.ConnectionError('unreachable')
+
+        self.pool.request.side_effect = request
+        api = TraxionPay(secret_key='secret', api_key='api', session_pool=self.pool,
+                         retry_policy=RetryPolicy(max_retries=0))
+        threads, results = self.run_concurrently(api.fetch_bank_accounts, count=5)
+        wait_for(lambda: api.single_flight.coalesced['bank-account'] == 4)
+        self.release.set()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(self.pool.request.call_count, 1)
+        for result in results:
+            self.assertIsInstance(result, requests.ConnectionError)
+
+        # the failed flight is not remembered
+        self.pool.request.side_effect = None
+        self.pool.request.return_value = make_response(200)
+        self.assertEqual(api.fetch_bank_accounts(), [])
+
+
+    def test_distinct_keys(self):
+        """Test to see if calls with different keys are not coalesced"""
+        flight = SingleFlight()
+        self.assertEqual(flight.do('banks', lambda: 1), 1)
+        self.assertEqual(flight.do('bank-account', lambda: 2), 2)
+        self.assertEqual(sum(flight.coalesced.values()), 0)
+
+
+    def test_async_single_flight(self):
+        """Test to see if concurrent coroutines share one call and its error"""
+        flight = AsyncSingleFlight()
+        calls = []
+
+        async def fetch():
+            calls.append(1)
+            await asyncio.sleep(0.01)
+            return [1]
+
+        async def fail():
+            await asyncio.sleep(0.01)
+            raise ValueError('failed')
+
+        async def main():
+            results = await asyncio.gather(*[flight.do('banks', fetch) for _ in range(10)])
+            errors = await asyncio.gather(*[flight.do('bank-account', fail) for _ in range(3)],
+                                          return_exceptions=True)
+            return results, errors
+
+        results, errors = asyncio.run(main())
+        self.assertEqual(results, [[1]] * 10)
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(flight.coalesced['banks'], 9)
+        self.assertTrue(all(isinstance(error, ValueError) for error in errors))
+
+
+    def test_async_leader_cancelled(self):
+        """Test to see if waiters get a result, not CancelledError, when the leader is cancelled"""
+        flight = AsyncSingleFlight()
+        calls = []
+
+        async def fetch():
+            calls.append(1)
+            await asyncio.sleep(0.05)
+            return [1]
+
+        async def main():
+            leader = asyncio.ensure_future(flight.do('banks', fetch))
+            await asyncio.sleep(0)
+            waiters = [asyncio.ensure_future(flight.do('banks', fetch)) for _ in range(4)]
+            await asyncio.sleep(0.01)
+            waiters.pop().cancel()
+            await asyncio.sleep(0)
+            leader.cancel()
+            results = await asyncio.gather(*waiters)
+            return leader, results
+
+        leader, results = asyncio.run(main())
+        self.assertTrue(leader.cancelled())
+        self.assertEqual(results, [[1]] * 3)
+        self.assertEqual(len(calls), 2)
+        self.assertEqual(flight.flights['banks'], 2)
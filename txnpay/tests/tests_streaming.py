@@ -0,0 +1,220 @@
+"""Test module for incremental parsing of list responses"""
+import asyncio
+import io
+import json
+import unittest
+from unittest import mock
+
+import requests
+
+from txnpay import AsyncTraxionPay, BankAccount, TraxionPay
+from txnpay.emulator import Emulator
+from txnpay.exceptions import APIResponseError, MissingAuthenticationError
+from txnpay.streaming import RecordParser, next_link
+
+ACCOUNTS = [
+    {'id': 413, 'bank': '161311', 'bank_type': 'savings', 'account_number': '9012345678',
+     'account_name': 'John Doe'},
+    {'id': 414, 'bank': '161312', 'bank_type': 'checkings', 'account_number': '9012345679',
+     'account_name': 'Jane "JD" Doe {}', 'branch': {'name': 'Makati', 'codes': [1, 2]}},
+    {'id': 415, 'bank': '161313', 'bank_type': 'savings', 'account_number': '9012345680',
+     'account_name': 'Juan \\"}] Cruz'},
+]
+
+
+def feed_all(parser, body, size):
+    records = []
+    for start in range(0, len(body), size):
+        records.extend(parser.feed(body[start:start + size]))
+    parser.close()
+    return records
+
+
+def streamed_response(body, headers=None, url='https://devapi.traxionpay.com/'):
+    response = requests.Response()
+    response.status_code = 200
+    response.raw = io.BytesIO(body)
+    response.headers.update(headers or {})
+    response.url = url
+    return response
+
+
+class TestRecordParser(unittest.TestCase):
+    """Unit tests for RecordParser"""
+
+    def test_array_in_any_chunks(self):
+        """Test to see if records are returned whole however the body is cut"""
+        body = json.dumps(ACCOUNTS, indent=1).encode()
+        for size in (1, 2, 5, 64, len(body)):
+            self.assertEqual(feed_all(RecordParser(), body, size), ACCOUNTS)
+
+    def test_page(self):
+        """Test to see if a page object's records are returned and its fields kept"""
+        body = json.dumps({'count': 1203, 'next': 'https://x/?page=2', 'previous': None,
+                           'results': ACCOUNTS, 'meta': {'pages': [1, 2]}}).encode()
+        for size in (1, 3, len(body)):
+            parser = RecordParser()
+            self.assertEqual(feed_all(parser, body, size), ACCOUNTS)
+            self.assertEqual(parser.page, {'count': 1203, 'next': 'https://x/?page=2',
+                                           'previous': None, 'meta': {'pages': [1, 2]}})
+
+    def test_record_callable(self):
+        """Test to see if `record` gets the raw bytes of each record"""
+        body = json.dumps(ACCOUNTS).encode()
+        accounts = feed_all(RecordParser(record=BankAccount), body, 7)
+        self.assertIsInstance(accounts[0], BankAccount)
+        self.assertEqual([dict(account) for account in accounts], ACCOUNTS)
+
+    def test_records_returned_as_they_complete(self):
+        """Test to see if a record is returned by the chunk that completes it"""
+        parser = RecordParser()
+        self.assertEqual(parser.feed(b'[{"id": 1}, {"id"'), [{'id': 1}])
+        self.assertEqual(parser.feed(b': 2}'), [{'id': 2}])
+        self.assertFalse(parser.done)
+        self.assertEqual(parser.feed(b']'), [])
+        self.assertTrue(parser.done)
+
+    def test_empty(self):
+        self.assertEqual(feed_all(RecordParser(), b' [ ] ', 1), [])
+        self.assertEqual(feed_all(RecordParser(), b'{"count": 0, "results": []}', 1), [])
+
+    def test_invalid(self):
+        """Test to see if bodies that are not list responses raise ValueError"""
+        for body in (b'"banks"', b'[1, 2]', b'[{"id": 1}] x', b'{"count" 1}', b'{1: 2}'):
+            with self.assertRaises(ValueError):
+                feed_all(RecordParser(), body, len(body))
+
+    def test_truncated(self):
+        """Test to see if a body cut short raises ValueError on close"""
+        body = json.dumps({'results': ACCOUNTS}).encode()
+        for end in (0, 1, 20, len(body) - 1):
+            parser = RecordParser()
+            parser.feed(body[:end])
+            with self.assertRaises(ValueError):
+                parser.close()
+
+
+class TestNextLink(unittest.TestCase):
+    """Unit tests for next_link"""
+
+    def test_next_link(self):
+        header = '<https://x/?page=1>; rel="prev", <https://x/?page=3>; rel="next"'
+        self.assertEqual(next_link(header), 'https://x/?page=3')
+        self.assertIsNone(next_link('<https://x/?page=1>; rel="prev"'))
+        self.assertIsNone(next_link(None))
+
+
+class TestClientIterators(unittest.TestCase):
+    """Unit tests for iter_banks and iter_bank_accounts"""
+
+    def setUp(self):
+        self.emulator = Emulator(page_size=2)
+        self.emulator.add_merchant('secret', 'api', bank_accounts=ACCOUNTS)
+        self.emulator.start()
+
+    def tearDown(self):
+        self.emulator.stop()
+
+    def test_iter_bank_accounts(self):
+        """Test to see if every page is read, with either transport"""
+        for transport in ('requests', 'urllib3'):
+            with TraxionPay(secret_key='secret', api_key='api', base_url=self.emulator.url,
+                            transport=transport) as api:
+                self.assertEqual(list(api.iter_bank_accounts(chunk_size=16)), ACCOUNTS)
+                self.assertEqual([bank['code'] for bank in api.iter_banks()],
+                                 [bank['code'] for bank in self.emulator.banks])
+                self.assertIsNone(api.bank_accounts_cache.get())
+        self.assertEqual(self.emulator.requests[('bank-account', 200)], 4)
+
+    def test_response_models(self):
+        with TraxionPay(secret_key='secret', api_key='api', base_url=self.emulator.url,
+                        response_models=True) as api:
+            accounts = list(api.iter_bank_accounts())
+        self.assertIsInstance(accounts[0], BankAccount)
+        self.assertEqual(accounts[1].account_name, ACCOUNTS[1]['account_name'])
+        self.assertEqual(accounts[1]['branch'], ACCOUNTS[1]['branch'])
+
+    def test_first_record_before_the_rest(self):
+        """Test to see if a record is yielded before the rest of the body is read"""
+        pool = mock.Mock()
+        body = io.BytesIO(json.dumps(ACCOUNTS).encode())
+        response = streamed_response(b'')
+        response.raw = body
+        pool.request.return_value = response
+        api = TraxionPay(secret_key='secret', api_key='api', session_pool=pool)
+        accounts = api.iter_bank_accounts(chunk_size=32)
+        self.assertEqual(next(accounts), ACCOUNTS[0])
+        self.assertLess(body.tell(), len(body.getvalue()))
+        self.assertEqual(pool.request.call_args[1]['stream'], True)
+        self.assertEqual(list(accounts), ACCOUNTS[1:])
+
+    def test_link_header(self):
+        """Test to see if `Link: rel="next"` headers are followed"""
+        pool = mock.Mock()
+        pool.request.side_effect = [
+            streamed_response(json.dumps(ACCOUNTS[:1]).encode(),
+                              {'Link': '</payout/bank-account/?page=2>; rel="next"'}),
+            streamed_response(json.dumps(ACCOUNTS[1:]).encode()),
+        ]
+        api = TraxionPay(secret_key='secret', api_key='api', session_pool=pool)
+        self.assertEqual(list(api.iter_bank_accounts()), ACCOUNTS)
+        self.assertEqual(pool.request.call_args[0][1],
+                         'https://devapi.traxionpay.com/payout/bank-account/?page=2')
+
+    def test_pagination_loop(self):
+        pool = mock.Mock()
+        pool.request.side_effect = lambda *args, **kwargs: streamed_response(
+            b'{"next": "https://x/?page=2", "results": []}')
+        api = TraxionPay(secret_key='secret', api_key='api', session_pool=pool)
+        with self.assertRaises(APIResponseError):
+            list(api.iter_banks())
+        self.assertEqual(pool.request.call_count, 2)
+
+    def test_errors(self):
+        api = TraxionPay(secret_key='wrong', api_key='api', base_url=self.emulator.url)
+        with self.assertRaises(APIResponseError):
+            next(api.iter_bank_accounts())
+        api.close()
+        del api.auth_headers
+        with self.assertRaises(MissingAuthenticationError):
+            api.iter_bank_accounts()
+
+    def test_fetch_paginated(self):
+        """Test to see if fetch_banks and fetch_bank_accounts follow every page"""
+        for response_models in (False, True):
+            with TraxionPay(secret_key='secret', api_key='api', base_url=self.emulator.url,
+                            response_models=response_models) as api:
+                accounts = api.fetch_bank_accounts()
+                banks = api.fetch_banks()
+                self.assertEqual(api.get_bank_account(bank_account_id=415)['id'], 415)
+            self.assertEqual([dict(account) for account in accounts], ACCOUNTS)
+            self.assertEqual([dict(bank) for bank in banks], self.emulator.banks)
+        self.assertIsInstance(accounts[0], BankAccount)
+
+    def test_fetch_paginated_async(self):
+        async def run():
+            async with AsyncTraxionPay(secret_key='secret', api_key='api',
+                                       base_url=self.emulator.url,
+                                       response_models=True) as api:
+                return await api.fetch_bank_accounts(), await api.fetch_banks()
+
+        accounts, banks = asyncio.run(run())
+        self.assertIsInstance(accounts[0], BankAccount)
+        self.assertEqual([dict(account) for account in accounts], ACCOUNTS)
+        self.assertEqual([dict(bank) for bank in banks], self.emulator.banks)
+
+    def test_async_client(self):
+        async def run():
+            async with AsyncTraxionPay(secret_key='secret', api_key='api',
+                                       base_url=self.emulator.url) as api:
+                accounts = [account async for account in api.iter_bank_accounts(chunk_size=16)]
+                banks = [bank async for bank in api.iter_banks()]
+            return accounts, banks
+
+        accounts, banks = asyncio.run(run())
+        self.assertEqual(accounts, ACCOUNTS)
+        self.assertEqual(banks, self.emulator.banks)
+
+
+if __name__ == '__main__':
+    unittest.main()
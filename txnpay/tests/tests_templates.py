@@ -0,0 +1,69 @@
+"""Test module for prepared cash in templates"""
+import unittest
+from unittest import mock
+
+from txnpay import TraxionPay
+from txnpay.exceptions import MissingAuthenticationError
+from txnpay.webhooks import parse_notification
+from txnpay.tests.helpers import make_response
+
+CONSTANT_FIELDS = {
+    'merchant_id': 6328,
+    'currency': 'PHP',
+    'payment_method': 'gcash',
+    'billing_country': 'PH',
+    'status_notification_url': 'https://www.mysite.com/callback',
+    'success_page_url': 'https://www.mysite.com/success',
+    'failure_page_url': 'https://www.mysite.com/failed',
+    'cancel_page_url': 'https://www.mysite.com/cancelled',
+    'pending_page_url': 'https://www.mysite.com/pending',
+}
+VARYING_FIELDS = {
+    'merchant_ref_no': 'ABC123DEF456',
+    'description': 'My test payment',
+    'amount': 1500.0,
+    'merchant_additional_data': {'payment_code': 'ABC123DEF456'},
+    'billing_email': 'john.doe@mysite.com',
+}
+
+
+class TestTemplates(unittest.TestCase):
+    """Unit tests for prepared cash in templates"""
+    def setUp(self):
+        self.pool = mock.Mock()
+        self.pool.request.return_value = make_response(
+            200, b'', url='https://devapi.traxionpay.com/payform-link/abc')
+        self.api = TraxionPay(secret_key='secret', api_key='api', session_pool=self.pool)
+        self.template = self.api.prepare_cash_in(**CONSTANT_FIELDS)
+
+
+    def test_same_payload(self):
+        """Test to see if templates send the payload `cash_in` would"""
+        expected = parse_notification(self.api._build_cash_in_payload(**dict(CONSTANT_FIELDS,
+                                                                             **VARYING_FIELDS)))
+        self.assertEqual(parse_notification(self.template.build(**VARYING_FIELDS)), expected)
+
+
+    def test_call(self):
+        """Test to see if calling a template sends the payment"""
+        url = self.template(**VARYING_FIELDS)
+        self.assertEqual(url, 'https://devapi.traxionpay.com/payform-link/abc')
+        args, kwargs = self.pool.request.call_args
+        self.assertEqual(args[0], 'POST')
+        self.assertTrue(kwargs['data'].startswith(b'form_data='))
+
+
+    def test_validation(self):
+        """Test to see if bound and varying fields are validated"""
+        with self.assertRaises(ValueError):
+            self.api.prepare_cash_in(amount=1500.0)
+        with self.assertRaises(ValueError):
+            self.api.prepare_cash_in(merchant='6328')
+        with self.assertRaises(TypeError):
+            self.api.prepare_cash_in(merchant_id='6328')
+        with self.assertRaises(ValueError):
+            self.template.build(currency='USD', **VARYING_FIELDS)
+        with self.assertRaises(ValueError):
+            self.template.build(merchant_ref_no='ABC123DEF456', amount=1500.0)
+        with self.assertRaises(MissingAuthenticationError):
+            TraxionPay(secret_key='secret', session_pool=self.pool).prepare_cash_in()
@@ -0,0 +1,87 @@
+"""Test module for timeouts, deadlines and hedging"""
+import threading
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+
+from txnpay import TraxionPay
+from txnpay.exceptions import DeadlineExceededError
+from txnpay.retry import RetryPolicy
+from txnpay.timeouts import Deadline, HedgePolicy, LatencyTracker
+from txnpay.tests.helpers import make_response
+
+
+class TestTimeouts(unittest.TestCase):
+    """Unit tests for timeouts, deadlines and hedging"""
+    def setUp(self):
+        self.pool = mock.Mock()
+        self.pool.request.return_value = make_response(200)
+
+
+    def test_default_timeout(self):
+        """Test to see if every request is sent with the client timeout"""
+        api = TraxionPay(secret_key='secret', api_key='api', session_pool=self.pool,
+                         timeout=(1, 2))
+        api.fetch_banks()
+        self.assertEqual(self.pool.request.call_args[1]['timeout'], (1, 2))
+
+        api.fetch_otp(timeout=7)
+        self.assertEqual(self.pool.request.call_args[1]['timeout'], (7, 7))
+
+
+    def test_deadline_clamps_timeout(self):
+        """Test to see if a deadline shortens the timeout of an attempt"""
+        deadline = Deadline(0.5)
+        connect, read = deadline.clamp((5, 30))
+        self.assertLessEqual(connect, 0.5)
+        self.assertLessEqual(read, 0.5)
+        self.assertIsNone(Deadline().clamp(None))
+
+
+    def test_deadline_covers_retries(self):
+        """Test to see if retries stop once the deadline cannot fit another backoff"""
+        self.pool.request.return_value = make_response(503)
+        api = TraxionPay(secret_key='secret', api_key='api', session_pool=self.pool,
+                         retry_policy=RetryPolicy(max_retries=5, backoff_base=10,
+                                                  backoff_max=10))
+        with mock.patch('txnpay.retry.random.uniform', return_value=10):
+            with self.assertRaises(DeadlineExceededError):
+                api.fetch_banks(deadline=1)
+        self.assertEqual(self.pool.request.call_count, 1)
+
+
+    def test_latency_percentile(self):
+        """Test to see if percentiles need enough samples"""
+        tracker = LatencyTracker()
+        for millis in range(1, 101):
+            tracker.record('banks', millis / 1000.0)
+        self.assertAlmostEqual(tracker.percentile('banks', 95), 0.095, places=3)
+        self.assertIsNone(tracker.percentile('payout', 95))
+
+
+    def test_hedged_call(self):
+        """Test to see if a slow first attempt is hedged by a second one"""
+        calls = []
+        release = threading.Event()
+
+        def request():
+            calls.append(1)
+            if len(calls) == 1:
+                release.wait(5)
+                return 'slow'
+            return 'fast'
+
+        policy = HedgePolicy(default_delay=0.01)
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            self.assertEqual(policy.call('banks', request, executor), 'fast')
+            release.set()
+        self.assertEqual(len(calls), 2)
+
+
+    def test_fast_call_not_hedged(self):
+        """Test to see if calls answering before the delay are sent once"""
+        api = TraxionPay(secret_key='secret', api_key='api', session_pool=self.pool,
+                         hedge_policy=HedgePolicy(default_delay=5))
+        api.fetch_banks()
+        api.close()
+        self.assertEqual(self.pool.request.call_count, 1)
@@ -0,0 +1,195 @@
+"""Test module for pluggable transports"""
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+import urllib3
+
+from txnpay import TraxionPay, Transport, Urllib3Transport
+from txnpay.emulator import Emulator, Faults
+from txnpay.exceptions import APIResponseError
+from txnpay.retry import RetryPolicy
+from txnpay.session import SessionPool
+from txnpay.transport import Response, make_transport, transport_errors
+
+PAYMENT = {
+    'merchant_id': 6328,
+    'merchant_ref_no': 'ABX4443',
+    'description': 'Order #4443',
+    'amount': 1500.0,
+    'merchant_additional_data': {'payment_code': 'ABX4443'},
+}
+
+
+class RecordingTransport(Transport):
+    """Transport answering every request itself"""
+    def __init__(self):
+        super(RecordingTransport, self).__init__()
+        self.calls = []
+
+    def request(self, method, url, headers=None, data=None, json=None, timeout=None):
+        self.calls.append((method, url))
+        return Response(200, {'Content-Type': 'application/json'}, b'{"code": "AB12"}', url)
+
+
+class TestMakeTransport(unittest.TestCase):
+    """Unit tests for make_transport"""
+
+    def test_by_name(self):
+        """Test to see if transports are created by name with pool options"""
+        self.assertIsInstance(make_transport(), SessionPool)
+        transport = make_transport('urllib3', pool_maxsize=4)
+        self.assertIsInstance(transport, Urllib3Transport)
+        self.assertEqual(transport.pool_maxsize, 4)
+        with self.assertRaises(ValueError):
+            make_transport('http2')
+
+
+    def test_instance(self):
+        """Test to see if a transport instance is used as-is"""
+        transport = RecordingTransport()
+        api = TraxionPay(secret_key='secret', api_key='api', transport=transport)
+        self.assertIs(api.transport, transport)
+        self.assertIs(api.session_pool, transport)
+        self.assertEqual(api.fetch_otp(), {'code': 'AB12'})
+        self.assertEqual(transport.calls, [
+            ('POST', 'https://devapi.traxionpay.com/payout/bank-payout/get-otp/')])
+
+
+    def test_errors(self):
+        """Test to see if transports without their own errors use those of requests"""
+        import requests
+        self.assertEqual(transport_errors(SessionPool()),
+                         (requests.ConnectionError, requests.Timeout))
+        self.assertEqual(transport_errors(Urllib3Transport()), (urllib3.exceptions.HTTPError,))
+
+
+class RedirectServer():
+    """Local server recording request headers, redirecting every request to `location`"""
+    def __init__(self, location=None):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):  # pylint: disable=arguments-differ
+                pass
+
+            def do_GET(self):  # pylint: disable=invalid-name
+                server.headers.append(dict(self.headers))
+                self.send_response(302 if server.location else 200)
+                if server.location:
+                    self.send_header('Location', server.location)
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+
+        self.location = location
+        self.headers = []
+        self.httpd = HTTPServer(('127.0.0.1', 0), Handler)
+        self.url = 'http://127.0.0.1:{}/'.format(self.httpd.server_address[1])
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+class TestRedirects(unittest.TestCase):
+    """Unit tests for redirects followed by Urllib3Transport"""
+    def setUp(self):
+        self.target = RedirectServer()
+        self.transport = Urllib3Transport()
+
+    def tearDown(self):
+        self.transport.close()
+        self.target.stop()
+
+
+    def test_credentials_dropped_across_hosts(self):
+        """Test to see if credentials are not sent on to another host"""
+        source = RedirectServer(location=self.target.url)
+        try:
+            response = self.transport.request('GET', source.url, headers={
+                'Authorization': 'Basic cw==', 'Idempotency-Key': 'payout-1', 'X-Other': '1'})
+        finally:
+            source.stop()
+        self.assertEqual(response.url, self.target.url)
+        self.assertEqual(source.headers[0]['Authorization'], 'Basic cw==')
+        self.assertNotIn('Authorization', self.target.headers[0])
+        self.assertNotIn('Idempotency-Key', self.target.headers[0])
+        self.assertEqual(self.target.headers[0]['X-Other'], '1')
+
+
+    def test_credentials_kept_on_same_host(self):
+        """Test to see if credentials follow a redirect within the same origin"""
+        self.target.location = '{}final'.format(self.target.url)
+        self.transport.max_redirects = 1
+        self.transport.request('GET', self.target.url, headers={'Authorization': 'Basic cw=='})
+        self.assertEqual([headers.get('Authorization') for headers in self.target.headers],
+                         ['Basic cw==', 'Basic cw=='])
+
+
+class TestUrllib3Transport(unittest.TestCase):
+    """Unit tests for Urllib3Transport against the emulator"""
+    def setUp(self):
+        self.emulator = Emulator(merchants={'secret': 'api'}, seed=1).start()
+        self.api = TraxionPay(secret_key='secret', api_key='api', base_url=self.emulator.url,
+                              transport='urllib3', retry_policy=RetryPolicy(max_retries=0))
+
+    def tearDown(self):
+        self.api.close()
+        self.emulator.stop()
+
+
+    def test_cash_in_follows_redirect(self):
+        """Test to see if cash_in returns the url the payform link redirects to"""
+        url = self.api.cash_in(**PAYMENT)
+        self.assertTrue(url.startswith('{}/payform/'.format(self.emulator.url)))
+        self.assertEqual(self.emulator.requests[('payform', 200)], 1)
+
+
+    def test_json_calls(self):
+        """Test to see if JSON bodies and responses round-trip"""
+        account = self.api.link_bank_account(bank_code='161311', bank_type='savings',
+                                             account_number='9012345678',
+                                             account_name='John Doe')
+        otp = self.api.fetch_otp()['code']
+        payout = self.api.cash_out(otp=otp, amount=100.0, bank_account=account['id'])
+        self.assertEqual(payout['bank_account'], account['id'])
+        self.assertEqual(self.api.fetch_bank_accounts(refresh=True), [account])
+
+
+    def test_error_response(self):
+        """Test to see if error bodies reach APIResponseError"""
+        with self.assertRaisesRegex(APIResponseError, 'invalid otp'):
+            self.api.cash_out(otp='nope', amount=100.0, bank_account=1)
+
+
+    def test_conditional_request(self):
+        """Test to see if response headers are read case-insensitively"""
+        api = TraxionPay(secret_key='secret', api_key='api', base_url=self.emulator.url,
+                         transport='urllib3', banks_ttl=0)
+        banks = api.fetch_banks()
+        self.assertEqual(api.fetch_banks(), banks)
+        self.assertEqual(self.emulator.requests[('banks', 304)], 1)
+
+
+    def test_reset_is_retried(self):
+        """Test to see if connection resets count as failed attempts"""
+        self.emulator.set_faults(Faults(reset_rate=1.0), 'get-otp')
+        with self.assertRaises(urllib3.exceptions.HTTPError):
+            self.api.fetch_otp()
+        self.emulator.set_faults(Faults(reset_rate=0.5), 'banks')
+        api = TraxionPay(secret_key='secret', api_key='api', base_url=self.emulator.url,
+                         transport='urllib3',
+                         retry_policy=RetryPolicy(max_retries=20, backoff_base=0.001))
+        self.assertTrue(api.fetch_banks())
+
+
+    def test_timeout(self):
+        """Test to see if read timeouts raise"""
+        self.emulator.set_faults(Faults(latency=0.2), 'get-otp')
+        with self.assertRaises(urllib3.exceptions.ReadTimeoutError):
+            self.api.fetch_otp(timeout=(1, 0.05))
+
+
+if __name__ == '__main__':
+    unittest.main()
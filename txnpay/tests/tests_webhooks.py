@@ -0,0 +1,112 @@
+"""Test module for status notification handling"""
+import asyncio
+import base64
+import io
+import json
+import unittest
+
+from txnpay.exceptions import InvalidSignatureError, InvalidNotificationError
+from txnpay.signing import Signer
+from txnpay.webhooks import NotificationHandler
+
+
+class TestNotificationHandler(unittest.TestCase):
+    """Unit tests for NotificationHandler"""
+    def setUp(self):
+        self.secret_key = "cxl+hwc%97h6+4#lx1au*ut=ml+=!fx85w94iuf*06=rf383xs"
+        self.handler = NotificationHandler(secret_key=self.secret_key)
+        self.received = []
+        self.handler.register(self.received.append, status='paid')
+        self.notification = {
+            'merchant_ref_no': 'ABC123DEF456',
+            'amount': 1500.0,
+            'currency': 'PHP',
+            'description': 'My test payment',
+            'status': 'paid',
+        }
+        self.notification['secure_hash'] = Signer(self.secret_key).secure_hash(
+            'ABC123DEF456', 1500.0, 'My test payment')
+
+    def call_wsgi(self, body, content_type='application/json'):
+        statuses = []
+        environ = {'REQUEST_METHOD': 'POST', 'CONTENT_LENGTH': str(len(body)),
+                   'CONTENT_TYPE': content_type, 'wsgi.input': io.BytesIO(body)}
+        self.handler(environ, lambda status, headers: statuses.append(status))
+        return statuses[0]
+
+
+    def test_verify(self):
+        """Test to see if notifications signed like `cash_in` are accepted"""
+        body = json.dumps(self.notification).encode()
+        self.assertEqual(self.handler.handle(body)['merchant_ref_no'], 'ABC123DEF456')
+        self.assertEqual(len(self.received), 1)
+
+        forged = dict(self.notification, amount=1.0)
+        with self.assertRaises(InvalidSignatureError):
+            self.handler.verify(forged)
+
+
+    def test_form_data(self):
+        """Test to see if base64 `form_data` bodies are parsed"""
+        encoded = base64.b64encode(json.dumps(self.notification).encode()).decode()
+        body = 'form_data={}'.format(encoded.replace('+', '%2B').replace('=', '%3D'))
+        self.assertEqual(self.handler.verify(body)['status'], 'paid')
+
+
+    def test_wsgi(self):
+        """Test to see if the WSGI app answers with the verification result"""
+        self.assertEqual(self.call_wsgi(json.dumps(self.notification).encode()), '200 OK')
+        forged = json.dumps(dict(self.notification, secure_hash='0' * 64)).encode()
+        self.assertEqual(self.call_wsgi(forged), '401 Unauthorized')
+        self.assertEqual(self.call_wsgi(b'[1, 2]'), '400 Bad Request')
+        self.assertEqual(len(self.received), 1)
+
+
+    def test_asgi(self):
+        """Test to see if the ASGI app verifies and awaits coroutine callbacks"""
+        awaited = []
+
+        async def callback(notification):
+            awaited.append(notification)
+        self.handler.register(callback)
+
+        sent = []
+        body = json.dumps(self.notification).encode()
+
+        async def receive():
+            return {'type': 'http.request', 'body': body, 'more_body': False}
+
+        async def send(message):
+            sent.append(message)
+
+        scope = {'type': 'http', 'method': 'POST',
+                 'headers': [(b'content-type', b'application/json')]}
+        asyncio.run(self.handler.asgi(scope, receive, send))
+        self.assertEqual(sent[0]['status'], 200)
+        self.assertEqual(len(awaited), 1)
+
+
+    def test_replay(self):
+        """Test to see if batch replay dispatches only valid notifications"""
+        forged = dict(self.notification, secure_hash='0' * 64)
+        rejected = self.handler.replay([self.notification, forged, b'not json',
+                                        json.dumps(self.notification)])
+        self.assertEqual(len(self.received), 2)
+        self.assertEqual(len(rejected), 2)
+
+
+    def test_non_ascii_signature(self):
+        """Test to see if a non-ASCII signature is rejected as invalid, not as an error"""
+        forged = dict(self.notification, secure_hash='\u00e9' * 64)
+        with self.assertRaises(InvalidSignatureError):
+            self.handler.handle(json.dumps(forged).encode())
+        self.assertEqual(self.call_wsgi(json.dumps(forged).encode()), '401 Unauthorized')
+        rejected = self.handler.replay([forged, self.notification])
+        self.assertEqual(len(rejected), 1)
+        self.assertEqual(len(self.received), 1)
+
+
+    def test_missing_field(self):
+        """Test to see if notifications without signed fields are rejected"""
+        with self.assertRaises(InvalidNotificationError):
+            self.handler.verify({'secure_hash': '0' * 64})
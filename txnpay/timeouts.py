@@ -0,0 +1,149 @@
+"""Timeouts, deadlines and hedged requests for traxionpay client"""
+import collections
+import threading
+import time
+
+from .exceptions import DeadlineExceededError
+
+DEFAULT_TIMEOUT = (5.0, 30.0)
+
+
+class Deadline():
+    """Overall time budget of a call, covering every retry, backoff and rate-limit wait.
+
+        :param seconds: budget in seconds, None for no deadline
+    """
+
+    def __init__(self, seconds=None):
+        self.expires_at = time.monotonic() + seconds if seconds is not None else None
+
+    def remaining(self):
+        """Seconds left, None when there is no deadline."""
+        if self.expires_at is None:
+            return None
+        return self.expires_at - time.monotonic()
+
+    def check(self, wait=0.0):
+        """Raises :class:`DeadlineExceededError` unless `wait` more seconds still fit."""
+        remaining = self.remaining()
+        if remaining is not None and remaining <= wait:
+            raise DeadlineExceededError('deadline exceeded')
+
+    def clamp(self, timeout):
+        """Shortens a `timeout` or `(connect, read)` timeout to the time left.
+
+            Returns a `(connect, read)` tuple, or None for no timeout and no deadline.
+        """
+        self.check()
+        if timeout is not None and not isinstance(timeout, tuple):
+            timeout = (timeout, timeout)
+        remaining = self.remaining()
+        if remaining is None:
+            return timeout
+        if timeout is None:
+            return (remaining, remaining)
+        connect, read = timeout
+        return (min(connect, remaining), min(read, remaining))
+
+
+class LatencyTracker():
+    """Sliding window of observed latencies per endpoint.
+
+        :param window: number of recent samples kept per endpoint
+    """
+
+    def __init__(self, window=200):
+        self.window = window
+        self._samples = {}
+        self._lock = threading.Lock()
+
+    def record(self, endpoint, seconds):
+        with self._lock:
+            samples = self._samples.get(endpoint)
+            if samples is None:
+                samples = self._samples[endpoint] = collections.deque(maxlen=self.window)
+            samples.append(seconds)
+
+    def percentile(self, endpoint, percentile, min_samples=1):
+        """Returns the latency percentile, or None with fewer than `min_samples` samples."""
+        with self._lock:
+            samples = sorted(self._samples.get(endpoint, ()))
+        if not samples or len(samples) < min_samples:
+            return None
+        index = min(len(samples) - 1, int(round(percentile / 100.0 * (len(samples) - 1))))
+        return samples[index]
+
+
+class HedgePolicy():
+    """Sends a second copy of a slow read and uses whichever answers first.
+
+        The second request goes out once the first has been in flight longer than
+        the endpoint's `percentile` latency, so only the slowest calls are hedged.
+        Only idempotent GETs (`fetch_banks`, `fetch_bank_accounts`) are hedged.
+
+        :param percentile: latency percentile used as the hedging delay
+
+        :param min_samples: samples needed before the percentile is trusted
+
+        :param default_delay: hedging delay in seconds until then
+
+        :param window: number of recent latencies kept per endpoint
+    """
+
+    def __init__(self, percentile=95, min_samples=20, default_delay=0.5, window=200):
+        self.percentile = percentile
+        self.min_samples = min_samples
+        self.default_delay = default_delay
+        self.latencies = LatencyTracker(window)
+
+    def delay(self, endpoint):
+        """Seconds to wait before hedging a call to `endpoint`."""
+        delay = self.latencies.percentile(endpoint, self.percentile, self.min_samples)
+        return delay if delay is not None else self.default_delay
+
+    def call(self, endpoint, func, executor):
+        """Runs `func` on `executor`, hedged after `delay(endpoint)` seconds."""
+        from concurrent.futures import FIRST_COMPLETED, wait
+
+        started = time.monotonic()
+        first = executor.submit(func)
+        done, _ = wait([first], timeout=self.delay(endpoint))
+        pending = {first} if not done else set()
+        if not done:
+            pending.add(executor.submit(func))
+
+        error = None
+        while True:
+            for future in done:
+                if future.exception() is None:
+                    self.latencies.record(endpoint, time.monotonic() - started)
+                    return future.result()
+                error = future.exception()
+            if not pending:
+                raise error
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+
+    async def call_async(self, endpoint, func):
+        """Awaits `func()`, hedged after `delay(endpoint)` seconds; the loser is cancelled."""
+        import asyncio
+
+        started = time.monotonic()
+        first = asyncio.ensure_future(func())
+        done, pending = await asyncio.wait([first], timeout=self.delay(endpoint))
+        if not done:
+            pending.add(asyncio.ensure_future(func()))
+
+        error = None
+        try:
+            while True:
+                for task in done:
+                    if task.exception() is None:
+                        self.latencies.record(endpoint, time.monotonic() - started)
+                        return task.result()
+                    error = task.exception()
+                if not pending:
+                    raise error
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            for task in pending:
+                task.cancel()
@@ -0,0 +1,307 @@
+"""Pluggable HTTP transports for traxionpay client"""
+import os
+import threading
+import time
+
+
+class Transport():
+    """Sends the client's HTTP requests; subclass it to plug in another HTTP library.
+
+        `request` returns an object with the attributes of a `requests.Response`
+        that the client reads: `status_code`, `ok`, `headers` (case-insensitive),
+        `content`, `text`, `json()`, `url` (after redirects) and `elapsed` (a
+        `timedelta` until the response headers arrived, or None). Responses of
+        `stream=True` requests also have `iter_content(chunk_size)`, yielding
+        the body as it is read, and `close()`, releasing the connection.
+
+        `errors` are the exceptions `request` raises for connection failures and
+        timeouts, which the client counts as failed attempts and retries; None
+        means those of `requests`.
+
+        The connection state returned by `_create_session` is created lazily and
+        again whenever the process id changes, so workers forked after the
+        transport was used (e.g. pre-fork gunicorn) never share sockets with their
+        parent.
+    """
+    errors = None
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._session = None
+        self._pid = None
+
+    def _create_session(self):
+        raise NotImplementedError
+
+    def _close_session(self, session):
+        session.close()
+
+    @property
+    def session(self):
+        """Returns the connection state for the current process, creating it if needed."""
+        pid = os.getpid()
+        session = self._session
+        if session is not None and self._pid == pid:
+            return session
+
+        with self._lock:
+            if self._session is None or self._pid != pid:
+                # a session inherited through fork is dropped without closing it,
+                # since its sockets still belong to the parent process
+                self._session = self._create_session()
+                self._pid = pid
+            return self._session
+
+    def request(self, method, url, headers=None, data=None, json=None, timeout=None,
+                stream=False):
+        """Sends a request and returns its response.
+
+            :param data: (optional) body as bytes, or a dict to send url-encoded
+
+            :param json: (optional) object to send as a JSON body
+
+            :param timeout: (optional) seconds, or `(connect, read)` seconds
+
+            :param stream: (optional) return once the headers arrived and leave the
+                body to be read through `iter_content`
+        """
+        raise NotImplementedError
+
+    def close(self):
+        """Closes all pooled connections. The transport reopens on next use."""
+        with self._lock:
+            if self._session is not None and self._pid == os.getpid():
+                self._close_session(self._session)
+            self._session = None
+            self._pid = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+def transport_errors(transport):
+    """Exceptions `transport` raises for connection failures and timeouts."""
+    errors = transport.errors if isinstance(transport, Transport) else None
+    if errors is None:
+        import requests
+        errors = (requests.ConnectionError, requests.Timeout)
+    return errors
+
+
+class Response():
+    """Response of :class:`Urllib3Transport`, read like a `requests.Response`.
+
+        A streamed response holds the unread `urllib3` response as `raw`, read
+        by `content` or `iter_content`.
+    """
+    __slots__ = ('status_code', 'headers', '_content', 'url', 'elapsed', 'raw')
+
+    def __init__(self, status_code, headers, content, url, elapsed=None, raw=None):
+        self.status_code = status_code
+        self.headers = headers
+        self._content = content
+        self.url = url
+        self.elapsed = elapsed
+        self.raw = raw
+
+    @property
+    def content(self):
+        if self._content is None and self.raw is not None:
+            self._content = b''.join(self.iter_content(65536))
+        return self._content
+
+    def iter_content(self, chunk_size=1):
+        """Yields the body in chunks of up to `chunk_size` bytes as they are read."""
+        raw = self.raw
+        if raw is None:
+            if self._content:
+                yield self._content
+            return
+        self.raw = None
+        try:
+            for chunk in raw.stream(chunk_size):
+                yield chunk
+        except BaseException:
+            raw.close()
+            raise
+        finally:
+            raw.release_conn()
+
+    def close(self):
+        """Releases the connection, closing it when the body was not read to the end."""
+        raw = self.raw
+        if raw is not None:
+            self.raw = None
+            raw.close()
+            raw.release_conn()
+
+    @property
+    def ok(self):
+        return self.status_code < 400
+
+    @property
+    def encoding(self):
+        content_type = self.headers.get('Content-Type') or ''
+        for parameter in content_type.split(';')[1:]:
+            name, _, value = parameter.strip().partition('=')
+            if name.lower() == 'charset' and value:
+                return value.strip('"\'')
+        return 'utf-8'
+
+    @property
+    def text(self):
+        try:
+            return self.content.decode(self.encoding, 'replace')
+        except LookupError:
+            return self.content.decode('utf-8', 'replace')
+
+    def json(self):
+        import json
+        return json.loads(self.content.decode('utf-8'))
+
+
+# statuses followed to their `Location`, and whether the method and body are kept
+_REDIRECTS = {301: False, 302: False, 303: False, 307: True, 308: True}
+# headers not sent on to another origin when redirected, as `requests` drops them
+_ORIGIN_HEADERS = ('authorization', 'idempotency-key')
+
+
+def _origin(url):
+    from urllib.parse import urlsplit
+
+    parts = urlsplit(url)
+    return parts.scheme.lower(), parts.hostname, parts.port
+
+
+class Urllib3Transport(Transport):
+    """Sends requests straight through a `urllib3.PoolManager`.
+
+        Skips the hooks, cookie jar, environment lookups and adapter layers of a
+        `requests.Session`, which are most of the client-side cost of the small
+        calls the API takes. Redirects are followed, as `requests` does, and the
+        `Authorization` and `Idempotency-Key` headers are dropped when one leads
+        to another scheme, host or port.
+        Connection failures and timeouts raise `urllib3.exceptions.HTTPError`
+        subclasses instead of the `requests` ones.
+
+        :param pool_connections: number of per-host connection pools to cache
+
+        :param pool_maxsize: maximum number of connections kept per host
+
+        :param pool_block: block when the pool is exhausted instead of opening
+            extra throwaway connections
+
+        :param keep_alive: keep connections open between calls; when False every
+            request is sent with `Connection: close`
+
+        :param max_redirects: redirects followed before returning the redirect response
+    """
+
+    def __init__(self, pool_connections=10, pool_maxsize=10, pool_block=False,
+                 keep_alive=True, max_redirects=5):
+        super(Urllib3Transport, self).__init__()
+        self.pool_connections = pool_connections
+        self.pool_maxsize = pool_maxsize
+        self.pool_block = pool_block
+        self.keep_alive = keep_alive
+        self.max_redirects = max_redirects
+
+    @property
+    def errors(self):
+        import urllib3.exceptions
+        return (urllib3.exceptions.HTTPError,)
+
+    def _create_session(self):
+        import urllib3
+
+        return urllib3.PoolManager(num_pools=self.pool_connections, maxsize=self.pool_maxsize,
+                                   block=self.pool_block, retries=False)
+
+    def _close_session(self, session):
+        session.clear()
+
+    def request(self, method, url, headers=None, data=None, json=None, timeout=None,
+                stream=False):
+        import datetime
+        from urllib.parse import urlencode, urljoin
+
+        import urllib3
+
+        headers = dict(headers) if headers else {}
+        body = data
+        if json is not None:
+            from .serializer import get_serializer
+            body = get_serializer().dumps(json)
+            headers.setdefault('Content-Type', 'application/json')
+        elif isinstance(data, dict):
+            body = urlencode(data)
+            headers.setdefault('Content-Type', 'application/x-www-form-urlencoded')
+        if not self.keep_alive:
+            headers['Connection'] = 'close'
+        if isinstance(timeout, tuple):
+            timeout = urllib3.Timeout(connect=timeout[0], read=timeout[1])
+        elif timeout is not None:
+            timeout = urllib3.Timeout(connect=timeout, read=timeout)
+
+        pool = self.session
+        for _ in range(self.max_redirects + 1):
+            started = time.perf_counter()
+            response = pool.urlopen(method, url, body=body, headers=headers, timeout=timeout,
+                                    redirect=False, preload_content=False)
+            elapsed = datetime.timedelta(seconds=time.perf_counter() - started)
+            location = response.headers.get('Location')
+            keep_method = _REDIRECTS.get(response.status)
+            if keep_method is None or not location:
+                break
+            content = response.read()
+            response.release_conn()
+            location = urljoin(url, location)
+            if _origin(location) != _origin(url):
+                headers = dict((name, value) for name, value in headers.items()
+                               if name.lower() not in _ORIGIN_HEADERS)
+            url = location
+            if not keep_method and method != 'HEAD':
+                method, body = 'GET', None
+                headers.pop('Content-Type', None)
+        else:
+            # out of redirects, the last redirect response is returned
+            return Response(response.status, response.headers, content, url, elapsed)
+        if stream:
+            return Response(response.status, response.headers, None, url, elapsed, raw=response)
+        content = response.read()
+        response.release_conn()
+        return Response(response.status, response.headers, content, url, elapsed)
+
+
+def make_transport(transport=None, **options):
+    """Returns `transport` when it is a :class:`Transport`, otherwise creates one by name.
+
+        :param transport: (optional) a :class:`Transport`, or a name of `TRANSPORTS`,
+            defaults to `requests`
+
+        :param options: pool options of the transport, such as `pool_maxsize`
+    """
+    if transport is None:
+        transport = 'requests'
+    if not isinstance(transport, str):
+        return transport
+    factory = TRANSPORTS.get(transport)
+    if factory is None:
+        raise ValueError('unknown transport {!r}, expected one of {}'.format(
+            transport, ', '.join(sorted(TRANSPORTS))))
+    return factory(**options)
+
+
+def _requests_transport(**options):
+    from .session import SessionPool
+    return SessionPool(**options)
+
+
+# transport names accepted by clients, add to it to select another adapter by name
+TRANSPORTS = {
+    'requests': _requests_transport,
+    'urllib3': Urllib3Transport,
+}
@@ -1,44 +1,290 @@
 """
 traxionpay module containing cash in and cash out functions
 """
-import base64
-import json
-import hmac
-import hashlib
-import requests
+import time
 
-from .constants import BASE_URL
+from .base_client import BaseTraxionPay
+from .batch import run_batch
+from .constants import BASE_URL, ENDPOINT_PATHS
 from .exceptions import MissingAuthenticationError, APIResponseError
-from .utils import (generate_token,
-                    encode_additional_data,
-                    is_valid_amount,
-                    is_valid_string,
-                    is_valid_id,
-                    is_valid_bank_type,
-                    is_length_acceptable)
+from .metrics import take_phases
+from .ratelimit import parse_retry_after
+from .singleflight import SingleFlight
+from .timeouts import DEFAULT_TIMEOUT, Deadline
+from .transport import make_transport, transport_errors
 
 
-class TraxionPay():
+class TraxionPay(BaseTraxionPay):
     """Core object for using TraxionPay's `cash_in` and `cash_out` functionalities.
 
         :param api_key:
 
         :param secret_key:
 
+        :param pool_connections: (optional) number of per-host connection pools to cache
+
+        :param pool_maxsize: (optional) maximum number of keep-alive connections per host
+
+        :param keep_alive: (optional) reuse connections across calls, defaults to True
+
+        :param transport: (optional) `requests` (the default), `urllib3` for the
+            lower-overhead :class:`Urllib3Transport`, or a :class:`Transport` instance,
+            which may be shared with other clients
+
+        :param session_pool: (optional) a :class:`SessionPool` to share with other clients,
+            same as passing it as `transport`
+
+        :param banks_ttl: (optional) seconds `fetch_banks` serves its cached response,
+            defaults to an hour, None disables the cache
+
+        :param cache_store: (optional) a :class:`FileCacheStore` to share the cache across processes
+
+        :param bank_accounts_ttl: (optional) seconds `fetch_bank_accounts` serves its cached
+            response, defaults to five minutes, None disables the cache
+
+        :param retry_policy: (optional) a :class:`RetryPolicy`, `RetryPolicy(max_retries=0)`
+            disables retries
+
+        :param circuit_breakers: (optional) a :class:`CircuitBreakers` with per-endpoint settings
+
+        :param rate_limiter: (optional) a :class:`RateLimiter` with per-endpoint token buckets
+
+        :param timeout: (optional) `(connect, read)` seconds for each request attempt,
+            defaults to `(5, 30)`
+
+        :param hedge_policy: (optional) a :class:`HedgePolicy` to hedge `fetch_banks`
+            and `fetch_bank_accounts`
+
+        :param instrumentation: (optional) an :class:`Instrumentation`, such as a
+            :class:`MetricsCollector`, called around every API call
+
+        :param journal: (optional) a :class:`Journal` recording every `cash_in` and
+            `cash_out` before and after it is sent
+
+        :param base_url: (optional) API root, such as the url of an :class:`Emulator`,
+            defaults to `https://devapi.traxionpay.com`
+
+        :param response_models: (optional) return :class:`Bank`, :class:`BankAccount`,
+            :class:`OtpResult` and :class:`Payout` models, decoded lazily, instead of dicts
+
+        Concurrent `fetch_banks` and `fetch_bank_accounts` calls that miss the cache
+        share one request; see `single_flight` for how many calls were coalesced.
+
+        The client keeps its connections open between calls. Use it as a context manager
+        or call `close` to release them.
+
         See full documentation at <https://dev.traxionpay.com/developers-guide>.
     """
 
-    def __init__(self, secret_key=None, api_key=None):
+    def __init__(self, secret_key=None, api_key=None,
+                 pool_connections=10, pool_maxsize=10, keep_alive=True,
+                 session_pool=None, banks_ttl=3600, cache_store=None,
+                 bank_accounts_ttl=300, retry_policy=None, circuit_breakers=None,
+                 rate_limiter=None, timeout=DEFAULT_TIMEOUT, hedge_policy=None,
+                 instrumentation=None, journal=None, base_url=None,
+                 response_models=False, transport=None):
+        self.transport = make_transport(session_pool if session_pool is not None else transport,
+                                        pool_connections=pool_connections,
+                                        pool_maxsize=pool_maxsize,
+                                        keep_alive=keep_alive)
+        self.timeout = timeout
+        self.hedge_policy = hedge_policy
+        self._hedge_executor = None
+        self.single_flight = SingleFlight()
+        super(TraxionPay, self).__init__(secret_key=secret_key, api_key=api_key,
+                                         banks_ttl=banks_ttl, cache_store=cache_store,
+                                         bank_accounts_ttl=bank_accounts_ttl,
+                                         retry_policy=retry_policy,
+                                         circuit_breakers=circuit_breakers,
+                                         rate_limiter=rate_limiter,
+                                         instrumentation=instrumentation,
+                                         journal=journal,
+                                         base_url=base_url,
+                                         response_models=response_models)
+
+    @property
+    def session_pool(self):
+        """The client's transport, by its name from before transports were pluggable."""
+        return self.transport
+
+    def release(self):
+        """Stops the client's hedging threads, leaving its transport open.
+
+        For clients sharing a transport, such as those of a :class:`MerchantRegistry`.
+        """
+        if self._hedge_executor is not None:
+            self._hedge_executor.shutdown(wait=False)
+            self._hedge_executor = None
+
+    def close(self):
+        """Closes pooled connections held by this client."""
+        self.release()
+        self.transport.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def _send(self, endpoint, method, url, hedge, **kwargs):
+        if not hedge:
+            return self.transport.request(method, url, **kwargs)
+        if self._hedge_executor is None:
+            from concurrent.futures import ThreadPoolExecutor
+            self._hedge_executor = ThreadPoolExecutor(max_workers=8)
+        return self.hedge_policy.call(endpoint,
+                                      lambda: self.transport.request(method, url, **kwargs),
+                                      self._hedge_executor)
+
+    def _json(self, response, model, many=False):
+        if self.response_models:
+            return self._models(response.content, model, many)
+        return response.json()
+
+    def _json_pages(self, endpoint, response, model, headers, timeout, deadline):
+        """Returns the records of a paginated list response, fetching its other pages.
+
+        Returns None when the first response is an object without records.
+        """
+        from urllib.parse import urljoin
+
+        from .streaming import next_link, read_page
+
+        records = []
+        seen = set()
+        while True:
+            page, next_url = read_page(response.content, self._model_class(model))
+            if page is None and not seen:
+                return None
+            records.extend(page or ())
+            next_url = next_url or next_link(response.headers.get('Link'))
+            if not next_url:
+                return records
+            url = urljoin(response.url, next_url)
+            if url in seen:
+                raise APIResponseError('pagination loops back to {}'.format(url))
+            seen.add(url)
+            response = self._request(endpoint, 'GET', idempotent=True, timeout=timeout,
+                                     deadline=deadline, url=url, headers=headers)
+            if not response.ok:
+                raise APIResponseError(response.text)
+
+    def _request(self, endpoint, method, idempotent=False, timeout=None, deadline=None,
+                 url=None, stream=False, **kwargs):
+        """Sends a request to `endpoint` through the pool.
+
+        Connection errors, timeouts and `retry_policy.retry_statuses` responses count
+        as failures for the endpoint's circuit breaker, and are retried with backoff
+        when the call is idempotent. `429` responses feed their `Retry-After` into the
+        rate limiter and are retried the same way. The last response or error is
+        returned or raised.
+
+        `timeout` applies to each attempt while `deadline` bounds the whole call,
+        raising :class:`DeadlineExceededError` once no further attempt fits.
+
+        `url` replaces the endpoint's url, e.g. for the next page of a list. With
+        `stream`, a successful response is returned before its body is read.
+        """
+        self._encode_json(kwargs)
+        record = self._start_call(endpoint, method, kwargs)
+        if stream:
+            kwargs['stream'] = True
+        if record is None:
+            return self._attempt(endpoint, method, idempotent, timeout, deadline, None, kwargs,
+                                 url)
         try:
-            self.secret_key = secret_key
-            self.api_key = api_key
-            self.token = generate_token(secret_key=secret_key)
-            self.auth_headers = {
-                'Authorization': 'Basic {}'.format(self.token),
-                'Content-Type': 'application/json'
-            }
-        except:
-            raise ValueError('Secret key and API key cannot be null')
+            response = self._attempt(endpoint, method, idempotent, timeout, deadline, record,
+                                     kwargs, url)
+        except Exception as exc:
+            self._finish_call(record, error=exc)
+            raise
+        self._finish_call(record, response_bytes=0 if stream else len(response.content or b''))
+        return response
+
+    def _attempt(self, endpoint, method, idempotent, timeout, deadline, record, kwargs,
+                 url=None):
+        errors = transport_errors(self.transport)
+        stream = kwargs.get('stream', False)
+        if url is None:
+            url = '{}{}'.format(self.base_url or BASE_URL, ENDPOINT_PATHS[endpoint])
+        policy = self.retry_policy
+        limiter = self.rate_limiter
+        breaker = self.circuit_breakers.get(endpoint)
+        timeout = timeout if timeout is not None else self.timeout
+        deadline = Deadline(deadline)
+        hedge = (self.hedge_policy is not None and idempotent and method == 'GET'
+                 and not stream)
+        attempt = 0
+        while True:
+            if breaker is not None:
+                breaker.before_call(endpoint)
+            try:
+                if limiter is not None:
+                    wait = limiter.reserve(endpoint)
+                    if wait > 0:
+                        deadline.check(wait)
+                        time.sleep(wait)
+                        if record is not None:
+                            record.add('wait', wait)
+                attempt_timeout = deadline.clamp(timeout)
+            except BaseException:
+                # nothing was sent, a half-open circuit lets the next call try
+                if breaker is not None:
+                    breaker.release()
+                raise
+
+            error = response = retry_after = None
+            started = time.perf_counter()
+            try:
+                response = self._send(endpoint, method, url, hedge, timeout=attempt_timeout,
+                                      **kwargs)
+                if stream and not response.ok:
+                    # read so the connection goes back to the pool before a retry
+                    response.content
+            except errors as exc:
+                error = exc
+            except Exception:
+                # e.g. too many redirects, counted so a half-open circuit does not stay so
+                if breaker is not None:
+                    breaker.record_failure()
+                raise
+            except BaseException:
+                if breaker is not None:
+                    breaker.release()
+                raise
+            if record is not None:
+                record.add('send', time.perf_counter() - started)
+                if response is not None:
+                    record.status = response.status_code
+                    if response.elapsed:
+                        record.add('server', response.elapsed.total_seconds())
+            failed = error is not None or response.status_code in policy.retry_statuses
+            if response is not None and response.status_code == 429:
+                retry_after = parse_retry_after(response.headers.get('Retry-After'))
+                if limiter is not None:
+                    limiter.throttled(endpoint, retry_after)
+
+            if breaker is not None:
+                if failed:
+                    breaker.record_failure()
+                else:
+                    breaker.record_success()
+            if (failed or retry_after is not None) and idempotent and attempt < policy.max_retries:
+                if retry_after is None:
+                    delay = policy.backoff(attempt)
+                else:
+                    delay = retry_after if limiter is None else 0
+                deadline.check(delay)
+                time.sleep(delay)
+                attempt += 1
+                if record is not None:
+                    record.add('wait', delay)
+                    record.retries = attempt
+                continue
+            if error is not None:
+                raise error
+            return response
 
     def cash_in(self,
                 merchant_id=None,
@@ -53,6 +299,8 @@ class TraxionPay():
                 failure_page_url=None,
                 cancel_page_url=None,
                 pending_page_url=None,
+                timeout=None,
+                deadline=None,
                 **billing_details):
         """Cash In enables merchants to receive money through the application.
             Through this feature, merchants receive payments and store it in their in-app wallet.
@@ -84,315 +332,252 @@ class TraxionPay():
             :param pending_page_url:
 
             :billing_details: (optional)
+
+            :param timeout: (optional) `(connect, read)` seconds for each attempt
+
+            :param deadline: (optional) seconds the whole call may take, retries included
         """
-        payform_data = {}
-
-        # merchant ID
-        if merchant_id is not None:
-            if is_valid_id(merchant_id):
-                payform_data['merchant_id'] = merchant_id
-            else:
-                raise TypeError('merchant_id should be of type int')
-        else:
-            raise ValueError('merchant_id cannot be None')
-
-        # merchant reference number
-        if merchant_ref_no is not None:
-            if is_valid_string(merchant_ref_no):
-                length = 100
-                if is_length_acceptable(merchant_ref_no, length):
-                    payform_data['merchant_ref_no'] = merchant_ref_no
-                else:
-                    raise ValueError(
-                        'merchant_ref_no must be less than or equal to {}'.format(length))
-            else:
-                raise TypeError('merchant_ref_no should be of type str')
-        else:
-            raise ValueError('merchant_ref_no cannot be None')
-
-        # payment description
-        if description is not None:
-            if is_valid_string(description):
-                length = 500
-                if is_length_acceptable(description, length):
-                    payform_data['description'] = description
-                else:
-                    raise ValueError('description must be less than or equal to {}'.format(length))
-            else:
-                raise TypeError('description should be of type str')
-        else:
-            raise ValueError('description cannot be None')
-
-        # total amount
-        if amount is not None:
-            if is_valid_amount(amount):
-                payform_data['amount'] = amount
-            else:
-                raise TypeError('amount should be of type float')
-        else:
-            raise ValueError('amount cannot be None')
-
-        # additional merchant data
-        if merchant_additional_data is not None:
-            if isinstance(merchant_additional_data, dict):
-                encoded_data = encode_additional_data(merchant_additional_data)
-                payform_data['merchant_additional_data'] = encoded_data
-            else:
-                raise TypeError('merchant_additional_data should be of type dict')
-        else:
-            raise ValueError('merchant_additional_data cannot be None')
-
-        # currency
-        if currency is not None:
-            if is_valid_string(currency):
-                payform_data['currency'] = currency
-            else:
-                raise TypeError('currency should be of type str')
-        else:
-            payform_data['currency'] = 'PHP'
-
-        # billing email
-        billing_email = billing_details.get('billing_email')
-        if billing_email is not None:
-            if is_valid_string(billing_email):
-                payform_data['billing_email'] = billing_email
-            else:
-                raise TypeError('billing_email should be of type str')
-        else:
-            payform_data['billing_email'] = ''
-
-        # billing first name
-        billing_first_name = billing_details.get('billing_first_name')
-        if billing_first_name is not None:
-            if is_valid_string(billing_first_name):
-                payform_data['billing_first_name'] = billing_first_name
-            else:
-                raise TypeError('billing_first_name should be of type str')
-        else:
-            payform_data['billing_first_name'] = ''
-
-        # billing last name
-        billing_last_name = billing_details.get('billing_last_name')
-        if billing_last_name is not None:
-            if is_valid_string(billing_last_name):
-                payform_data['billing_last_name'] = billing_last_name
-            else:
-                raise TypeError('billing_last_name should be of type str')
-        else:
-            payform_data['billing_last_name'] = ''
-
-        # billing middle name
-        billing_middle_name = billing_details.get('billing_middle_name')
-        if billing_middle_name is not None:
-            if is_valid_string(billing_middle_name):
-                payform_data['billing_middle_name'] = billing_middle_name
-            else:
-                raise TypeError('billing_middle_name should be of type str')
-        else:
-            payform_data['billing_middle_name'] = ''
-
-        # billing phone
-        billing_phone = billing_details.get('billing_phone')
-        if billing_phone is not None:
-            if is_valid_string(billing_phone):
-                payform_data['billing_phone'] = billing_phone
-            else:
-                raise TypeError('billing_phone should be of type str')
-        else:
-            payform_data['billing_phone'] = ''
-
-        # billing mobile
-        billing_mobile = billing_details.get('billing_mobile')
-        if billing_mobile is not None:
-            if is_valid_string(billing_mobile):
-                payform_data['billing_mobile'] = billing_mobile
-            else:
-                raise TypeError('billing_mobile should be of type str')
-        else:
-            payform_data['billing_mobile'] = ''
-
-        # billing address
-        billing_address = billing_details.get('billing_address')
-        if billing_address is not None:
-            if is_valid_string(billing_address):
-                payform_data['billing_address'] = billing_address
-            else:
-                raise TypeError('billing_address should be of type str')
-        else:
-            payform_data['billing_address'] = ''
-
-        # billing address2
-        billing_address2 = billing_details.get('billing_address2')
-        if billing_address2 is not None:
-            if is_valid_string(billing_address2):
-                payform_data['billing_address2'] = billing_address2
-            else:
-                raise TypeError('billing_address2 should be of type str')
-        else:
-            payform_data['billing_address2'] = ''
-
-        # billing city
-        billing_city = billing_details.get('billing_city')
-        if billing_city is not None:
-            if is_valid_string(billing_city):
-                payform_data['billing_city'] = billing_city
-            else:
-                raise TypeError('billing_city should be of type str')
-        else:
-            payform_data['billing_city'] = ''
-
-        # billing state
-        billing_state = billing_details.get('billing_state')
-        if billing_state is not None:
-            if is_valid_string(billing_state):
-                payform_data['billing_state'] = billing_state
-            else:
-                raise TypeError('billing_state should be of type str')
-        else:
-            payform_data['billing_state'] = ''
-
-        # billing zip
-        billing_zip = billing_details.get('billing_zip')
-        if billing_zip is not None:
-            if is_valid_string(billing_zip):
-                payform_data['billing_zip'] = billing_zip
-            else:
-                raise TypeError('billing_zip should be of type str')
-        else:
-            payform_data['billing_zip'] = ''
-
-        # billing country
-        billing_country = billing_details.get('billing_country')
-        if billing_country is not None:
-            if is_valid_string(billing_country):
-                payform_data['billing_country'] = billing_country
-            else:
-                raise TypeError('billing_country should be of type str')
-        else:
-            payform_data['billing_country'] = 'PH'
-
-        # billing remark
-        billing_remark = billing_details.get('billing_remark')
-        if billing_remark is not None:
-            if is_valid_string(billing_remark):
-                payform_data['billing_remark'] = billing_mobile
-            else:
-                raise TypeError('billing_remark should be of type str')
-        else:
-            payform_data['billing_remark'] = ''
-
-        # payment method
-        if payment_method is not None:
-            if is_valid_string(payment_method):
-                payform_data['payment_method'] = payment_method
-            else:
-                raise TypeError('payment_method should be of type str')
-        else:
-            payform_data['payment_method'] = ''
-
-        # status notification url
-        if status_notification_url is not None:
-            if is_valid_string(status_notification_url):
-                payform_data['status_notification_url'] = status_notification_url
-            else:
-                raise TypeError('status_notification_url should be of type str')
-        else:
-            payform_data['status_notification_url'] = ''
-
-        # url when successful
-        if success_page_url is not None:
-            if is_valid_string(success_page_url):
-                payform_data['success_page_url'] = success_page_url
-            else:
-                raise TypeError('success_page_url should be of type str')
-        else:
-            payform_data['success_page_url'] = ''
-
-        # url when failed
-        if failure_page_url is not None:
-            if is_valid_string(failure_page_url):
-                payform_data['failure_page_url'] = failure_page_url
-            else:
-                raise TypeError('failure_page_url should be of type str')
-        else:
-            payform_data['failure_page_url'] = ''
-
-        # url when cancelled
-        if cancel_page_url is not None:
-            if is_valid_string(cancel_page_url):
-                payform_data['cancel_page_url'] = cancel_page_url
-            else:
-                raise TypeError('cancel_page_url should be of type str')
-        else:
-            payform_data['cancel_page_url'] = ''
-
-        # url when pending
-        if pending_page_url is not None:
-            if is_valid_string(pending_page_url):
-                payform_data['pending_page_url'] = pending_page_url
-            else:
-                raise TypeError('pending_page_url should be of type str')
-        else:
-            payform_data['pending_page_url'] = ''
+        payload = self._build_cash_in_payload(merchant_id=merchant_id,
+                                              merchant_ref_no=merchant_ref_no,
+                                              description=description,
+                                              amount=amount,
+                                              currency=currency,
+                                              merchant_additional_data=merchant_additional_data,
+                                              payment_method=payment_method,
+                                              status_notification_url=status_notification_url,
+                                              success_page_url=success_page_url,
+                                              failure_page_url=failure_page_url,
+                                              cancel_page_url=cancel_page_url,
+                                              pending_page_url=pending_page_url,
+                                              **billing_details)
+
+        return self._post_cash_in(payload, timeout, deadline, merchant_ref_no, amount)
+
+
+    def _post_cash_in(self, payload, timeout, deadline, merchant_ref_no, amount):
+        def send():
+            # merchant_ref_no makes payform links idempotent
+            response = self._request('payform-link', 'POST', idempotent=True,
+                                     timeout=timeout, deadline=deadline,
+                                     headers=self.FORM_HEADERS, data=payload)
+
+            if not response.ok:
+                raise APIResponseError(response.text)
+            return response.url
+
+        return self._journaled('cash_in', merchant_ref_no, {'amount': amount}, send)
+
+
+    def fetch_banks(self, refresh=False, timeout=None, deadline=None):
+        """Retrieves list of banks.
+
+        The list is cached for `banks_ttl` seconds, then revalidated with
+        `If-None-Match`/`If-Modified-Since` when the server sent validators.
+        Calls made while a fetch is in flight wait for it and share its result.
+        Paginated responses are followed as in `iter_banks` and joined into one list.
 
-        data_to_hash = '{}{}{}{}'.format(merchant_ref_no, amount, 'PHP', description)
+        GET `https://devapi.traxionpay.com/banks/`
 
-        secure_hash = hmac.new(self.secret_key.encode(),
-                               data_to_hash.encode(),
-                               hashlib.sha256).hexdigest()
+        :param refresh: (optional) bypass the cache and fetch a fresh list
 
-        auth_hash = hmac.new(self.secret_key.encode(),
-                             self.api_key.encode(),
-                             hashlib.sha256).hexdigest()
-        alg = "HS256"
+        :param timeout: (optional) `(connect, read)` seconds for each attempt
+
+        :param deadline: (optional) seconds the whole call may take, retries included
+        """
+        if not refresh:
+            entry = self.banks_cache.get(self.BANKS_CACHE_KEY)
+            if entry is not None and entry.fresh:
+                return entry.value
 
-        payform_data['secure_hash'] = secure_hash
-        payform_data['auth_hash'] = auth_hash
-        payform_data['alg'] = alg
+        return self.single_flight.do('banks',
+                                     lambda: self._load_banks(refresh, timeout, deadline))
 
-        # send cash_in request
-        encoded_payform_data = base64.b64encode(json.dumps(payform_data).encode()).decode('utf-8')
-        payload = {'form_data': encoded_payform_data}
 
-        response = requests.post(url='{}/payform-link'.format(BASE_URL), data=payload)
+    def _load_banks(self, refresh, timeout, deadline):
+        entry = None if refresh else self.banks_cache.get(self.BANKS_CACHE_KEY)
+        if entry is not None and entry.fresh:
+            return entry.value
 
+        headers = entry.conditional_headers() if entry is not None else None
+        response = self._request('banks', 'GET', idempotent=True,
+                                 timeout=timeout, deadline=deadline, headers=headers)
+
+        if entry is not None and response.status_code == 304:
+            return self.banks_cache.revalidated(self.BANKS_CACHE_KEY, entry)
         if not response.ok:
             raise APIResponseError(response.text)
-        return response.url
+        from .streaming import is_paged
+        banks = None
+        if is_paged(response.content, response.headers):
+            banks = self._json_pages('banks', response, 'Bank', None, timeout, deadline)
+        if banks is not None:
+            # validators of the first page do not cover the others
+            self._store_banks(banks, {})
+        else:
+            banks = self._json(response, 'Bank', many=True)
+            self._store_banks(banks, response.headers)
+        return banks
 
 
-    def fetch_banks(self):
-        """Retrieves list of banks.
+    def iter_banks(self, timeout=None, deadline=None, chunk_size=65536):
+        """Yields the banks one at a time, parsing the response as it is read.
+
+        Unlike `fetch_banks`, the whole list is never held at once, and the first
+        bank arrives before the rest of the body; the cache is neither read nor
+        filled. Pages are followed when the response is a page object with a
+        `next` url, or has a `Link: <url>; rel="next"` header.
 
         GET `https://devapi.traxionpay.com/banks/`
+
+        :param timeout: (optional) `(connect, read)` seconds for each attempt
+
+        :param deadline: (optional) seconds each page request may take, retries included
+
+        :param chunk_size: (optional) bytes read off the socket at a time
         """
-        response = requests.get(url='{}/banks/'.format(BASE_URL))
+        return self._iter_records('banks', 'Bank', None, timeout, deadline, chunk_size)
 
-        if not response.ok:
-            raise APIResponseError(response.text)
-        return response.json()
+
+    def bank_directory(self, refresh=False):
+        """Returns a :class:`BankDirectory` of the banks from `fetch_banks`.
+
+        The directory is rebuilt only when the cached bank list changes. Once loaded,
+        `link_bank_account` rejects unknown bank codes without calling the API.
+
+        :param refresh: (optional) bypass the `fetch_banks` cache
+        """
+        return self._update_bank_directory(self.fetch_banks(refresh=refresh))
 
 
-    def fetch_bank_accounts(self):
+    def fetch_bank_accounts(self, refresh=False, timeout=None, deadline=None):
         """Retrieves list of usable bank accounts.
 
+        The list is cached for `bank_accounts_ttl` seconds and updated by `link_bank_account`.
+        Calls made while a fetch is in flight wait for it and share its result.
+
         GET `https://devapi.traxionpay.com/payout/bank-account/`
+
+        :param refresh: (optional) bypass the cache and fetch a fresh list
+
+        :param timeout: (optional) `(connect, read)` seconds for each attempt
+
+        :param deadline: (optional) seconds the whole call may take, retries included
         """
+        if not refresh:
+            bank_accounts = self.bank_accounts_cache.get()
+            if bank_accounts is not None:
+                return bank_accounts
+
+        return self.single_flight.do('bank-account',
+                                     lambda: self._load_bank_accounts(refresh, timeout, deadline))
+
+
+    def _load_bank_accounts(self, refresh, timeout, deadline):
+        if not refresh:
+            bank_accounts = self.bank_accounts_cache.get()
+            if bank_accounts is not None:
+                return bank_accounts
+
         try:
-            response = requests.get(url='{}/payout/bank-account/'.format(BASE_URL),
-                                    headers=self.auth_headers)
+            response = self._request('bank-account', 'GET', idempotent=True,
+                                     timeout=timeout, deadline=deadline,
+                                     headers=self.auth_headers)
         except AttributeError:
             raise MissingAuthenticationError()
 
         if not response.ok:
             raise APIResponseError(response.text)
-        return response.json()
+        from .streaming import is_paged
+        bank_accounts = None
+        if is_paged(response.content, response.headers):
+            bank_accounts = self._json_pages('bank-account', response, 'BankAccount',
+                                             self.auth_headers, timeout, deadline)
+        if bank_accounts is None:
+            bank_accounts = self._json(response, 'BankAccount', many=True)
+        self.bank_accounts_cache.set(bank_accounts)
+        return bank_accounts
+
+
+    def iter_bank_accounts(self, timeout=None, deadline=None, chunk_size=65536):
+        """Yields the usable bank accounts one at a time, parsing the response as it is read.
+
+        For merchants with many linked accounts: unlike `fetch_bank_accounts`, the
+        whole list is never held at once, and the first account arrives before the
+        rest of the body; the cache is neither read nor filled. Pages are followed
+        as in `iter_banks`. A connection error while reading raises from the
+        iterator, after the accounts already yielded.
+
+        GET `https://devapi.traxionpay.com/payout/bank-account/`
+
+        :param timeout: (optional) `(connect, read)` seconds for each attempt
+
+        :param deadline: (optional) seconds each page request may take, retries included
+
+        :param chunk_size: (optional) bytes read off the socket at a time
+        """
+        try:
+            headers = self.auth_headers
+        except AttributeError:
+            raise MissingAuthenticationError()
+        return self._iter_records('bank-account', 'BankAccount', headers, timeout, deadline,
+                                  chunk_size)
+
+
+    def _iter_records(self, endpoint, model, headers, timeout, deadline, chunk_size):
+        from urllib.parse import urljoin
+
+        from .streaming import RecordParser, next_link
+
+        url = None
+        seen = set()
+        while True:
+            response = self._request(endpoint, 'GET', idempotent=True, timeout=timeout,
+                                     deadline=deadline, url=url, stream=True, headers=headers)
+            if not response.ok:
+                raise APIResponseError(response.text)
+            parser = RecordParser(record=self._model_class(model))
+            try:
+                for chunk in response.iter_content(chunk_size):
+                    for record in parser.feed(chunk):
+                        yield record
+                parser.close()
+            finally:
+                response.close()
+
+            next_url = parser.page.get('next') or next_link(response.headers.get('Link'))
+            if not next_url:
+                return
+            url = urljoin(response.url, next_url)
+            if url in seen:
+                raise APIResponseError('pagination loops back to {}'.format(url))
+            seen.add(url)
+
+
+    def get_bank_account(self, bank_account_id=None, account_number=None, refresh=False):
+        """Returns the linked bank account with the given id or account number, or None.
+
+        Served from the `fetch_bank_accounts` cache, or searched for in the fetched
+        list when the cache is disabled.
+
+        :param bank_account_id: (optional) id to pass as `cash_out`'s `bank_account`
+
+        :param account_number: (optional)
+
+        :param refresh: (optional) bypass the cache and fetch a fresh list
+        """
+        if bank_account_id is None and account_number is None:
+            raise ValueError('bank_account_id or account_number must be given')
+        accounts = self.fetch_bank_accounts(refresh=refresh)
+        return self._find_bank_account(accounts, bank_account_id, account_number)
 
 
     def link_bank_account(self, bank_code=None, bank_type=None,
-                          account_number=None, account_name=None):
+                          account_number=None, account_name=None,
+                          timeout=None, deadline=None):
         """Links or creates a new bank account.
 
+        Raises `ValueError` for a `bank_code` missing from a loaded `bank_directory`.
+
         POST `https://devapi.traxionpay.com/payout/bank-account/`
 
         :param bank_code:
@@ -402,82 +587,56 @@ class TraxionPay():
         :param account_number:
 
         :param account_name:
-        """
-
-        payload = {}
 
-        # otp
-        if bank_code is not None:
-            if is_valid_string(bank_code):
-                payload['bank'] = bank_code
-            else:
-                raise TypeError('bank_code must be of type str')
-        else:
-            raise ValueError('bank_code cannot be None')
+        :param timeout: (optional) `(connect, read)` seconds for each attempt
 
-        # bank type
-        if bank_type is not None:
-            if is_valid_string(bank_type):
-                if is_valid_bank_type(bank_type):
-                    payload['bank_type'] = bank_type
-                else:
-                    raise ValueError('bank_type must either be "checkings" or "savings"')
-            else:
-                raise TypeError('bank_type must be of type str')
-        else:
-            raise ValueError('bank_type cannot be None')
-
-        # account number
-        if account_number is not None:
-            if is_valid_string(account_number):
-                payload['account_number'] = account_number
-            else:
-                raise TypeError('account_number must be of type str')
-        else:
-            raise ValueError('account_number cannot be None')
-
-        # account name
-        if account_name is not None:
-            if is_valid_string(account_name):
-                length = 50
-                if is_length_acceptable(account_name, length):
-                    payload['account_name'] = account_name
-                else:
-                    raise ValueError('account_name must be less than or equal to {}'.format(length))
-            else:
-                raise TypeError('account_name must be of type str')
-        else:
-            raise ValueError('account_name cannot be None')
+        :param deadline: (optional) seconds the whole call may take, retries included
+        """
+        payload = self._build_link_bank_account_payload(bank_code=bank_code,
+                                                        bank_type=bank_type,
+                                                        account_number=account_number,
+                                                        account_name=account_name)
 
         try:
-            response = requests.post(url='{}/payout/bank-account/'.format(BASE_URL),
+            response = self._request('bank-account', 'POST',
+                                     timeout=timeout, deadline=deadline,
                                      headers=self.auth_headers,
                                      json=payload)
         except AttributeError:
             raise MissingAuthenticationError()
+        finally:
+            # phases of a payload left unsent must not reach the next call
+            take_phases()
 
         if not response.ok:
             raise APIResponseError(response.text)
-        return response.json()
+        bank_account = self._json(response, 'BankAccount')
+        self.bank_accounts_cache.add(bank_account)
+        return bank_account
 
 
-    def fetch_otp(self):
+    def fetch_otp(self, timeout=None, deadline=None):
         """Retrieves otp for `cash_out` method.
 
         POST `https://devapi.traxionpay.com/bank-payout/get-otp/`
+
+        :param timeout: (optional) `(connect, read)` seconds for each attempt
+
+        :param deadline: (optional) seconds the whole call may take, retries included
         """
         try:
-            response = requests.post(url='{}/payout/bank-payout/get-otp/'.format(BASE_URL),
+            response = self._request('get-otp', 'POST', timeout=timeout, deadline=deadline,
                                      headers=self.auth_headers)
         except AttributeError:
             raise MissingAuthenticationError()
 
         if not response.ok:
             raise APIResponseError(response.text)
-        return response.json()
+        return self._json(response, 'OtpResult')
 
 
-    def cash_out(self, otp=None, amount=None, bank_account=None):
+    def cash_out(self, otp=None, amount=None, bank_account=None, idempotency_key=None,
+                 timeout=None, deadline=None):
         """The Cash Out feature allows merchants to physically
         retrieve the money stored in the in-app wallet.
 
@@ -491,43 +650,58 @@ class TraxionPay():
         :param amount:
 
         :param bank_account:
-        """
-        payload = {}
-
-        # otp
-        if otp is not None:
-            if is_valid_string(otp):
-                payload['OTP'] = otp
-            else:
-                raise TypeError('otp must be of type str')
-        else:
-            raise ValueError('otp cannot be None')
-
-        # amount
-        if amount is not None:
-            if is_valid_amount(amount):
-                payload['amount'] = amount
-            else:
-                raise TypeError('amount must be of type float')
-        else:
-            raise ValueError('amount cannot be None')
-
-        # bank account number
-        if bank_account is not None:
-            if is_valid_id(bank_account):
-                payload['bank_account'] = bank_account
-            else:
-                raise TypeError('bank_account must be of type str')
-        else:
-            raise ValueError('bank_account cannot be None')
 
+        :param idempotency_key: (optional) unique key of this payout, sent as the
+            `Idempotency-Key` header; transient failures are only retried when it is
+            given and the retry policy has `retry_payouts` set
+
+        :param timeout: (optional) `(connect, read)` seconds for each attempt
+
+        :param deadline: (optional) seconds the whole call may take, retries included
+        """
         try:
-            response = requests.post(url='{}/payout/bank-payout/'.format(BASE_URL),
-                                     headers=self.auth_headers,
-                                     json=payload)
+            headers = self._payout_headers(idempotency_key)
         except AttributeError:
             raise MissingAuthenticationError()
+        payload = self._build_cash_out_payload(otp=otp, amount=amount, bank_account=bank_account)
 
-        if not response.ok:
-            raise APIResponseError(response.text)
-        return response.json()
+        def send():
+            response = self._request('payout', 'POST',
+                                     idempotent=self._retry_payout(idempotency_key),
+                                     timeout=timeout, deadline=deadline,
+                                     headers=headers,
+                                     json=payload)
+
+            if not response.ok:
+                raise APIResponseError(response.text)
+            return self._json(response, 'Payout')
+
+        return self._journaled('cash_out', idempotency_key,
+                               {'amount': amount, 'bank_account': bank_account}, send)
+
+
+    def cash_in_many(self, specs, workers=8, ordered=True):
+        """Runs `cash_in` for each spec concurrently, yielding a :class:`BatchResult` per item.
+
+        A failing item does not abort the batch; its exception is returned
+        in `BatchResult.error` and the payform url of a success in `BatchResult.value`.
+
+        :param specs: iterable of `cash_in` keyword-argument dicts
+
+        :param workers: (optional) number of concurrent requests, defaults to 8
+
+        :param ordered: (optional) yield in input order, otherwise as completed
+        """
+        return run_batch(self.cash_in, specs, workers=workers, ordered=ordered)
+
+
+    def cash_out_many(self, specs, workers=8, ordered=True):
+        """Runs `cash_out` for each spec concurrently, yielding a :class:`BatchResult` per item.
+
+        :param specs: iterable of `cash_out` keyword-argument dicts
+
+        :param workers: (optional) number of concurrent requests, defaults to 8
+
+        :param ordered: (optional) yield in input order, otherwise as completed
+        """
+        return run_batch(self.cash_out, specs, workers=workers, ordered=ordered)
@@ -1,9 +1,10 @@
 """Utils for traxionpay client"""
 
-import json
 import base64
 import sys
 
+from .serializer import get_serializer
+
 PY2 = sys.version_info[0] == 2
 PY3 = sys.version_info[0] == 3
 
@@ -18,7 +19,7 @@ def generate_token(secret_key=None):
 def encode_additional_data(additional_data):
     """Encodes additional_data object"""
     if isinstance(additional_data, dict):
-        return base64.b64encode(json.dumps(additional_data).encode()).decode('utf-8')
+        return get_serializer().b64encode(additional_data).decode('ascii')
     raise ValueError("additional_data must be of type dict")
 
 def is_valid_amount(var):
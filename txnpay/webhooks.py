@@ -0,0 +1,238 @@
+"""Receiving side of `status_notification_url` callbacks"""
+import base64
+import inspect
+import json
+
+try:
+    from urllib.parse import parse_qsl
+except ImportError:
+    from urlparse import parse_qsl
+
+from .exceptions import InvalidNotificationError, InvalidSignatureError
+from .signing import Signer, signatures_match
+
+SIGNED_FIELDS = ('merchant_ref_no', 'amount', 'currency', 'description')
+FIELD_DEFAULTS = {'currency': 'PHP', 'description': ''}
+
+
+def parse_notification(body, content_type=None):
+    """Parses a notification body into a dict.
+
+        Accepts JSON, url-encoded forms, and url-encoded forms carrying a single
+        base64 JSON `form_data` field like the one `cash_in` sends.
+
+        :param body: raw request body (bytes or str)
+
+        :param content_type: (optional) `Content-Type` of the request
+    """
+    if isinstance(body, bytes):
+        try:
+            body = body.decode('utf-8')
+        except UnicodeDecodeError:
+            raise InvalidNotificationError('notification body is not valid utf-8')
+    body = body.strip()
+
+    try:
+        if (content_type and 'json' in content_type) or body.startswith('{'):
+            notification = json.loads(body)
+        else:
+            notification = dict(parse_qsl(body, keep_blank_values=True))
+            if list(notification) == ['form_data']:
+                notification = json.loads(base64.b64decode(notification['form_data']))
+    except ValueError:
+        raise InvalidNotificationError('notification body could not be parsed')
+
+    if not isinstance(notification, dict):
+        raise InvalidNotificationError('notification body must be an object')
+    return notification
+
+
+class NotificationHandler():
+    """Verifies and dispatches TraxionPay status notifications.
+
+        The handler is a WSGI application, and `handler.asgi` is the same handler
+        as an ASGI application. Notifications are verified with the HMAC-SHA256
+        `secure_hash` scheme `cash_in` uses, compared in constant time, and then
+        passed to the registered callbacks.
+
+        :param secret_key:
+
+        :param signed_fields: (optional) notification fields concatenated, in order,
+            into the signed message
+
+        :param signature_field: (optional) field holding the hex signature
+
+        :param status_field: (optional) field used to dispatch to status callbacks
+    """
+
+    def __init__(self, secret_key=None, signed_fields=SIGNED_FIELDS,
+                 signature_field='secure_hash', status_field='status'):
+        if secret_key is None:
+            raise ValueError('Secret key cannot be None.')
+        self.signer = Signer(secret_key)
+        self.signed_fields = tuple(signed_fields)
+        self.signature_field = signature_field
+        self.status_field = status_field
+        self._callbacks = {}
+
+    def register(self, callback, status=None):
+        """Calls `callback(notification)` for verified notifications.
+
+            :param callback: callable, or coroutine function when served through `asgi`
+
+            :param status: (optional) only dispatch notifications with this status
+        """
+        self._callbacks.setdefault(status, []).append(callback)
+        return callback
+
+    def on(self, status=None):
+        """Decorator form of `register`."""
+        def decorator(callback):
+            return self.register(callback, status=status)
+        return decorator
+
+    def message(self, notification):
+        """Builds the signed message of a parsed notification."""
+        parts = []
+        for field in self.signed_fields:
+            value = notification.get(field)
+            if value is None:
+                if field not in FIELD_DEFAULTS:
+                    raise InvalidNotificationError('{} is missing'.format(field))
+                value = FIELD_DEFAULTS[field]
+            parts.append(str(value))
+        return ''.join(parts)
+
+    def verify(self, notification, content_type=None):
+        """Returns the parsed notification, raising `InvalidSignatureError` when it is forged.
+
+            :param notification: raw body or an already parsed dict
+        """
+        if not isinstance(notification, dict):
+            notification = parse_notification(notification, content_type)
+        signature = notification.get(self.signature_field)
+        if not isinstance(signature, str) or not self.signer.verify(self.message(notification),
+                                                                    signature):
+            raise InvalidSignatureError('notification signature does not match')
+        return notification
+
+    def verify_many(self, notifications):
+        """Verifies a batch of notifications, e.g. when replaying a queue.
+
+            Returns a list of `(notification, valid)` tuples in input order;
+            bodies that cannot be parsed are returned as-is with `valid` False.
+
+            :param notifications: iterable of raw bodies or parsed dicts
+        """
+        parsed = []
+        messages = []
+        for notification in notifications:
+            try:
+                if not isinstance(notification, dict):
+                    notification = parse_notification(notification)
+                message = self.message(notification)
+            except InvalidNotificationError:
+                parsed.append((notification, None))
+                continue
+            parsed.append((notification, len(messages)))
+            messages.append(message)
+
+        digests = self.signer.sign_many(messages)
+        results = []
+        for notification, index in parsed:
+            valid = False
+            if index is not None:
+                signature = notification.get(self.signature_field)
+                valid = signatures_match(digests[index], signature)
+            results.append((notification, valid))
+        return results
+
+    def _callbacks_for(self, notification):
+        callbacks = list(self._callbacks.get(None, ()))
+        status = notification.get(self.status_field)
+        if status is not None:
+            callbacks.extend(self._callbacks.get(status, ()))
+        return callbacks
+
+    def dispatch(self, notification):
+        """Passes a verified notification to its callbacks."""
+        for callback in self._callbacks_for(notification):
+            callback(notification)
+
+    def handle(self, body, content_type=None):
+        """Verifies a raw body and dispatches it, returning the notification."""
+        notification = self.verify(body, content_type)
+        self.dispatch(notification)
+        return notification
+
+    def replay(self, notifications):
+        """Verifies a batch and dispatches the valid ones, returning the rejected ones."""
+        rejected = []
+        for notification, valid in self.verify_many(notifications):
+            if valid:
+                self.dispatch(notification)
+            else:
+                rejected.append(notification)
+        return rejected
+
+    @staticmethod
+    def _status_line(error):
+        if error is None:
+            return 200, 'OK'
+        if isinstance(error, InvalidSignatureError):
+            return 401, 'Unauthorized'
+        return 400, 'Bad Request'
+
+    def __call__(self, environ, start_response):
+        """WSGI entry point."""
+        error = None
+        if environ.get('REQUEST_METHOD') != 'POST':
+            status, reason = 405, 'Method Not Allowed'
+        else:
+            try:
+                length = int(environ.get('CONTENT_LENGTH') or 0)
+            except ValueError:
+                length = 0
+            body = environ['wsgi.input'].read(length) if length > 0 else b''
+            try:
+                self.handle(body, environ.get('CONTENT_TYPE'))
+            except InvalidNotificationError as exc:
+                error = exc
+            status, reason = self._status_line(error)
+
+        start_response('{} {}'.format(status, reason),
+                       [('Content-Type', 'text/plain'), ('Content-Length', str(len(reason)))])
+        return [reason.encode()]
+
+    async def asgi(self, scope, receive, send):
+        """ASGI entry point; coroutine callbacks are awaited."""
+        if scope['type'] != 'http':
+            return
+        error = None
+        if scope.get('method') != 'POST':
+            status, reason = 405, 'Method Not Allowed'
+        else:
+            chunks = []
+            more_body = True
+            while more_body:
+                message = await receive()
+                chunks.append(message.get('body', b''))
+                more_body = message.get('more_body', False)
+            content_type = None
+            for name, value in scope.get('headers', ()):
+                if name == b'content-type':
+                    content_type = value.decode('latin-1')
+            try:
+                notification = self.verify(b''.join(chunks), content_type)
+                for callback in self._callbacks_for(notification):
+                    result = callback(notification)
+                    if inspect.isawaitable(result):
+                        await result
+            except InvalidNotificationError as exc:
+                error = exc
+            status, reason = self._status_line(error)
+
+        await send({'type': 'http.response.start', 'status': status,
+                    'headers': [(b'content-type', b'text/plain'),
+                                (b'content-length', str(len(reason)).encode())]})
+        await send({'type': 'http.response.body', 'body': reason.encode()})